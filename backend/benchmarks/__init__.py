@@ -0,0 +1 @@
+# Benchmarks do backend (executar a partir da pasta backend com `python -m benchmarks.<nome>`)
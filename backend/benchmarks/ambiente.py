@@ -0,0 +1,39 @@
+"""Utilitários compartilhados pelos benchmarks que rodam o Django no mesmo processo."""
+import os
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def configurar_django(caminho_banco=None, **variaveis):
+    """
+    Inicializa o Django com um banco SQLite descartável e aplica as migrações.
+
+    Deve ser chamada antes de importar os modelos. Variáveis extras são exportadas
+    para o ambiente antes de carregar as configurações (ex.: BUSCA_CACHE_TTL="0").
+
+    Returns:
+        Caminho do banco de dados usado
+    """
+    if caminho_banco is None:
+        caminho_banco = os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.sqlite3")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ["SQLITE_PATH"] = str(caminho_banco)
+    os.environ["ALLOWED_HOSTS"] = "testserver,localhost,127.0.0.1"
+    os.environ.update({chave: str(valor) for chave, valor in variaveis.items()})
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+    # O whitenoise avisa quando collectstatic não foi executado, o que não afeta as medições
+    warnings.filterwarnings("ignore", message="No directory at")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    return caminho_banco
@@ -0,0 +1,215 @@
+"""
+Teste de carga de ponta a ponta do POST /api/pesquisa/, sem chamar a API da OpenAI.
+
+Sobe o servidor stub da OpenAI e o servidor de links, aponta os links das fontes para
+este último (exercitando a verificação de links) e dispara buscas pela PesquisaView em
+níveis crescentes de concorrência. Cada busca usa um termo diferente, portanto passa
+pelo pipeline inteiro: chamadas ao modelo, validação, verificação de links e gravação.
+
+Para cada nível informa a vazão, as latências p50/p95/p99, as buscas que não terminaram
+com 200 e status `concluida` e a disputa pelo banco: duração das escritas (inclusive
+COMMIT), que no SQLite incluem a espera pelo lock de escrita, e quantas falharam com
+"database is locked".
+
+Com --salvar, grava o resultado em JSON; com --comparar, compara com um resultado salvo
+e termina com código 1 se a vazão cair ou o p95 subir além de --tolerancia, o que permite
+usá-lo como verificação antes de cada implantação.
+
+Uso:
+    python -m benchmarks.carga --niveis 1 4 16 32 --rodadas 4 --latencia 0.2
+    python -m benchmarks.carga --salvar base.json
+    python -m benchmarks.carga --comparar base.json --tolerancia 0.2
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.ambiente import configurar_django
+from benchmarks.servidor_links import ServidorLinks
+from benchmarks.stub_openai import ServidorStubOpenAI
+
+COMANDOS_ESCRITA = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+class MonitorEscritas:
+    """
+    Mede as escritas feitas por todas as conexões ao banco criadas durante o teste.
+
+    Cada thread abre a própria conexão; o sinal connection_created instala nelas um
+    execute_wrapper que cronometra INSERT/UPDATE/DELETE e envolve o COMMIT, onde o SQLite
+    também pode esperar pelo lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        with self._lock:
+            self.duracoes = []
+            self.bloqueios = 0
+
+    def _registrar(self, inicio, erro=None):
+        duracao = time.perf_counter() - inicio
+        with self._lock:
+            self.duracoes.append(duracao)
+            if erro is not None and "locked" in str(erro):
+                self.bloqueios += 1
+
+    def _medir(self, funcao):
+        inicio = time.perf_counter()
+        try:
+            resultado = funcao()
+        except Exception as erro:
+            self._registrar(inicio, erro)
+            raise
+        self._registrar(inicio)
+        return resultado
+
+    def _wrapper(self, execute, sql, params, many, context):
+        if not sql.lstrip()[:7].upper().startswith(COMANDOS_ESCRITA):
+            return execute(sql, params, many, context)
+        return self._medir(lambda: execute(sql, params, many, context))
+
+    def instalar(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self._wrapper)
+        commit_original = connection._commit
+        connection._commit = lambda: self._medir(commit_original)
+
+    def resumo(self):
+        with self._lock:
+            return {
+                "escritas": len(self.duracoes),
+                "escrita_p95_ms": round(percentil(self.duracoes, 95) * 1000, 2),
+                "escrita_max_ms": round(max(self.duracoes, default=0.0) * 1000, 2),
+                "bloqueios": self.bloqueios,
+            }
+
+
+def medir_nivel(concorrencia, requisicoes, prefixo, monitor):
+    from django.db import connection
+    from django.test import Client
+
+    clientes = threading.local()
+
+    def buscar(i):
+        if not hasattr(clientes, "client"):
+            clientes.client = Client(raise_request_exception=False)
+        inicio = time.perf_counter()
+        resposta = clientes.client.post(
+            "/api/pesquisa/", {"termo": f"{prefixo} tema {i}"}, content_type="application/json"
+        )
+        latencia = time.perf_counter() - inicio
+        ok = resposta.status_code == 200 and resposta.json().get("status") == "concluida"
+        return latencia, ok
+
+    def buscar_e_fechar(i):
+        try:
+            return buscar(i)
+        finally:
+            # Como em produção (CONN_MAX_AGE=0), cada requisição abre e fecha a própria conexão
+            connection.close()
+
+    monitor.zerar()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(buscar_e_fechar, range(requisicoes)))
+    duracao = time.perf_counter() - inicio
+
+    latencias = [latencia for latencia, _ in resultados]
+    return {
+        "concorrencia": concorrencia,
+        "requisicoes": requisicoes,
+        "vazao_rps": round(requisicoes / duracao, 2),
+        "p50_s": round(percentil(latencias, 50), 3),
+        "p95_s": round(percentil(latencias, 95), 3),
+        "p99_s": round(percentil(latencias, 99), 3),
+        "falhas": sum(not ok for _, ok in resultados),
+        **monitor.resumo(),
+    }
+
+
+def comparar(resultados, arquivo_base, tolerancia):
+    """Lista as regressões de vazão e p95 em relação a um resultado salvo."""
+    with open(arquivo_base) as arquivo:
+        base = {r["concorrencia"]: r for r in json.load(arquivo)["niveis"]}
+    regressoes = []
+    for atual in resultados:
+        anterior = base.get(atual["concorrencia"])
+        if anterior is None:
+            continue
+        if atual["vazao_rps"] < anterior["vazao_rps"] * (1 - tolerancia):
+            regressoes.append(f"concorrência {atual['concorrencia']}: vazão "
+                              f"{anterior['vazao_rps']} -> {atual['vazao_rps']} req/s")
+        if atual["p95_s"] > anterior["p95_s"] * (1 + tolerancia):
+            regressoes.append(f"concorrência {atual['concorrencia']}: p95 "
+                              f"{anterior['p95_s']} -> {atual['p95_s']} s")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--niveis", type=int, nargs="+", default=[1, 4, 16, 32], help="Níveis de concorrência")
+    parser.add_argument("--rodadas", type=int, default=4, help="Buscas por nível = concorrência x rodadas")
+    parser.add_argument("--latencia", type=float, default=0.2, help="Atraso de cada resposta do stub, em segundos")
+    parser.add_argument("--latencia-links", type=float, default=0.0, help="Atraso do servidor de links, em segundos")
+    parser.add_argument("--fontes", type=int, default=5, help="Fontes em cada resposta do stub")
+    parser.add_argument("--sem-verificacao", action="store_true", help="Desativa a verificação de links")
+    parser.add_argument("--salvar", help="Grava o resultado neste arquivo JSON")
+    parser.add_argument("--comparar", help="Resultado JSON salvo anteriormente para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Variação aceita na comparação (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    links = ServidorLinks(("127.0.0.1", 0), args.latencia_links).iniciar_em_thread()
+    stub = ServidorStubOpenAI(("127.0.0.1", 0), latencia=args.latencia, fontes_por_resposta=args.fontes,
+                              base_links=links.base_url).iniciar_em_thread()
+    os.environ["OPENAI_BASE_URL"] = stub.base_url
+    os.environ["OPENAI_API_KEY"] = "stub"
+    configurar_django(
+        BUSCA_VERIFICAR_LINKS=str(not args.sem_verificacao),
+        BUSCA_SIMILARIDADE_ATIVA="False",
+        OPENAI_LIMITE_REQUISICOES_MINUTO="0",
+        OPENAI_LIMITE_TOKENS_MINUTO="0",
+    )
+    from django.db.backends.signals import connection_created
+
+    monitor = MonitorEscritas()
+    connection_created.connect(monitor.instalar, weak=False)
+
+    print(f"{'conc.':>6}{'req.':>6}{'req/s':>9}{'p50 (s)':>9}{'p95 (s)':>9}{'p99 (s)':>9}{'falhas':>8}"
+          f"{'escritas':>10}{'esc. p95 (ms)':>15}{'esc. máx (ms)':>15}{'locked':>8}")
+    resultados = []
+    for nivel in args.niveis:
+        r = medir_nivel(nivel, nivel * args.rodadas, f"carga {nivel}", monitor)
+        resultados.append(r)
+        print(f"{r['concorrencia']:>6}{r['requisicoes']:>6}{r['vazao_rps']:>9.2f}{r['p50_s']:>9.2f}"
+              f"{r['p95_s']:>9.2f}{r['p99_s']:>9.2f}{r['falhas']:>8}{r['escritas']:>10}"
+              f"{r['escrita_p95_ms']:>15.1f}{r['escrita_max_ms']:>15.1f}{r['bloqueios']:>8}")
+    print(f"requisições ao stub: {stub.requisicoes}, ao servidor de links: {links.requisicoes}")
+    stub.shutdown()
+    links.shutdown()
+
+    if args.salvar:
+        with open(args.salvar, "w") as arquivo:
+            json.dump({"parametros": vars(args), "niveis": resultados}, arquivo, indent=2)
+    if args.comparar:
+        regressoes = comparar(resultados, args.comparar, args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO: {regressao}")
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
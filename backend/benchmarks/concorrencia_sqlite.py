@@ -0,0 +1,160 @@
+"""
+Disputa pelo SQLite com muitas gravações simultâneas do pipeline e leituras do histórico.
+
+Para cada perfil (SQLITE_PERFIL), sobe um processo novo com um banco descartável e
+dispara --escritores threads que registram pesquisas e gravam as fontes delas com o
+código do pipeline (criar_pesquisa seguido de salvar_fontes, que lê as fontes já
+gravadas e insere as novas na mesma transação), enquanto --leitores threads consultam
+GET /api/historico/ sem parar.
+
+Informa a vazão das gravações, as latências p50/p95/p99 de cada gravação, as que
+falharam com "database is locked" e as latências das leituras. No perfil "padrao" as
+threads disputam o lock de escrita entre si; no "producao" elas passam pela fila única
+de escrita e, com WAL, as leituras não esperam pelas gravações.
+
+Uso:
+    python -m benchmarks.concorrencia_sqlite --perfis padrao producao --escritores 50 --gravacoes 10
+"""
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.ambiente import configurar_django
+from benchmarks.carga import percentil
+
+# Parte dos links se repete entre as pesquisas, como fontes encontradas por termos diferentes
+LINKS_COMPARTILHADOS = 40
+
+
+def gerar_fontes(escritor, gravacao, quantidade):
+    from search_engine.decodificacao import FonteExtraida
+
+    fontes = []
+    for i in range(quantidade):
+        if i % 3 == 0:
+            link = f"https://www.scielo.br/j/rsp/a/compartilhada-{(escritor + gravacao + i) % LINKS_COMPARTILHADOS}/"
+        else:
+            link = f"https://arxiv.org/abs/{escritor:03d}.{gravacao:04d}{i:02d}"
+        fontes.append(FonteExtraida(
+            link=link, titulo=f"Estudo {escritor}-{gravacao}-{i}", autores="Silva, A.; Souza, B.",
+            instituicao="Universidade de São Paulo", ano_publicacao=2020, descricao="Descrição " * 20,
+            tipo_acesso="Artigo",
+        ))
+    return fontes
+
+
+def executar_perfil(args):
+    """Executa a medição no processo atual, com o perfil já definido no ambiente, e devolve o resumo."""
+    configurar_django(SQLITE_PERFIL=args.executar, BUSCA_SIMILARIDADE_ATIVA="False")
+    from django.db import connection
+    from django.test import Client
+    from search_engine.models import PesquisaAcademica
+    from search_engine.services import criar_pesquisa, salvar_fontes
+
+    # Histórico inicial, para que as leituras tenham o que paginar
+    for i in range(100):
+        salvar_fontes(criar_pesquisa(f"histórico {i}"), gerar_fontes(999, i, args.fontes))
+    connection.close()
+
+    concluido = threading.Event()
+    lock = threading.Lock()
+    gravacoes, leituras = [], []
+    erros = {"gravacao_locked": 0, "gravacao_outros": 0, "leitura_falhas": 0}
+
+    def contar(chave):
+        with lock:
+            erros[chave] += 1
+
+    def escrever(escritor):
+        try:
+            for gravacao in range(args.gravacoes):
+                inicio = time.perf_counter()
+                try:
+                    pesquisa = criar_pesquisa(f"tema {escritor} {gravacao}", modo=PesquisaAcademica.Modo.CHAMADA_UNICA)
+                    salvar_fontes(pesquisa, gerar_fontes(escritor, gravacao, args.fontes))
+                except Exception as erro:
+                    contar("gravacao_locked" if "locked" in str(erro) else "gravacao_outros")
+                    continue
+                with lock:
+                    gravacoes.append(time.perf_counter() - inicio)
+        finally:
+            connection.close()
+
+    def ler():
+        client = Client(raise_request_exception=False)
+        try:
+            while not concluido.is_set():
+                inicio = time.perf_counter()
+                resposta = client.get("/api/historico/")
+                duracao = time.perf_counter() - inicio
+                if resposta.status_code != 200:
+                    contar("leitura_falhas")
+                    continue
+                with lock:
+                    leituras.append(duracao)
+                connection.close()
+        finally:
+            connection.close()
+
+    leitores = [threading.Thread(target=ler) for _ in range(args.leitores)]
+    for leitor in leitores:
+        leitor.start()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.escritores) as executor:
+        list(executor.map(escrever, range(args.escritores)))
+    duracao = time.perf_counter() - inicio
+    concluido.set()
+    for leitor in leitores:
+        leitor.join()
+
+    return {
+        "perfil": args.executar,
+        "gravacoes": len(gravacoes),
+        "gravacoes_s": round(len(gravacoes) / duracao, 1),
+        "gravacao_p50_ms": round(percentil(gravacoes, 50) * 1000, 1),
+        "gravacao_p95_ms": round(percentil(gravacoes, 95) * 1000, 1),
+        "gravacao_p99_ms": round(percentil(gravacoes, 99) * 1000, 1),
+        "leituras": len(leituras),
+        "leitura_p50_ms": round(percentil(leituras, 50) * 1000, 1),
+        "leitura_p95_ms": round(percentil(leituras, 95) * 1000, 1),
+        "leitura_max_ms": round(max(leituras, default=0.0) * 1000, 1),
+        **erros,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perfis", nargs="+", default=["padrao", "producao"], help="Perfis do SQLite comparados")
+    parser.add_argument("--escritores", type=int, default=50, help="Threads gravando ao mesmo tempo")
+    parser.add_argument("--gravacoes", type=int, default=10, help="Pesquisas gravadas por escritor")
+    parser.add_argument("--fontes", type=int, default=8, help="Fontes gravadas em cada pesquisa")
+    parser.add_argument("--leitores", type=int, default=4, help="Threads lendo o histórico")
+    parser.add_argument("--executar", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        print(json.dumps(executar_perfil(args)))
+        return
+
+    print(f"{'perfil':>10}{'grav.':>7}{'grav./s':>9}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}"
+          f"{'locked':>8}{'outros':>8}{'leituras':>10}{'leit. p50':>11}{'leit. p95':>11}{'leit. máx':>11}"
+          f"{'leit. falhas':>14}")
+    for perfil in args.perfis:
+        # As configurações (e a fila de escrita) são lidas uma vez por processo
+        comando = [sys.executable, "-m", "benchmarks.concorrencia_sqlite", "--executar", perfil,
+                   "--escritores", str(args.escritores), "--gravacoes", str(args.gravacoes),
+                   "--fontes", str(args.fontes), "--leitores", str(args.leitores)]
+        saida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+        r = json.loads(saida.strip().splitlines()[-1])
+        print(f"{r['perfil']:>10}{r['gravacoes']:>7}{r['gravacoes_s']:>9.1f}{r['gravacao_p50_ms']:>10.1f}"
+              f"{r['gravacao_p95_ms']:>10.1f}{r['gravacao_p99_ms']:>10.1f}{r['gravacao_locked']:>8}"
+              f"{r['gravacao_outros']:>8}{r['leituras']:>10}{r['leitura_p50_ms']:>11.1f}"
+              f"{r['leitura_p95_ms']:>11.1f}{r['leitura_max_ms']:>11.1f}{r['leitura_falhas']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Mede a decodificação e a validação do JSON de fontes devolvido pelo modelo
+(extrair_fontes_do_json seguido de validar_fontes) com payloads sintéticos grandes.
+
+Os payloads misturam fontes válidas com casos que exigem conversão ou rejeição: anos
+como texto, campos ausentes, textos acima do limite do modelo e links inválidos.
+
+Uso:
+    python -m benchmarks.decodificacao_fontes --tamanhos 50 500 5000 --repeticoes 200
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import time
+
+from benchmarks.ambiente import configurar_django
+
+
+def gerar_fonte(i, aleatorio):
+    fonte = {
+        "titulo": f"Estudo {i} sobre aprendizado de máquina aplicado à saúde pública",
+        "autores": "Silva, A.; Souza, B.; Pereira, C.",
+        "instituicao": "Universidade de São Paulo",
+        "ano_publicacao": 2000 + i % 25,
+        "link": f"https://www.scielo.br/j/rsp/a/{i:08d}/?lang=pt",
+        "tipo_acesso": "Artigo",
+        "descricao": "Revisão sistemática sobre o tema, com metanálise de estudos observacionais. " * 3,
+    }
+    caso = aleatorio.random()
+    if caso < 0.10:
+        fonte["ano_publicacao"] = f"{2000 + i % 25} (online)"
+    elif caso < 0.15:
+        fonte["titulo"] = "T" * 600
+    elif caso < 0.20:
+        fonte["link"] = f"www.exemplo.org/{i}"
+    elif caso < 0.25:
+        fonte["autores"] = "Autor, X.; " * 80
+    elif caso < 0.30:
+        del fonte["instituicao"], fonte["tipo_acesso"]
+    return fonte
+
+
+def gerar_payload(tamanho, semente=0):
+    aleatorio = random.Random(semente)
+    return json.dumps({"fontes": [gerar_fonte(i, aleatorio) for i in range(tamanho)]}, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[50, 500, 5000], help="Fontes por payload")
+    parser.add_argument("--repeticoes", type=int, default=200, help="Decodificações medidas por tamanho")
+    args = parser.parse_args()
+
+    configurar_django()
+    # Os avisos de fontes rejeitadas dominariam a medição
+    logging.disable(logging.WARNING)
+    from search_engine.services import extrair_fontes_do_json, validar_fontes
+
+    print(f"{'fontes':>8}{'válidas':>9}{'rejeitadas':>12}{'json (ms)':>11}{'validação (ms)':>16}"
+          f"{'total p95 (ms)':>16}{'µs/fonte':>10}")
+    for tamanho in args.tamanhos:
+        payload = gerar_payload(tamanho)
+        repeticoes = max(5, args.repeticoes * 50 // max(tamanho, 50))
+        tempos_json, tempos_validacao, totais = [], [], []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            fontes = extrair_fontes_do_json(payload)
+            meio = time.perf_counter()
+            validas, rejeitadas = validar_fontes(fontes)
+            fim = time.perf_counter()
+            tempos_json.append(meio - inicio)
+            tempos_validacao.append(fim - meio)
+            totais.append(fim - inicio)
+        totais.sort()
+        mediana = statistics.median(totais)
+        p95 = totais[min(len(totais) - 1, int(len(totais) * 0.95))]
+        print(f"{tamanho:>8}{len(validas):>9}{len(rejeitadas):>12}{statistics.median(tempos_json) * 1000:>11.3f}"
+              f"{statistics.median(tempos_validacao) * 1000:>16.3f}{p95 * 1000:>16.3f}{mediana / tamanho * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Mede o tempo, o volume e o pico de memória da exportação do histórico
+(GET /api/historico/exportar/) em cada formato conforme o histórico cresce.
+
+A resposta é consumida bloco a bloco, sem acumular o conteúdo, como faria o servidor
+ao enviá-la. Com a leitura em lotes pelo cursor, o pico de memória deve permanecer
+constante, independentemente do total de pesquisas exportadas.
+
+Uso:
+    python -m benchmarks.exportacao --tamanhos 1000 10000 50000 --formatos csv jsonl bibtex
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.ambiente import configurar_django
+from benchmarks.historico import popular
+
+
+def medir(cliente, formato):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resposta = cliente.get("/api/historico/exportar/", {"formato": formato})
+    assert resposta.status_code == 200, resposta.status_code
+    total = 0
+    for bloco in resposta.streaming_content:
+        total += len(bloco)
+    resposta.close()
+    duracao = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duracao, total, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="Totais de pesquisas no histórico a exportar")
+    parser.add_argument("--fontes", type=int, default=5, help="Fontes por pesquisa")
+    parser.add_argument("--formatos", nargs="+", default=["csv", "jsonl", "bibtex"])
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.test import Client
+
+    cliente = Client()
+    for formato in args.formatos:
+        medir(cliente, formato)  # aquecimento (imports e compilação das rotas)
+    total = 0
+    print(f"{'pesquisas':>10}{'formato':>9}{'tempo (s)':>11}{'MB':>9}{'MB/s':>8}{'pico de memória (KB)':>22}")
+    for tamanho in sorted(args.tamanhos):
+        popular(total, tamanho, args.fontes)
+        total = tamanho
+        for formato in args.formatos:
+            duracao, volume, pico = medir(cliente, formato)
+            megabytes = volume / 1024 / 1024
+            print(f"{tamanho:>10}{formato:>9}{duracao:>11.2f}{megabytes:>9.1f}{megabytes / duracao:>8.1f}"
+                  f"{pico / 1024:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
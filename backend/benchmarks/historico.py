@@ -0,0 +1,78 @@
+"""
+Mede a latência e o pico de memória de GET /api/historico/ conforme o histórico cresce.
+
+Com a paginação por cursor e o prefetch das fontes, o custo de cada página deve
+permanecer constante, independentemente do total de pesquisas armazenadas.
+
+Uso:
+    python -m benchmarks.historico --tamanhos 1000 10000 50000 --fontes 5
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.ambiente import configurar_django
+
+
+def popular(total_atual, total_desejado, fontes_por_pesquisa):
+    from search_engine.models import PesquisaAcademica, FonteAcademica, PesquisaFonte
+
+    lote = 2000
+    while total_atual < total_desejado:
+        quantidade = min(lote, total_desejado - total_atual)
+        pesquisas = PesquisaAcademica.objects.bulk_create([
+            PesquisaAcademica(termo=f"tema {total_atual + i}", termo_normalizado=f"tema {total_atual + i}",
+                              status=PesquisaAcademica.Status.CONCLUIDA)
+            for i in range(quantidade)
+        ])
+        fontes = FonteAcademica.objects.bulk_create([
+            FonteAcademica(titulo=f"Fonte {j}", link=f"https://exemplo.org/{pesquisa.id}/{j}",
+                           url_canonica=f"https://exemplo.org/{pesquisa.id}/{j}", descricao="Descrição de exemplo " * 10)
+            for pesquisa in pesquisas for j in range(fontes_por_pesquisa)
+        ])
+        PesquisaFonte.objects.bulk_create([
+            PesquisaFonte(pesquisa=pesquisa, fonte=fontes[i * fontes_por_pesquisa + j], posicao=j)
+            for i, pesquisa in enumerate(pesquisas) for j in range(fontes_por_pesquisa)
+        ])
+        total_atual += quantidade
+
+
+def medir(cliente, repeticoes):
+    latencias = []
+    pico = 0
+    for _ in range(repeticoes):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        resposta = cliente.get("/api/historico/")
+        latencias.append(time.perf_counter() - inicio)
+        pico = max(pico, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert resposta.status_code == 200, resposta.status_code
+    return statistics.median(latencias), pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="Totais de pesquisas no histórico a medir")
+    parser.add_argument("--fontes", type=int, default=5, help="Fontes por pesquisa")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.test import Client
+
+    cliente = Client()
+    cliente.get("/api/historico/")  # aquecimento (imports e compilação das rotas)
+    total = 0
+    print(f"{'pesquisas':>10} {'latência p50 (ms)':>18} {'pico de memória (KB)':>22}")
+    for tamanho in sorted(args.tamanhos):
+        popular(total, tamanho, args.fontes)
+        total = tamanho
+        latencia, pico = medir(cliente, args.repeticoes)
+        print(f"{tamanho:>10} {latencia * 1000:>18.2f} {pico / 1024:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Vazão do modo em lote de motor_busca_academica.py (--lote) com o stub da OpenAI,
+comparada ao caminho interativo do mesmo script (busca_academica, um termo por vez).
+
+O modo em lote roda em um processo separado, como seria usado na linha de comando,
+com um banco descartável, lendo os termos de um arquivo e gravando o JSONL em outro.
+O caminho interativo inclui as animações de carregamento (time.sleep) do script.
+
+Uso:
+    python -m benchmarks.lote_cli --termos 64 --paralelas 1 4 16 --latencia 0.5
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.ambiente import BACKEND_DIR
+from benchmarks.stub_openai import ServidorStubOpenAI
+
+
+def medir_interativo(termos):
+    sys.path.insert(0, str(BACKEND_DIR))
+    import motor_busca_academica
+
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for termo in termos:
+            motor_busca_academica.busca_academica(termo)
+    return time.perf_counter() - inicio
+
+
+def medir_lote(termos, paralelas, diretorio):
+    entrada = os.path.join(diretorio, "termos.txt")
+    saida = os.path.join(diretorio, f"saida-{paralelas}.jsonl")
+    with open(entrada, "w", encoding="utf-8") as arquivo:
+        arquivo.write("\n".join(termos) + "\n")
+    ambiente = dict(os.environ, SQLITE_PATH=os.path.join(diretorio, f"lote-{paralelas}.sqlite3"))
+    subprocess.run([sys.executable, "manage.py", "migrate", "-v0"], cwd=BACKEND_DIR, env=ambiente, check=True)
+
+    inicio = time.perf_counter()
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        subprocess.run(
+            [sys.executable, "motor_busca_academica.py", "--lote", entrada, "--paralelas", str(paralelas)],
+            cwd=BACKEND_DIR, env=ambiente, stdout=arquivo, stderr=subprocess.DEVNULL,
+        )
+    duracao = time.perf_counter() - inicio
+    with open(saida, encoding="utf-8") as arquivo:
+        concluidos = sum(json.loads(linha)["status"] == "concluida" for linha in arquivo)
+    return duracao, concluidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--termos", type=int, default=64, help="Termos buscados em cada execução do modo em lote")
+    parser.add_argument("--paralelas", type=int, nargs="+", default=[1, 4, 16], help="Níveis de paralelismo medidos")
+    parser.add_argument("--interativo", type=int, default=3, help="Termos buscados pelo caminho interativo (0 pula)")
+    parser.add_argument("--latencia", type=float, default=0.5, help="Atraso de cada resposta do stub, em segundos")
+    args = parser.parse_args()
+
+    stub = ServidorStubOpenAI(("127.0.0.1", 0), latencia=args.latencia).iniciar_em_thread()
+    # Sem o limitador local: o teto passa a ser o paralelismo, não a cota por minuto da conta
+    os.environ.update(
+        OPENAI_BASE_URL=stub.base_url, OPENAI_API_KEY="stub", BUSCA_VERIFICAR_LINKS="False",
+        OPENAI_LIMITE_REQUISICOES_MINUTO="0", OPENAI_LIMITE_TOKENS_MINUTO="0",
+    )
+    termos = [f"tema de pesquisa {i}" for i in range(args.termos)]
+
+    print(f"{'caminho':>14}{'paralelas':>11}{'termos':>8}{'concluídos':>12}{'tempo (s)':>11}{'termos/s':>10}")
+    if args.interativo:
+        duracao = medir_interativo(termos[:args.interativo])
+        print(f"{'interativo':>14}{1:>11}{args.interativo:>8}{args.interativo:>12}{duracao:>11.1f}"
+              f"{args.interativo / duracao:>10.2f}")
+    with tempfile.TemporaryDirectory(prefix="bench-lote-") as diretorio:
+        for paralelas in args.paralelas:
+            duracao, concluidos = medir_lote(termos, paralelas, diretorio)
+            print(f"{'lote':>14}{paralelas:>11}{len(termos):>8}{concluidos:>12}{duracao:>11.1f}"
+                  f"{len(termos) / duracao:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
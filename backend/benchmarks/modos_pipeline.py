@@ -0,0 +1,122 @@
+"""
+Compara os modos de pipeline da busca: três chamadas ao modelo e chamada única.
+
+Para cada modo, executa buscas com termos distintos (sem cache nem reaproveitamento
+de termos similares) e registra as chamadas feitas ao modelo, os tokens informados em
+`usage`, a latência de ponta a ponta e a quantidade de fontes salvas por busca.
+
+Por padrão as chamadas vão para o servidor local que imita a OpenAI; como o stub devolve
+as mesmas fontes em qualquer modo, a quantidade de fontes só é comparável com a API real
+(--api-real, que consome créditos e usa OPENAI_API_KEY do ambiente).
+
+Uso:
+    python -m benchmarks.modos_pipeline --buscas 20 --latencia 0.8
+    python -m benchmarks.modos_pipeline --buscas 5 --api-real
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from benchmarks.ambiente import configurar_django
+from benchmarks.stub_openai import ServidorStubOpenAI
+
+TERMOS_BASE = [
+    "aprendizado de máquina na saúde",
+    "mudanças climáticas e agricultura",
+    "educação a distância no ensino superior",
+    "energia solar em comunidades rurais",
+    "microbioma intestinal e imunidade",
+]
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+class ContadorChamadas:
+    """Envolve client.chat.completions.create para contar chamadas e tokens."""
+
+    def __init__(self, completions):
+        self._original = completions.create
+        self._lock = threading.Lock()
+        self.zerar()
+        completions.create = self._create
+
+    def zerar(self):
+        self.chamadas = 0
+        self.tokens_prompt = 0
+        self.tokens_resposta = 0
+
+    def _create(self, *args, **kwargs):
+        resposta = self._original(*args, **kwargs)
+        with self._lock:
+            self.chamadas += 1
+            if getattr(resposta, "usage", None) is not None:
+                self.tokens_prompt += resposta.usage.prompt_tokens
+                self.tokens_resposta += resposta.usage.completion_tokens
+        return resposta
+
+
+def medir_modo(modo, termos, contador):
+    from search_engine.services import realizar_busca_academica
+
+    contador.zerar()
+    latencias = []
+    fontes = []
+    falhas = 0
+    for termo in termos:
+        inicio = time.perf_counter()
+        pesquisa = realizar_busca_academica(termo, modo=modo)
+        latencias.append(time.perf_counter() - inicio)
+        fontes.append(pesquisa.itens.count())
+        falhas += pesquisa.status == pesquisa.Status.FALHOU
+    return {
+        "chamadas": contador.chamadas / len(termos),
+        "tokens_prompt": contador.tokens_prompt / len(termos),
+        "tokens_resposta": contador.tokens_resposta / len(termos),
+        "p50": percentil(latencias, 50),
+        "p95": percentil(latencias, 95),
+        "fontes": statistics.mean(fontes),
+        "falhas": falhas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buscas", type=int, default=20, help="Buscas por modo")
+    parser.add_argument("--latencia", type=float, default=0.8, help="Atraso de cada resposta do stub, em segundos")
+    parser.add_argument("--api-real", action="store_true", help="Usa a API da OpenAI em vez do stub")
+    args = parser.parse_args()
+
+    if not args.api_real:
+        stub = ServidorStubOpenAI(("127.0.0.1", 0), latencia=args.latencia).iniciar_em_thread()
+        os.environ["OPENAI_BASE_URL"] = stub.base_url
+        os.environ["OPENAI_API_KEY"] = "stub"
+
+    configurar_django(
+        BUSCA_VERIFICAR_LINKS="False",
+        BUSCA_SIMILARIDADE_ATIVA="False",
+        OPENAI_LIMITE_REQUISICOES_MINUTO="0",
+        OPENAI_LIMITE_TOKENS_MINUTO="0",
+    )
+    from search_engine import services
+    from search_engine.models import PesquisaAcademica
+
+    contador = ContadorChamadas(services.client.chat.completions)
+    modos = [PesquisaAcademica.Modo.TRES_CHAMADAS, PesquisaAcademica.Modo.CHAMADA_UNICA]
+
+    print(f"{'modo':<15}{'chamadas':>10}{'tok. prompt':>13}{'tok. resposta':>15}"
+          f"{'p50 (s)':>10}{'p95 (s)':>10}{'fontes':>8}{'falhas':>8}")
+    for modo in modos:
+        # Termos distintos por modo, para que nenhuma busca seja servida pelo cache
+        termos = [f"{TERMOS_BASE[i % len(TERMOS_BASE)]} {modo} {i}" for i in range(args.buscas)]
+        r = medir_modo(modo, termos, contador)
+        print(f"{modo:<15}{r['chamadas']:>10.1f}{r['tokens_prompt']:>13.0f}{r['tokens_resposta']:>15.0f}"
+              f"{r['p50']:>10.2f}{r['p95']:>10.2f}{r['fontes']:>8.1f}{r['falhas']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Mede o ranqueamento local das fontes (ranquear_fontes: BM25 do título e da descrição
+combinado com a confiança do domínio) com conjuntos sintéticos de fontes.
+
+Os links misturam domínios acadêmicos conhecidos, universidades e sites comuns, com
+hosts variados para que o cache do classificador não esconda o custo dele. O
+classificador compilado (uma expressão por host) é comparado com a verificação ingênua,
+que procura cada domínio e cada extensão da lista no link inteiro: além do tempo, a
+coluna "diverg." conta os links que ela classifica de outro jeito (ex.: "sage" dentro de
+message.com ou ".de" no caminho do link).
+
+Uso:
+    python -m benchmarks.ranqueamento --tamanhos 10 100 1000 10000 --repeticoes 5
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from benchmarks.ambiente import configurar_django
+
+HOSTS = [
+    "www.scielo.br", "pubmed.ncbi.nlm.nih.gov", "arxiv.org", "link.springer.com", "ieeexplore.ieee.org",
+    "dl.acm.org", "www.nature.com", "journals.sagepub.com", "www.mdpi.com", "repositorio.usp.br",
+    "web.mit.edu", "www.ox.ac.uk", "www.uni-hamburg.de", "blog.exemplo.com", "noticias.exemplo.com.br",
+    "www.message.com", "medium.com", "pt.wikipedia.org",
+]
+
+PALAVRAS = (
+    "aprendizado máquina saúde redes neurais diagnóstico imagens médicas estudo revisão sistemática "
+    "clínico dados modelos predição hospitalar pacientes avaliação métodos resultados análise"
+).split()
+
+
+def gerar_fontes(quantidade, semente):
+    aleatorio = random.Random(semente)
+    fontes = []
+    for i in range(quantidade):
+        # Subdomínios numerados: cada fonte tem um host diferente
+        host = f"s{i}.{aleatorio.choice(HOSTS)}"
+        fontes.append(SimpleNamespace(
+            titulo=" ".join(aleatorio.choices(PALAVRAS, k=8)),
+            descricao=" ".join(aleatorio.choices(PALAVRAS, k=40)),
+            link=f"https://{host}/{aleatorio.choice(['artigo', 'deposito', 'sagen'])}/{i}",
+        ))
+    return fontes
+
+
+def confianca_ingenua(link, dominios, extensoes):
+    if any(dominio in link for dominio in dominios):
+        return 1.0
+    if any(extensao in link for extensao in extensoes):
+        return 0.6
+    return 0.0
+
+
+def medir(funcao, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                        help="Quantidades de fontes ranqueadas de uma vez")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Repetições de cada medição (vale a melhor)")
+    parser.add_argument("--termo", default="aprendizado de máquina em diagnósticos por imagens médicas")
+    args = parser.parse_args()
+
+    configurar_django()
+    from search_engine import ranqueamento
+
+    print(f"{'fontes':>8}{'ranqueamento (ms)':>19}{'fontes/s':>12}{'classif. (ms)':>15}"
+          f"{'ingênuo (ms)':>14}{'diverg.':>9}")
+    for tamanho in args.tamanhos:
+        fontes = gerar_fontes(tamanho, semente=tamanho)
+        links = [fonte.link for fonte in fontes]
+
+        def ranquear():
+            ranqueamento.confianca_host.cache_clear()
+            ranqueamento.ranquear_fontes(args.termo, fontes)
+
+        def classificar():
+            ranqueamento.confianca_host.cache_clear()
+            for link in links:
+                ranqueamento.confianca_link(link)
+
+        def classificar_ingenuo():
+            for link in links:
+                confianca_ingenua(link, ranqueamento.DOMINIOS_ACADEMICOS, ranqueamento.EXTENSOES_ACADEMICAS)
+
+        duracao = medir(ranquear, args.repeticoes)
+        compilado = medir(classificar, args.repeticoes)
+        ingenuo = medir(classificar_ingenuo, args.repeticoes)
+        divergencias = sum(
+            ranqueamento.confianca_link(link)
+            != confianca_ingenua(link, ranqueamento.DOMINIOS_ACADEMICOS, ranqueamento.EXTENSOES_ACADEMICAS)
+            for link in links
+        )
+        print(f"{tamanho:>8}{duracao * 1000:>19.2f}{tamanho / duracao:>12.0f}{compilado * 1000:>15.2f}"
+              f"{ingenuo * 1000:>14.2f}{divergencias:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Mede a camada de chamadas à OpenAI (limitador, novas tentativas e circuit breaker) contra
+o servidor stub com falhas injetadas.
+
+Fase 1: buscas concorrentes com uma fração das chamadas respondida com 429 (com
+Retry-After) ou 503, com e sem novas tentativas.
+Fase 2: o stub fica indisponível (503 em tudo); depois de OPENAI_CIRCUITO_LIMIAR_FALHAS
+buscas com falha o circuito abre e as seguintes falham na hora, sem chamar o provedor.
+Fase 3: o stub volta e, passado o tempo de abertura, uma busca de teste fecha o circuito.
+
+As buscas gravam no SQLite em paralelo; falhas por "database is locked" também aparecem
+como buscas não concluídas.
+
+Uso:
+    python -m benchmarks.resiliencia_openai --buscas 40 --concorrencia 8 --taxa-429 0.2 --taxa-5xx 0.05
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.ambiente import configurar_django
+from benchmarks.stub_openai import ServidorStubOpenAI
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def executar_buscas(prefixo, quantidade, concorrencia):
+    from search_engine.services import realizar_busca_academica
+
+    def buscar(i):
+        inicio = time.perf_counter()
+        pesquisa = realizar_busca_academica(f"{prefixo} tema {i}")
+        return pesquisa.status, time.perf_counter() - inicio
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        return list(executor.map(buscar, range(quantidade)))
+
+
+def resumir(rotulo, resultados, chamador, stub, inicio_requisicoes):
+    latencias = [latencia for _, latencia in resultados]
+    concluidas = sum(status == 'concluida' for status, _ in resultados)
+    print(f"{rotulo:<28}{concluidas:>6}/{len(resultados):<6}{chamador.novas_tentativas:>10}"
+          f"{chamador.recusadas:>10}{stub.requisicoes - inicio_requisicoes:>12}"
+          f"{percentil(latencias, 50):>9.2f}{percentil(latencias, 95):>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buscas", type=int, default=40)
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--latencia", type=float, default=0.1, help="Atraso de cada resposta do stub, em segundos")
+    parser.add_argument("--taxa-429", type=float, default=0.2)
+    parser.add_argument("--taxa-5xx", type=float, default=0.05)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--tempo-abertura", type=float, default=2.0, help="Segundos com o circuito aberto")
+    args = parser.parse_args()
+
+    stub = ServidorStubOpenAI(("127.0.0.1", 0), latencia=args.latencia, taxa_429=args.taxa_429,
+                              taxa_5xx=args.taxa_5xx, retry_after=args.retry_after).iniciar_em_thread()
+    os.environ["OPENAI_BASE_URL"] = stub.base_url
+    os.environ["OPENAI_API_KEY"] = "stub"
+    configurar_django(
+        BUSCA_VERIFICAR_LINKS="False",
+        BUSCA_SIMILARIDADE_ATIVA="False",
+        # O limitador de taxa não é o alvo desta medição
+        OPENAI_LIMITE_REQUISICOES_MINUTO="0",
+        OPENAI_LIMITE_TOKENS_MINUTO="0",
+        OPENAI_ESPERA_BASE="0.2",
+        OPENAI_ESPERA_MAXIMA="5",
+        OPENAI_CIRCUITO_TEMPO_ABERTURA=str(args.tempo_abertura),
+    )
+    from search_engine.chamadas_modelo import chamador_openai
+
+    max_tentativas = chamador_openai.max_tentativas
+    limiar = chamador_openai.disjuntor.limiar_falhas
+
+    def zerar(tentativas, limiar_falhas):
+        chamador_openai.max_tentativas = tentativas
+        chamador_openai.disjuntor.limiar_falhas = limiar_falhas
+        chamador_openai.disjuntor.registrar_sucesso()
+        chamador_openai.novas_tentativas = 0
+        chamador_openai.recusadas = 0
+        return stub.requisicoes
+
+    print(f"{'fase':<28}{'concluídas':>13}{'repetidas':>10}{'recusadas':>10}{'requisições':>12}"
+          f"{'p50 (s)':>9}{'p95 (s)':>9}")
+
+    inicio = zerar(1, 0)
+    resultados = executar_buscas("sem novas tentativas", args.buscas, args.concorrencia)
+    resumir("falhas, sem novas tentativas", resultados, chamador_openai, stub, inicio)
+
+    inicio = zerar(max_tentativas, limiar)
+    resultados = executar_buscas("com novas tentativas", args.buscas, args.concorrencia)
+    resumir("falhas, com novas tentativas", resultados, chamador_openai, stub, inicio)
+
+    stub.indisponivel = True
+    inicio = zerar(max_tentativas, limiar)
+    resultados = executar_buscas("indisponivel", args.buscas, args.concorrencia)
+    resumir("provedor indisponível", resultados, chamador_openai, stub, inicio)
+    print(f"  estado do circuito: {chamador_openai.disjuntor.estado}")
+
+    stub.indisponivel = False
+    stub.taxa_429 = stub.taxa_5xx = 0.0
+    time.sleep(args.tempo_abertura)
+    inicio = stub.requisicoes
+    chamador_openai.novas_tentativas = chamador_openai.recusadas = 0
+    # Enquanto a chamada de teste do circuito semiaberto não termina, as demais são recusadas
+    executar_buscas("teste do circuito", 1, 1)
+    resultados = executar_buscas("recuperado", args.buscas, args.concorrencia)
+    resumir("provedor recuperado", resultados, chamador_openai, stub, inicio)
+    print(f"  estado do circuito: {chamador_openai.disjuntor.estado}")
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
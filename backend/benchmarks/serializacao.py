@@ -0,0 +1,69 @@
+"""
+Tempo de CPU por requisição de GET /api/pesquisa/<id>/ e GET /api/historico/ com a
+serialização pelo DRF a cada leitura (antes) e com os snapshots das respostas (depois).
+
+O tempo é o de CPU do processo (time.process_time), que não inclui a espera pelo disco,
+medido com o cliente de testes do Django (middlewares e roteamento incluídos). Os
+snapshots são gerados antes das medições, como aconteceria ao final de cada pesquisa.
+
+Uso:
+    python -m benchmarks.serializacao --pesquisas 2000 --fontes 5 10 --requisicoes 200
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.ambiente import configurar_django
+from benchmarks.historico import popular
+
+
+def medir(cliente, urls):
+    tempos = []
+    for url in urls:
+        inicio = time.process_time()
+        resposta = cliente.get(url)
+        tempos.append(time.process_time() - inicio)
+        assert resposta.status_code == 200, resposta.status_code
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pesquisas", type=int, default=2000, help="Pesquisas no histórico")
+    parser.add_argument("--fontes", type=int, nargs="+", default=[5, 10], help="Fontes por pesquisa")
+    parser.add_argument("--requisicoes", type=int, default=200, help="Requisições medidas em cada caso")
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.test import Client, override_settings
+    from search_engine.models import FonteAcademica, PesquisaAcademica, SnapshotPesquisa
+    from search_engine.snapshots import gravar_snapshots
+
+    cliente = Client()
+    aleatorio = random.Random(0)
+    print(f"{'fontes':>7}{'requisição':>22}{'antes (ms CPU)':>16}{'depois (ms CPU)':>17}{'redução':>9}")
+    for fontes in args.fontes:
+        SnapshotPesquisa.objects.all().delete()
+        PesquisaAcademica.objects.all().delete()
+        FonteAcademica.objects.all().delete()
+        popular(0, args.pesquisas, fontes)
+        gravar_snapshots(list(PesquisaAcademica.objects.all()))
+
+        ids = list(PesquisaAcademica.objects.values_list("id", flat=True))
+        casos = [
+            ("detalhe", [f"/api/pesquisa/{aleatorio.choice(ids)}/" for _ in range(args.requisicoes)]),
+            ("histórico (20)", ["/api/historico/"] * args.requisicoes),
+            ("histórico (100)", ["/api/historico/?limite=100"] * (args.requisicoes // 5 or 1)),
+        ]
+        for nome, urls in casos:
+            with override_settings(HISTORICO_SNAPSHOTS_ATIVOS=False):
+                medir(cliente, urls[:5])  # aquecimento
+                antes = medir(cliente, urls)
+            medir(cliente, urls[:5])
+            depois = medir(cliente, urls)
+            print(f"{fontes:>7}{nome:>22}{antes * 1000:>16.2f}{depois * 1000:>17.2f}{antes / depois:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Servidor HTTP local com rotas de comportamento conhecido para a verificação de links.
+
+Rotas:
+    /ok/<qualquer>        200 com HTML
+    /pdf/<qualquer>       200 com um PDF mínimo
+    /redirecionar/<n>     302 para /ok/<n>
+    /inexistente/<n>      404
+    /erro/<n>             500
+    /lento/<segundos>     200 após o atraso indicado
+
+Uso:
+    python -m benchmarks.servidor_links --porta 8766
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ServidorLinks(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, latencia=0.0):
+        super().__init__(endereco, _HandlerLinks)
+        self.latencia = latencia
+        self.requisicoes = 0
+        self.conexoes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, porta = self.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar_em_thread(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.conexoes += 1
+        super().process_request(request, client_address)
+
+
+class _HandlerLinks(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, status, corpo=b"", content_type="text/html; charset=utf-8", cabecalhos=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(corpo)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        with self.server._lock:
+            self.server.requisicoes += 1
+        if self.server.latencia:
+            time.sleep(self.server.latencia)
+
+        partes = self.path.strip("/").split("/")
+        rota, argumento = partes[0], (partes[1] if len(partes) > 1 else "")
+
+        if rota == "ok":
+            self._responder(200, b"<html><body>ok</body></html>")
+        elif rota == "pdf":
+            self._responder(200, b"%PDF-1.4\n%%EOF\n", content_type="application/pdf")
+        elif rota == "redirecionar":
+            self._responder(302, cabecalhos={"Location": f"/ok/{argumento}"})
+        elif rota == "inexistente":
+            self._responder(404, b"nao encontrado")
+        elif rota == "lento":
+            time.sleep(float(argumento or 1))
+            self._responder(200, b"<html><body>lento</body></html>")
+        else:
+            self._responder(500, b"erro")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Atraso de cada resposta, em segundos")
+    args = parser.parse_args()
+
+    servidor = ServidorLinks((args.host, args.porta), args.latencia)
+    print(f"Servidor de links ouvindo em {servidor.base_url}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Mede o índice de similaridade de termos (MinHash/LSH) com muitos termos armazenados.
+
+Os termos são gerados combinando palavras de um vocabulário sintético. As consultas
+usam variações de termos indexados (palavras em outra ordem, palavras vazias e um erro
+de digitação), que devem ser encontradas, e termos inéditos, que não devem.
+
+Uso:
+    python -m benchmarks.similaridade --termos 200000 --consultas 2000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks.ambiente import configurar_django
+
+CONSOANTES = "bcdfghjlmnpqrstvxz"
+VOGAIS = "aeiou"
+SILABAS = [c + v + f for c in CONSOANTES for v in VOGAIS for f in ("", "", "", "r", "s", "n", "l")]
+
+
+def gerar_vocabulario(tamanho, aleatorio):
+    palavras = set()
+    while len(palavras) < tamanho:
+        palavras.add("".join(aleatorio.choice(SILABAS) for _ in range(aleatorio.randint(2, 4))))
+    return sorted(palavras)
+
+
+def gerar_termo(vocabulario, aleatorio):
+    return " ".join(aleatorio.sample(vocabulario, aleatorio.randint(2, 4)))
+
+
+def variar(termo, aleatorio):
+    """Embaralha as palavras, insere uma palavra vazia e troca uma letra da maior palavra."""
+    palavras = termo.split()
+    aleatorio.shuffle(palavras)
+    maior = max(range(len(palavras)), key=lambda i: len(palavras[i]))
+    palavra = palavras[maior]
+    posicao = aleatorio.randrange(1, len(palavra))
+    palavras[maior] = palavra[:posicao] + "x" + palavra[posicao + 1:]
+    palavras.insert(1, "de")
+    return " ".join(palavras)
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def medir(indice, consultas):
+    latencias = []
+    encontrados = 0
+    for consulta, esperado in consultas:
+        inicio = time.perf_counter()
+        resultado = indice.buscar(consulta)
+        latencias.append(time.perf_counter() - inicio)
+        if esperado is None:
+            encontrados += resultado is None
+        else:
+            encontrados += resultado is not None and resultado[0] == esperado
+    return latencias, encontrados / len(consultas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--termos", type=int, default=200000, help="Termos indexados")
+    parser.add_argument("--consultas", type=int, default=2000, help="Consultas de cada tipo")
+    parser.add_argument("--limiar", type=float, default=0.6)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    configurar_django()
+    from search_engine.normalizacao import normalizar_termo
+    from search_engine.similaridade import IndiceSimilaridade
+
+    aleatorio = random.Random(args.semente)
+    vocabulario = gerar_vocabulario(20000, aleatorio)
+    termos = list(dict.fromkeys(normalizar_termo(gerar_termo(vocabulario, aleatorio)) for _ in range(args.termos)))
+
+    indice = IndiceSimilaridade(limiar=args.limiar)
+    inicio = time.perf_counter()
+    indice.carregar(termos)
+    construcao = time.perf_counter() - inicio
+
+    # As consultas recebem o termo já normalizado, como em consultar_cache_busca
+    variacoes = [(normalizar_termo(variar(termo, aleatorio)), termo) for termo in aleatorio.sample(termos, args.consultas)]
+    ineditos = [normalizar_termo(gerar_termo(vocabulario, aleatorio)) for _ in range(args.consultas)]
+    ineditos = [(termo, None) for termo in ineditos if termo not in indice._termos]
+
+    print(f"{len(indice)} termos indexados em {construcao:.1f}s ({construcao / len(indice) * 1e6:.1f} µs/termo)")
+    print(f"LSH para o limiar {args.limiar}: {indice.bandas} bandas de {indice.linhas_por_banda} linhas, "
+          f"recall esperado no limiar de {indice.recall_esperado:.2%}")
+    print(f"{'consultas':>12} {'p50 (µs)':>10} {'p99 (µs)':>10} {'máx (µs)':>10} {'acerto':>8}")
+    for nome, consultas in (("variações", variacoes), ("inéditos", ineditos)):
+        latencias, acerto = medir(indice, consultas)
+        print(f"{nome:>12} {statistics.median(latencias) * 1e6:>10.1f} {percentil(latencias, 99) * 1e6:>10.1f} "
+              f"{max(latencias) * 1e6:>10.1f} {acerto:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
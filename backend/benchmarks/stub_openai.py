@@ -0,0 +1,243 @@
+"""
+Servidor local que imita o endpoint de chat completions da OpenAI.
+
+Responde com uma chamada de ferramenta web_search quando a requisição inclui
+`tools`, com um JSON de fontes quando pede `response_format=json_object` e com
+texto livre nos demais casos. A latência de cada resposta é configurável, o que
+permite medir o backend sem gastar créditos da API.
+
+Com `base_links`, os links das fontes apontam para o servidor de links
+(benchmarks.servidor_links), o que exercita também a verificação de links.
+
+Também pode injetar falhas: uma fração das requisições recebe 429 (com Retry-After) ou
+503, e o atributo `indisponivel` faz todas as requisições falharem com 503.
+
+Uso:
+    python -m benchmarks.stub_openai --porta 8765 --latencia 0.5
+    python -m benchmarks.stub_openai --taxa-429 0.2 --taxa-5xx 0.05 --retry-after 1
+    python -m benchmarks.stub_openai --base-links http://127.0.0.1:8766
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python manage.py runserver
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Rotas do servidor de links (benchmarks.servidor_links) usadas, em sequência, pelas fontes
+ROTAS_LINKS = ("ok", "pdf", "redirecionar", "ok", "inexistente")
+
+
+def _link_exemplo(i, base_links=None):
+    """
+    Link da i-ésima fonte de uma resposta.
+
+    Sem base_links, os links são sempre os mesmos endereços fictícios do SciELO. Com
+    base_links, apontam para o servidor de links, alternando entre as rotas de ROTAS_LINKS
+    (1 em cada 5 inacessível), e são únicos por resposta, de modo que cada busca grava
+    fontes novas, como acontece com a API real.
+    """
+    if base_links is None:
+        return f"https://www.scielo.br/j/exemplo/a/{i + 1}"
+    rota = ROTAS_LINKS[i % len(ROTAS_LINKS)]
+    return f"{base_links}/{rota}/{uuid.uuid4().hex[:12]}-{i + 1}"
+
+
+def _fontes_exemplo(quantidade=5, base_links=None):
+    return {"fontes": [
+        {
+            "titulo": f"Estudo de exemplo {i + 1}",
+            "autores": "Autor de exemplo",
+            "instituicao": "SciELO",
+            "ano_publicacao": 2020 + (i % 5),
+            "link": _link_exemplo(i, base_links),
+            "tipo_acesso": "Artigo",
+            "descricao": "Descrição sintética usada pelo servidor de testes."
+        }
+        for i in range(quantidade)
+    ]}
+
+
+def montar_resposta(corpo, fontes_por_resposta=5, base_links=None):
+    """Monta uma resposta no formato de chat.completion a partir da requisição recebida."""
+    mensagem = {"role": "assistant", "content": None}
+    if corpo.get("tools"):
+        argumentos = {"search_term": corpo["messages"][-1]["content"][:80]}
+        mensagem["tool_calls"] = [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": "web_search", "arguments": json.dumps(argumentos)},
+        }]
+        finish_reason = "tool_calls"
+    elif corpo.get("response_format", {}).get("type") == "json_object":
+        mensagem["content"] = json.dumps(_fontes_exemplo(fontes_por_resposta, base_links), ensure_ascii=False)
+        finish_reason = "stop"
+    else:
+        mensagem["content"] = "\n".join(
+            f"- Estudo de exemplo {i + 1}: {_link_exemplo(i, base_links)}"
+            for i in range(fontes_por_resposta)
+        )
+        finish_reason = "stop"
+
+    prompt_tokens = sum(len(str(m.get("content") or "")) for m in corpo.get("messages", [])) // 4
+    completion_tokens = len(str(mensagem.get("content") or mensagem.get("tool_calls"))) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": corpo.get("model", "gpt-4o"),
+        "choices": [{"index": 0, "message": mensagem, "finish_reason": finish_reason}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class ServidorStubOpenAI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, latencia=0.5, fontes_por_resposta=5, taxa_429=0.0, taxa_5xx=0.0, retry_after=None,
+                 base_links=None):
+        super().__init__(endereco, _HandlerStub)
+        self.latencia = latencia
+        self.fontes_por_resposta = fontes_por_resposta
+        self.taxa_429 = taxa_429
+        self.taxa_5xx = taxa_5xx
+        self.retry_after = retry_after
+        self.base_links = base_links
+        self.indisponivel = False
+        self.requisicoes = 0
+        self.falhas_injetadas = {429: 0, 503: 0}
+        self._lock = threading.Lock()
+
+    def sortear_falha(self):
+        """Status de erro a devolver para a próxima requisição ou None para responder normalmente."""
+        if self.indisponivel:
+            return 503
+        sorteio = random.random()
+        if sorteio < self.taxa_429:
+            return 429
+        if sorteio < self.taxa_429 + self.taxa_5xx:
+            return 503
+        return None
+
+    @property
+    def base_url(self):
+        host, porta = self.server_address[:2]
+        return f"http://{host}:{porta}/v1"
+
+    def iniciar_em_thread(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _HandlerStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length", 0))
+        corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+        falha = self.server.sortear_falha()
+        with self.server._lock:
+            self.server.requisicoes += 1
+            if falha:
+                self.server.falhas_injetadas[falha] += 1
+        if falha:
+            self._responder_erro(falha)
+            return
+        resposta = montar_resposta(corpo, self.server.fontes_por_resposta, self.server.base_links)
+        if corpo.get("stream"):
+            self._responder_stream(resposta, (corpo.get("stream_options") or {}).get("include_usage", False))
+            return
+        time.sleep(self.server.latencia)
+
+        dados = json.dumps(resposta).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _responder_erro(self, status):
+        """Erro no formato da API; 429 inclui Retry-After quando configurado."""
+        tipo = "rate_limit_exceeded" if status == 429 else "server_error"
+        dados = json.dumps({"error": {"message": f"Falha injetada pelo stub ({status})", "type": tipo, "code": None}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        if status == 429 and self.server.retry_after is not None:
+            self.send_header("Retry-After", f"{self.server.retry_after:g}")
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _responder_stream(self, resposta, incluir_uso=False, tamanho_pedaco=24):
+        """
+        Envia o conteúdo em chunks SSE, distribuindo a latência configurada entre eles. Com
+        incluir_uso (stream_options.include_usage), um último chunk sem choices traz o usage.
+        """
+        conteudo = resposta["choices"][0]["message"]["content"] or ""
+        pedacos = [conteudo[i:i + tamanho_pedaco] for i in range(0, len(conteudo), tamanho_pedaco)] or [""]
+        atraso = self.server.latencia / len(pedacos)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for pedaco in pedacos:
+            time.sleep(atraso)
+            chunk = {
+                "id": resposta["id"],
+                "object": "chat.completion.chunk",
+                "created": resposta["created"],
+                "model": resposta["model"],
+                "choices": [{"index": 0, "delta": {"content": pedaco}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        if incluir_uso:
+            chunk = {
+                "id": resposta["id"],
+                "object": "chat.completion.chunk",
+                "created": resposta["created"],
+                "model": resposta["model"],
+                "choices": [],
+                "usage": resposta["usage"],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.5, help="Atraso de cada resposta, em segundos")
+    parser.add_argument("--fontes", type=int, default=5, help="Fontes retornadas em cada resposta JSON")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="Fração das requisições respondidas com 429")
+    parser.add_argument("--taxa-5xx", type=float, default=0.0, help="Fração das requisições respondidas com 503")
+    parser.add_argument("--retry-after", type=float, default=None, help="Valor do Retry-After nas respostas 429")
+    parser.add_argument("--base-links", default=None,
+                        help="URL do servidor de links para os links das fontes (ex.: http://127.0.0.1:8766)")
+    args = parser.parse_args()
+
+    servidor = ServidorStubOpenAI((args.host, args.porta), args.latencia, args.fontes,
+                                  args.taxa_429, args.taxa_5xx, args.retry_after, args.base_links)
+    print(f"Stub OpenAI ouvindo em {servidor.base_url}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Compara a vazão de buscas concorrentes entre a implantação WSGI (gunicorn, workers
+síncronos, endpoint /api/pesquisa/) e a ASGI (uvicorn, endpoint /api/pesquisa/async/).
+
+As chamadas à OpenAI são atendidas por benchmarks.stub_openai com latência fixa, e
+cada requisição usa um termo diferente para não ser atendida pelo cache de buscas.
+
+Uso:
+    python -m benchmarks.wsgi_vs_asgi --concorrencia 50 --latencia 0.5 --workers 2
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.stub_openai import ServidorStubOpenAI
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def aguardar_servidor(porta, timeout=20):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            with socket.create_connection(("127.0.0.1", porta), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Servidor na porta {porta} não respondeu em {timeout}s")
+
+
+def enviar_pesquisa(url, termo):
+    corpo = json.dumps({"termo": termo}).encode()
+    requisicao = urllib.request.Request(url, data=corpo, headers={"Content-Type": "application/json"})
+    inicio = time.perf_counter()
+    with urllib.request.urlopen(requisicao, timeout=300) as resposta:
+        resposta.read()
+    return time.perf_counter() - inicio
+
+
+def medir(url, concorrencia, prefixo):
+    termos = [f"{prefixo} tema {i}" for i in range(concorrencia)]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        latencias = list(executor.map(lambda termo: enviar_pesquisa(url, termo), termos))
+    duracao = time.perf_counter() - inicio
+    return {
+        "requisicoes": concorrencia,
+        "duracao_s": round(duracao, 3),
+        "vazao_rps": round(concorrencia / duracao, 2),
+        "latencia_p50_s": round(statistics.median(latencias), 3),
+        "latencia_max_s": round(max(latencias), 3),
+    }
+
+
+def executar_servidor(comando, ambiente, porta):
+    processo = subprocess.Popen(comando, cwd=BACKEND_DIR, env=ambiente,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        aguardar_servidor(porta)
+    except Exception:
+        processo.kill()
+        raise
+    return processo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concorrencia", type=int, default=50, help="Buscas disparadas simultaneamente")
+    parser.add_argument("--latencia", type=float, default=0.5, help="Latência de cada chamada ao stub, em segundos")
+    parser.add_argument("--workers", type=int, default=2, help="Processos do servidor em cada implantação")
+    args = parser.parse_args()
+
+    stub = ServidorStubOpenAI(("127.0.0.1", 0), latencia=args.latencia).iniciar_em_thread()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        ambiente = dict(
+            os.environ,
+            OPENAI_API_KEY="stub",
+            OPENAI_BASE_URL=stub.base_url,
+            SQLITE_PATH=os.path.join(diretorio, "bench.sqlite3"),
+            BUSCA_CACHE_TTL="0",
+            # Os links do stub são fictícios; a verificação é medida à parte
+            BUSCA_VERIFICAR_LINKS="False",
+            # Sem o limitador local de taxa, que dominaria a medição
+            OPENAI_LIMITE_REQUISICOES_MINUTO="0",
+            OPENAI_LIMITE_TOKENS_MINUTO="0",
+            ALLOWED_HOSTS="127.0.0.1,localhost",
+            DEBUG="False",
+        )
+        subprocess.run([sys.executable, "manage.py", "migrate", "--verbosity", "0"],
+                       cwd=BACKEND_DIR, env=ambiente, check=True)
+
+        implantacoes = [
+            ("WSGI (gunicorn sync)", "/api/pesquisa/",
+             ["gunicorn", "config.wsgi", "--workers", str(args.workers), "--timeout", "300"]),
+            ("ASGI (uvicorn)", "/api/pesquisa/async/",
+             ["uvicorn", "config.asgi:application", "--workers", str(args.workers), "--log-level", "warning"]),
+        ]
+
+        for nome, caminho, comando in implantacoes:
+            porta = porta_livre()
+            if comando[0] == "gunicorn":
+                comando = comando + ["--bind", f"127.0.0.1:{porta}"]
+            else:
+                comando = comando + ["--host", "127.0.0.1", "--port", str(porta)]
+
+            processo = executar_servidor(comando, ambiente, porta)
+            try:
+                resultado = medir(f"http://127.0.0.1:{porta}{caminho}", args.concorrencia, nome.split()[0])
+            finally:
+                processo.terminate()
+                processo.wait(timeout=10)
+            print(f"{nome:<22} {json.dumps(resultado)}")
+
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -64,6 +64,11 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# Cabeçalhos expostos ao frontend
+CORS_EXPOSE_HEADERS = [
+    'x-cache-busca',
+]
+
 # Configuração de métodos CORS permitidos
 CORS_ALLOW_METHODS = [
     'DELETE',
@@ -98,10 +103,21 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Perfil de concorrência do SQLite
+# "padrao" mantém o comportamento do Django. "producao" liga WAL, synchronous=NORMAL,
+# busy_timeout (s), mmap (MB) e cache de páginas (MB) em cada conexão e faz as gravações
+# do pipeline passarem por uma fila única de escrita por processo.
+SQLITE_PERFIL = os.getenv('SQLITE_PERFIL', 'padrao')
+SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', '20'))
+SQLITE_MMAP_MB = int(os.getenv('SQLITE_MMAP_MB', '256'))
+SQLITE_CACHE_MB = int(os.getenv('SQLITE_CACHE_MB', '64'))
+if SQLITE_PERFIL == 'producao':
+    DATABASES['default']['OPTIONS'] = {'timeout': SQLITE_BUSY_TIMEOUT}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -133,4 +149,138 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # OpenAI API settings
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY') 
\ No newline at end of file
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY') 
+
+# Limites e resiliência das chamadas à OpenAI
+# Requisições e tokens por minuto do limitador local (0, o padrão, desativa; use a cota
+# da conta na OpenAI), tokens de resposta estimados por chamada, novas tentativas de
+# erros temporários (429, 5xx e conexão) com espera exponencial em segundos e circuit
+# breaker: falhas seguidas que abrem o circuito e tempo (s) em que as chamadas são
+# recusadas antes de uma chamada de teste.
+OPENAI_LIMITE_REQUISICOES_MINUTO = int(os.getenv('OPENAI_LIMITE_REQUISICOES_MINUTO', '0'))
+OPENAI_LIMITE_TOKENS_MINUTO = int(os.getenv('OPENAI_LIMITE_TOKENS_MINUTO', '0'))
+OPENAI_TOKENS_RESPOSTA_ESTIMADOS = int(os.getenv('OPENAI_TOKENS_RESPOSTA_ESTIMADOS', '800'))
+OPENAI_MAX_TENTATIVAS = int(os.getenv('OPENAI_MAX_TENTATIVAS', '4'))
+OPENAI_ESPERA_BASE = float(os.getenv('OPENAI_ESPERA_BASE', '0.5'))
+OPENAI_ESPERA_MAXIMA = float(os.getenv('OPENAI_ESPERA_MAXIMA', '20'))
+OPENAI_CIRCUITO_LIMIAR_FALHAS = int(os.getenv('OPENAI_CIRCUITO_LIMIAR_FALHAS', '5'))
+OPENAI_CIRCUITO_TEMPO_ABERTURA = float(os.getenv('OPENAI_CIRCUITO_TEMPO_ABERTURA', '30'))
+
+# Cache em disco das completions, indexado pelo hash dos parâmetros de cada chamada
+# Modos: "desativado", "ativo" (serve respostas gravadas e grava as novas), "gravar" (sempre
+# chama a API e grava) e "reproduzir" (só serve do cache, para execuções determinísticas de
+# benchmarks e regressões). Acima do tamanho máximo (MB) as entradas menos usadas são removidas.
+OPENAI_CACHE_MODO = os.getenv('OPENAI_CACHE_MODO', 'desativado')
+OPENAI_CACHE_DIR = os.getenv('OPENAI_CACHE_DIR', BASE_DIR / 'cache_completions')
+OPENAI_CACHE_MAX_MB = int(os.getenv('OPENAI_CACHE_MAX_MB', '200'))
+
+# Cache de resultados de busca (tempos em segundos)
+# Dentro do TTL a busca é servida do cache; na janela obsoleta seguinte ela ainda é
+# servida imediatamente, mas uma nova busca é disparada em segundo plano.
+BUSCA_CACHE_TTL = int(os.getenv('BUSCA_CACHE_TTL', '3600'))
+BUSCA_CACHE_JANELA_OBSOLETA = int(os.getenv('BUSCA_CACHE_JANELA_OBSOLETA', '86400'))
+BUSCA_CACHE_MAX_ENTRADAS = int(os.getenv('BUSCA_CACHE_MAX_ENTRADAS', '1024'))
+
+# Aquecimento do cache (comando aquecer_cache)
+# Refaz fora do horário de pico as buscas dos AQUECIMENTO_TERMOS termos com maior demanda
+# prevista no histórico: a frequência em AQUECIMENTO_JANELA_DIAS combinada com a dos últimos
+# AQUECIMENTO_JANELA_RECENTE_DIAS (termos em alta). Até AQUECIMENTO_PARALELAS buscas rodam ao
+# mesmo tempo e a execução para ao atingir AQUECIMENTO_ORCAMENTO_TOKENS (0 = sem limite).
+# AQUECIMENTO_HORARIO (HH:MM, horário local) é usado por aquecer_cache --agendar.
+AQUECIMENTO_TERMOS = int(os.getenv('AQUECIMENTO_TERMOS', '200'))
+AQUECIMENTO_JANELA_DIAS = int(os.getenv('AQUECIMENTO_JANELA_DIAS', '30'))
+AQUECIMENTO_JANELA_RECENTE_DIAS = int(os.getenv('AQUECIMENTO_JANELA_RECENTE_DIAS', '3'))
+AQUECIMENTO_PARALELAS = int(os.getenv('AQUECIMENTO_PARALELAS', '4'))
+AQUECIMENTO_ORCAMENTO_TOKENS = int(os.getenv('AQUECIMENTO_ORCAMENTO_TOKENS', '500000'))
+AQUECIMENTO_HORARIO = os.getenv('AQUECIMENTO_HORARIO', '04:00')
+
+# Pesquisas em segundo plano (modo job)
+# Quantidade de workers do pool local, intervalo (s) em que workers ociosos consultam a fila,
+# prazo (s) após o qual uma pesquisa em execução é considerada abandonada e volta para a fila
+# e limite de pesquisas pendentes aceitas antes de recusar novas requisições.
+BUSCA_JOBS_WORKERS = int(os.getenv('BUSCA_JOBS_WORKERS', '4'))
+BUSCA_JOBS_INTERVALO_CONSULTA = float(os.getenv('BUSCA_JOBS_INTERVALO_CONSULTA', '5'))
+BUSCA_JOBS_PRAZO_EXECUCAO = int(os.getenv('BUSCA_JOBS_PRAZO_EXECUCAO', '600'))
+BUSCA_JOBS_MAX_PENDENTES = int(os.getenv('BUSCA_JOBS_MAX_PENDENTES', '100'))
+
+# Retenção do histórico (comando arquivar_pesquisas)
+# Pesquisas concluídas ou com falha há mais de RETENCAO_DIAS (e sem acesso nesse período)
+# têm as fontes movidas para arquivos JSONL compactados com gzip, um por mês, em
+# RETENCAO_DIR; no banco fica apenas a pesquisa com a posição do registro no arquivo.
+# RETENCAO_LOTE é a quantidade de pesquisas arquivadas por transação e
+# RETENCAO_INTERVALO_HORAS o intervalo entre as execuções de arquivar_pesquisas --continuo.
+RETENCAO_DIAS = int(os.getenv('RETENCAO_DIAS', '180'))
+RETENCAO_DIR = os.getenv('RETENCAO_DIR', BASE_DIR / 'arquivo_pesquisas')
+RETENCAO_LOTE = int(os.getenv('RETENCAO_LOTE', '200'))
+RETENCAO_INTERVALO_HORAS = float(os.getenv('RETENCAO_INTERVALO_HORAS', '24'))
+
+# Quantidade padrão de pesquisas por página do histórico (máximo de 100 via ?limite=)
+HISTORICO_TAMANHO_PAGINA = int(os.getenv('HISTORICO_TAMANHO_PAGINA', '20'))
+
+# Snapshots das respostas do histórico
+# A resposta de cada pesquisa concluída ou com falha é renderizada uma vez, quando a pesquisa
+# termina, e guardada no banco; GET /api/historico/ e GET /api/pesquisa/<id>/ passam a servir
+# esse JSON pronto em vez de serializar a pesquisa e as fontes a cada leitura. O snapshot é
+# descartado quando uma fonte da pesquisa é alterada e quando a pesquisa é arquivada.
+HISTORICO_SNAPSHOTS_ATIVOS = os.getenv('HISTORICO_SNAPSHOTS_ATIVOS', 'True') == 'True'
+
+# Pesquisas lidas do banco por vez na exportação do histórico (GET /api/historico/exportar/)
+HISTORICO_EXPORTACAO_LOTE = int(os.getenv('HISTORICO_EXPORTACAO_LOTE', '500'))
+
+# Verificação dos links das fontes
+# Links inacessíveis são descartados. As verificações rodam em paralelo (limitadas por host)
+# dentro de um prazo global para a etapa, e o resultado fica em cache no banco pelo TTL
+# (mais curto para links que falharam).
+BUSCA_VERIFICAR_LINKS = os.getenv('BUSCA_VERIFICAR_LINKS', 'True') == 'True'
+BUSCA_VERIFICACAO_WORKERS = int(os.getenv('BUSCA_VERIFICACAO_WORKERS', '16'))
+BUSCA_VERIFICACAO_POR_HOST = int(os.getenv('BUSCA_VERIFICACAO_POR_HOST', '2'))
+BUSCA_VERIFICACAO_PRAZO = float(os.getenv('BUSCA_VERIFICACAO_PRAZO', '5'))
+BUSCA_VERIFICACAO_TIMEOUT = float(os.getenv('BUSCA_VERIFICACAO_TIMEOUT', '3'))
+BUSCA_VERIFICACAO_TTL = int(os.getenv('BUSCA_VERIFICACAO_TTL', '86400'))
+BUSCA_VERIFICACAO_TTL_FALHA = int(os.getenv('BUSCA_VERIFICACAO_TTL_FALHA', '3600'))
+
+# Busca no índice local de fontes (FTS5, apenas SQLite)
+# Com a busca local ativa, o modelo só é chamado quando o índice encontra menos de
+# BUSCA_LOCAL_MIN_FONTES fontes com todas as palavras do termo; até BUSCA_LOCAL_MAX_FONTES
+# fontes são usadas na resposta. BUSCA_LOCAL_PADRAO define o padrão do campo busca_local.
+BUSCA_LOCAL_PADRAO = os.getenv('BUSCA_LOCAL_PADRAO', 'False') == 'True'
+BUSCA_LOCAL_MIN_FONTES = int(os.getenv('BUSCA_LOCAL_MIN_FONTES', '5'))
+BUSCA_LOCAL_MAX_FONTES = int(os.getenv('BUSCA_LOCAL_MAX_FONTES', '10'))
+
+# Ranqueamento local das fontes de cada pesquisa
+# As fontes são ordenadas por uma pontuação de 0 a 1 que combina a relevância do título e
+# da descrição em relação ao termo (BM25) com a confiança do domínio do link (domínios
+# acadêmicos conhecidos, universidades e institutos). BUSCA_RANQUEAMENTO_PESO_CONFIANCA é o
+# peso da confiança na pontuação; o restante é o da relevância.
+BUSCA_RANQUEAMENTO_ATIVO = os.getenv('BUSCA_RANQUEAMENTO_ATIVO', 'True') == 'True'
+BUSCA_RANQUEAMENTO_PESO_CONFIANCA = float(os.getenv('BUSCA_RANQUEAMENTO_PESO_CONFIANCA', '0.3'))
+
+# Reaproveitamento de buscas de termos similares
+# Sem resultado em cache para o termo, é usado o de um termo já pesquisado cuja
+# similaridade (Jaccard dos trigramas de caracteres, de 0 a 1) atinja o limiar. As bandas
+# do índice MinHash/LSH são ajustadas ao limiar para que pelo menos 99% dos termos com
+# similaridade igual a ele sejam encontrados (os mais parecidos, com ainda mais frequência).
+# O índice fica na memória de cada processo e inclui, a cada BUSCA_SIMILARIDADE_ATUALIZACAO
+# segundos (0 desativa), os termos concluídos por outros processos.
+BUSCA_SIMILARIDADE_ATIVA = os.getenv('BUSCA_SIMILARIDADE_ATIVA', 'True') == 'True'
+BUSCA_SIMILARIDADE_LIMIAR = float(os.getenv('BUSCA_SIMILARIDADE_LIMIAR', '0.75'))
+BUSCA_SIMILARIDADE_ATUALIZACAO = int(os.getenv('BUSCA_SIMILARIDADE_ATUALIZACAO', '60'))
+
+# Pesquisa em lote (POST /api/pesquisa/lote/)
+# Quantidade máxima de termos por requisição e de buscas executadas ao mesmo tempo.
+BUSCA_LOTE_MAX_TERMOS = int(os.getenv('BUSCA_LOTE_MAX_TERMOS', '50'))
+BUSCA_LOTE_MAX_PARALELAS = int(os.getenv('BUSCA_LOTE_MAX_PARALELAS', '8'))
+
+# Coalescência de buscas simultâneas do mesmo termo (single-flight)
+# Requisições idênticas (mesmo termo normalizado) aguardam a busca já em andamento em vez de
+# chamar o modelo de novo: no processo e, via trava de arquivo em BUSCA_COALESCENCIA_DIR
+# (padrão: diretório temporário do sistema), entre processos. BUSCA_COALESCENCIA_ESPERA é
+# o tempo máximo (s) de espera antes de executar a busca mesmo assim.
+BUSCA_COALESCENCIA_ATIVA = os.getenv('BUSCA_COALESCENCIA_ATIVA', 'True') == 'True'
+BUSCA_COALESCENCIA_DIR = os.getenv('BUSCA_COALESCENCIA_DIR', '')
+BUSCA_COALESCENCIA_ESPERA = float(os.getenv('BUSCA_COALESCENCIA_ESPERA', '180'))
+
+# Pipeline de chamadas ao modelo usado nas novas buscas
+# "tres_chamadas": gera o termo de busca, os resultados e extrai as fontes em chamadas separadas
+# "chamada_unica": expande o termo e devolve as fontes estruturadas em uma só completion JSON
+BUSCA_MODO_PIPELINE = os.getenv('BUSCA_MODO_PIPELINE', 'tres_chamadas')
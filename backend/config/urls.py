@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
+from search_engine.views import MetricasView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('search_engine.urls')),
+    path('metrics', MetricasView.as_view(), name='metricas'),
 ] 
\ No newline at end of file
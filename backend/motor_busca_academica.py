@@ -3,6 +3,8 @@ from openai import OpenAI
 import time
 import sys
 import json
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 
 # Carregar variáveis de ambiente do arquivo .env
@@ -211,9 +213,213 @@ def interface_usuario():
         print("   Exemplo: ao invés de 'câncer', tente 'imunoterapia para câncer de pulmão'")
         print("="*70)
 
-if __name__ == "__main__":
+def configurar_django():
+    """
+    Inicializa o Django para que o modo em lote use o mesmo pipeline da API
+    (search_engine/services.py), gravando as pesquisas e as fontes no banco do projeto.
+    """
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    if diretorio not in sys.path:
+        sys.path.insert(0, diretorio)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    # Várias threads gravam ao mesmo tempo: WAL e fila única de escrita (ver SQLITE_PERFIL)
+    os.environ.setdefault("SQLITE_PERFIL", "producao")
+    import django
+    django.setup()
+
+def ler_termos(arquivo):
+    """
+    Lê os termos de um arquivo, um por linha, sem carregá-lo inteiro na memória.
+    
+    Linhas vazias e comentários (iniciados por #) são ignorados.
+    
+    Yields:
+        Tuplas (número da linha, termo)
+    """
+    for numero, linha in enumerate(arquivo, start=1):
+        termo = linha.strip()
+        if termo and not termo.startswith("#"):
+            yield numero, termo
+
+def termos_concluidos(caminho):
+    """
+    Termos (normalizados) já concluídos em uma saída JSONL anterior do modo em lote.
+    
+    Se a execução anterior foi interrompida no meio de uma linha, a linha incompleta é
+    removida do arquivo, para que os resultados acrescentados a ele (>>) comecem em uma
+    linha nova.
+    
+    Args:
+        caminho: Arquivo JSONL gravado pelo modo em lote
+        
+    Returns:
+        Conjunto de termos normalizados
+    """
+    from search_engine.normalizacao import normalizar_termo
+    
+    concluidos = set()
+    if not os.path.exists(caminho):
+        return concluidos
+    with open(caminho, "rb+") as arquivo:
+        conteudo = arquivo.read()
+        if conteudo and not conteudo.endswith(b"\n"):
+            arquivo.truncate(conteudo.rfind(b"\n") + 1)
+    with open(caminho, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                continue
+            if registro.get("status") == "concluida" and registro.get("entrada"):
+                concluidos.add(normalizar_termo(registro["entrada"]))
+    return concluidos
+
+def buscar_termo_lote(termo, modo=None, usar_cache=False):
+    """
+    Executa a busca de um termo pelo pipeline da API, em uma thread do modo em lote.
+    
+    Args:
+        termo: O tema a ser pesquisado
+        modo: Pipeline de chamadas ao modelo; por padrão, BUSCA_MODO_PIPELINE
+        usar_cache: Se True, reaproveita resultados recentes (buscar_com_cache)
+        
+    Returns:
+        Dicionário com os dados da pesquisa no formato da API (fontes, fontes rejeitadas,
+        status e erro) ou, se a busca levantou uma exceção, com status "falhou" e o erro
+    """
+    from django.db import connection
+    from search_engine.services import buscar_com_cache, realizar_busca_academica
+    from search_engine.views import dados_resposta_pesquisa
+    
     try:
+        if usar_cache:
+            pesquisa, estado = buscar_com_cache(termo, modo=modo)
+            dados = dados_resposta_pesquisa(pesquisa)
+            dados["cache"] = estado
+        else:
+            dados = dados_resposta_pesquisa(realizar_busca_academica(termo, modo))
+        return dados
+    except Exception as e:
+        return {"status": "falhou", "erro": str(e)}
+    finally:
+        # A thread não pertence ao ciclo de requisição do Django, então fecha a própria conexão
+        connection.close()
+
+def busca_em_lote(termos, saida, paralelas, modo=None, usar_cache=False, concluidos=()):
+    """
+    Busca vários termos em paralelo e grava cada resultado em JSONL assim que ele termina.
+    
+    Os termos são lidos aos poucos, com no máximo o dobro de `paralelas` aguardando, e
+    termos repetidos (após a normalização) ou já concluídos são pulados. Cada linha da
+    saída traz o termo de entrada (entrada) e a linha dele (linha), já que os resultados
+    saem na ordem em que terminam.
+    
+    Args:
+        termos: Iterável de tuplas (número da linha, termo), como o de ler_termos
+        saida: Arquivo de texto onde as linhas JSON são gravadas
+        paralelas: Quantidade máxima de buscas simultâneas
+        modo: Pipeline de chamadas ao modelo
+        usar_cache: Se True, reaproveita resultados recentes
+        concluidos: Termos normalizados a pular (ver termos_concluidos)
+        
+    Returns:
+        Dicionário com a quantidade de termos concluídos, com falha, repetidos e pulados
+    """
+    from search_engine.normalizacao import normalizar_termo
+    
+    resumo = {"concluidos": 0, "falharam": 0, "repetidos": 0, "pulados": 0}
+    vistos = set(concluidos)
+    em_andamento = {}
+    
+    def gravar(registro):
+        resumo["concluidos" if registro["status"] == "concluida" else "falharam"] += 1
+        saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        saida.flush()
+    
+    def gravar_terminadas(bloquear):
+        if not em_andamento:
+            return
+        terminadas, _ = wait(em_andamento, timeout=None if bloquear else 0, return_when=FIRST_COMPLETED)
+        for futuro in terminadas:
+            numero, termo, inicio = em_andamento.pop(futuro)
+            gravar({"linha": numero, "entrada": termo, **futuro.result(),
+                    "duracao": round(time.perf_counter() - inicio, 3)})
+    
+    executor = ThreadPoolExecutor(max_workers=paralelas, thread_name_prefix="lote")
+    try:
+        for numero, termo in termos:
+            chave = normalizar_termo(termo)
+            if chave in vistos:
+                resumo["pulados" if chave in concluidos else "repetidos"] += 1
+                continue
+            vistos.add(chave)
+            if not 3 <= len(termo) <= 255:
+                gravar({"linha": numero, "entrada": termo, "status": "falhou",
+                        "erro": "O termo de pesquisa deve ter entre 3 e 255 caracteres."})
+                continue
+            gravar_terminadas(bloquear=len(em_andamento) >= 2 * paralelas)
+            futuro = executor.submit(buscar_termo_lote, termo, modo, usar_cache)
+            em_andamento[futuro] = (numero, termo, time.perf_counter())
+        while em_andamento:
+            gravar_terminadas(bloquear=True)
+    finally:
+        # Interrompido: as buscas ainda na fila são descartadas (e refeitas ao retomar)
+        executor.shutdown(wait=True, cancel_futures=True)
+    return resumo
+
+def modo_lote(args):
+    """
+    Modo em lote: lê os termos de um arquivo (ou da entrada padrão, com "-") e grava os
+    resultados em JSONL na saída padrão. As mensagens de andamento vão para a saída de erros.
+    """
+    configurar_django()
+    from django.conf import settings
+    
+    concluidos = termos_concluidos(args.retomar) if args.retomar else set()
+    if concluidos:
+        print(f"Retomando: {len(concluidos)} termos já concluídos em {args.retomar}", file=sys.stderr)
+    paralelas = max(1, args.paralelas or settings.BUSCA_LOTE_MAX_PARALELAS)
+    
+    inicio = time.perf_counter()
+    arquivo = sys.stdin if args.lote == "-" else open(args.lote, encoding="utf-8")
+    try:
+        resumo = busca_em_lote(ler_termos(arquivo), sys.stdout, paralelas, modo=args.modo,
+                               usar_cache=args.cache, concluidos=concluidos)
+    finally:
+        if arquivo is not sys.stdin:
+            arquivo.close()
+    duracao = time.perf_counter() - inicio
+    print(f"{resumo['concluidos']} termos concluídos, {resumo['falharam']} com falha, "
+          f"{resumo['repetidos']} repetidos e {resumo['pulados']} já concluídos antes, "
+          f"em {duracao:.1f}s com {paralelas} buscas em paralelo", file=sys.stderr)
+    return 1 if resumo["falharam"] else 0
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Motor de busca acadêmica. Sem argumentos, abre a interface interativa.",
+        epilog="Exemplo: python motor_busca_academica.py --lote termos.txt --retomar saida.jsonl >> saida.jsonl",
+    )
+    parser.add_argument("--lote", metavar="ARQUIVO",
+                        help="Busca os termos do arquivo (um por linha; \"-\" para a entrada padrão) "
+                             "e grava os resultados em JSONL na saída padrão")
+    parser.add_argument("--paralelas", type=int,
+                        help="Buscas simultâneas no modo em lote (padrão: BUSCA_LOTE_MAX_PARALELAS)")
+    parser.add_argument("--modo", choices=["tres_chamadas", "chamada_unica"],
+                        help="Pipeline de chamadas ao modelo (padrão: BUSCA_MODO_PIPELINE)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reaproveita resultados recentes do cache de buscas em vez de sempre buscar de novo")
+    parser.add_argument("--retomar", metavar="SAIDA",
+                        help="Pula os termos já concluídos nesta saída JSONL de uma execução anterior")
+    args = parser.parse_args()
+    
+    if args.lote is None:
         interface_usuario()
+        return 0
+    return modo_lote(args)
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
     except KeyboardInterrupt:
-        print("\n\nPrograma interrompido pelo usuário. Até a próxima!")
+        print("\n\nPrograma interrompido pelo usuário. Até a próxima!", file=sys.stderr)
         sys.exit(0) 
\ No newline at end of file
@@ -3,4 +3,18 @@ from django.apps import AppConfig
 
 class SearchEngineConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'search_engine' 
\ No newline at end of file
+    name = 'search_engine'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+
+        from .banco import configurar_conexao_sqlite
+        from .models import FonteAcademica, PesquisaFonte
+        from .snapshots import invalidar_por_fonte, invalidar_por_item
+
+        connection_created.connect(configurar_conexao_sqlite, dispatch_uid='search_engine.configurar_conexao_sqlite')
+        # Snapshots das respostas: descartados quando as fontes de uma pesquisa mudam
+        post_save.connect(invalidar_por_fonte, sender=FonteAcademica, dispatch_uid='search_engine.invalidar_por_fonte')
+        post_save.connect(invalidar_por_item, sender=PesquisaFonte, dispatch_uid='search_engine.invalidar_por_item_salvo')
+        post_delete.connect(invalidar_por_item, sender=PesquisaFonte, dispatch_uid='search_engine.invalidar_por_item_removido')
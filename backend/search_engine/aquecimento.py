@@ -0,0 +1,197 @@
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .cache import CACHE_HIT, CACHE_STALE, cache_buscas
+from .cache_completions import renovar_respostas
+from .metricas import contar_tokens
+from .models import PesquisaAcademica
+from .services import realizar_busca_academica
+
+logger = logging.getLogger(__name__)
+
+# Estado dos termos que não chegaram a ser buscados por falta de orçamento de tokens
+SEM_ORCAMENTO = 'sem_orcamento'
+
+
+class AquecedorCache:
+    """
+    Aquecimento do cache de buscas com os termos de maior demanda prevista no histórico.
+
+    A demanda prevista de um termo (buscas por dia) é a média entre a frequência dele em
+    toda a janela e a frequência nos últimos dias, de forma que tanto os termos sempre
+    procurados quanto os que entraram em alta recentemente fiquem no topo. As pesquisas
+    feitas pelo próprio aquecimento não contam como demanda.
+
+    Os termos cujo resultado ainda está dentro do TTL são mantidos; os demais (obsoletos
+    ou fora do cache) são buscados de novo com realizar_busca_academica, com até
+    `paralelas` buscas ao mesmo tempo e até `orcamento_tokens` tokens por execução.
+    """
+
+    def __init__(self, janela_dias, janela_recente_dias, paralelas, orcamento_tokens):
+        self.janela_dias = janela_dias
+        self.janela_recente_dias = janela_recente_dias
+        self.paralelas = paralelas
+        self.orcamento_tokens = orcamento_tokens
+
+    def _demanda(self):
+        """Pesquisas dos usuários na janela e o filtro das feitas nos últimos dias."""
+        agora = timezone.now()
+        pesquisas = PesquisaAcademica.objects.filter(
+            data_pesquisa__gte=agora - timedelta(days=self.janela_dias), aquecimento=False,
+        ).exclude(termo_normalizado='')
+        recentes = Q(data_pesquisa__gte=agora - timedelta(days=self.janela_recente_dias))
+        return pesquisas, recentes
+
+    def termos_populares(self, limite):
+        """
+        Termos normalizados com maior demanda prevista.
+
+        Returns:
+            Lista de dicionários (chave, termo na grafia mais recente, total na janela,
+            recentes e demanda prevista), da maior para a menor demanda
+        """
+        pesquisas, recentes = self._demanda()
+        grafia = pesquisas.filter(termo_normalizado=OuterRef('termo_normalizado')).order_by('-data_pesquisa', '-id')
+        linhas = (
+            pesquisas.order_by()
+            .values('termo_normalizado')
+            .annotate(total=Count('id'), recentes=Count('id', filter=recentes))
+            .annotate(demanda=(
+                F('total') * 1.0 / self.janela_dias + F('recentes') * 1.0 / self.janela_recente_dias
+            ) / 2)
+            .annotate(termo=Subquery(grafia.values('termo')[:1]))
+            .order_by('-demanda', 'termo_normalizado')[:limite]
+        )
+        return [
+            {'chave': linha['termo_normalizado'], 'termo': linha['termo'], 'total': linha['total'],
+             'recentes': linha['recentes'], 'demanda': linha['demanda']}
+            for linha in linhas
+        ]
+
+    def demanda_total(self):
+        """Demanda prevista (buscas por dia) somando todos os termos da janela."""
+        pesquisas, recentes = self._demanda()
+        contagem = pesquisas.aggregate(total=Count('id'), recentes=Count('id', filter=recentes))
+        return (contagem['total'] / self.janela_dias + contagem['recentes'] / self.janela_recente_dias) / 2
+
+    @staticmethod
+    def taxa_de_acerto(candidatos, estado, demanda_total):
+        """
+        Fração da demanda total prevista que seria servida imediatamente pelo cache (HIT ou
+        STALE), considerando apenas o estado dos candidatos na chave `estado`.
+        """
+        if not demanda_total:
+            return 0.0
+        atendida = sum(c['demanda'] for c in candidatos if c[estado] in (CACHE_HIT, CACHE_STALE))
+        return atendida / demanda_total
+
+    def avaliar(self, limite):
+        """
+        Termos mais procurados com o estado atual do cache de cada um (chave 'antes'), sem buscá-los.
+
+        Returns:
+            Dicionário com os candidatos, a demanda total e a taxa de acerto prevista
+        """
+        candidatos = self.termos_populares(limite)
+        demanda_total = self.demanda_total()
+        for candidato in candidatos:
+            candidato['antes'] = cache_buscas.consultar(candidato['chave'])[0]
+        return {
+            'candidatos': candidatos,
+            'demanda_total': demanda_total,
+            'taxa_antes': self.taxa_de_acerto(candidatos, 'antes', demanda_total),
+        }
+
+    def aquecer(self, limite, paralelas=None, orcamento_tokens=None, forcar=False):
+        """
+        Refaz as buscas dos termos mais procurados que não estão com o resultado dentro do TTL.
+
+        Enquanto nenhuma busca termina, apenas uma é executada; depois, novas buscas só são
+        iniciadas se a média de tokens por busca desta execução, somada às em andamento,
+        ainda couber no orçamento.
+
+        Args:
+            limite: Quantidade de termos considerados
+            paralelas: Buscas simultâneas; por padrão, a configurada
+            orcamento_tokens: Tokens disponíveis para a execução (0 = sem limite); por padrão, o configurado
+            forcar: Se True, busca também os termos com resultado dentro do TTL
+
+        Returns:
+            O resultado de avaliar acrescido do estado do cache depois do aquecimento, do
+            status e dos tokens de cada candidato, da taxa de acerto prevista depois e dos tokens usados
+        """
+        paralelas = max(1, paralelas or self.paralelas)
+        orcamento = self.orcamento_tokens if orcamento_tokens is None else orcamento_tokens
+        resumo = self.avaliar(limite)
+        candidatos = resumo['candidatos']
+        for candidato in candidatos:
+            candidato['status'] = None
+            candidato['tokens'] = 0
+
+        pendentes = deque(c for c in candidatos if forcar or c['antes'] != CACHE_HIT)
+        consumidos = concluidas = 0
+        em_andamento = {}
+        with ThreadPoolExecutor(max_workers=paralelas, thread_name_prefix='aquecimento') as executor:
+            while pendentes or em_andamento:
+                while pendentes and len(em_andamento) < paralelas and self._cabe_no_orcamento(
+                    orcamento, consumidos, concluidas, len(em_andamento)
+                ):
+                    candidato = pendentes.popleft()
+                    em_andamento[executor.submit(self._aquecer_termo, candidato['termo'])] = candidato
+                if not em_andamento:
+                    break
+                terminadas, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+                for futuro in terminadas:
+                    candidato = em_andamento.pop(futuro)
+                    candidato['status'], candidato['tokens'] = futuro.result()
+                    consumidos += candidato['tokens']
+                    concluidas += 1
+
+        for candidato in pendentes:
+            candidato['status'] = SEM_ORCAMENTO
+        for candidato in candidatos:
+            candidato['depois'] = cache_buscas.consultar(candidato['chave'])[0]
+
+        resumo['taxa_depois'] = self.taxa_de_acerto(candidatos, 'depois', resumo['demanda_total'])
+        resumo['tokens'] = consumidos
+        logger.info(f"Aquecimento: {concluidas} termos buscados de {len(candidatos)} candidatos, {consumidos} tokens, "
+                    f"taxa de acerto prevista {resumo['taxa_antes']:.1%} -> {resumo['taxa_depois']:.1%}")
+        return resumo
+
+    @staticmethod
+    def _cabe_no_orcamento(orcamento, consumidos, concluidas, em_andamento):
+        if not orcamento:
+            return True
+        if not concluidas:
+            # Sem uma estimativa de tokens por busca, uma de cada vez
+            return em_andamento == 0
+        return consumidos + (em_andamento + 1) * consumidos / concluidas <= orcamento
+
+    @staticmethod
+    def _aquecer_termo(termo):
+        """Busca um termo em uma thread do pool, devolvendo (status final, tokens usados)."""
+        # O aquecimento traz resultados novos: as completions gravadas não são servidas
+        with contar_tokens() as consumo, renovar_respostas():
+            try:
+                pesquisa = realizar_busca_academica(termo, aquecimento=True)
+                return pesquisa.status, consumo['tokens']
+            except Exception as e:
+                logger.error(f"Erro ao aquecer o cache para '{termo}': {str(e)}")
+                return PesquisaAcademica.Status.FALHOU, consumo['tokens']
+            finally:
+                connection.close()
+
+
+aquecedor_cache = AquecedorCache(
+    janela_dias=settings.AQUECIMENTO_JANELA_DIAS,
+    janela_recente_dias=settings.AQUECIMENTO_JANELA_RECENTE_DIAS,
+    paralelas=settings.AQUECIMENTO_PARALELAS,
+    orcamento_tokens=settings.AQUECIMENTO_ORCAMENTO_TOKENS,
+)
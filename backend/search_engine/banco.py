@@ -0,0 +1,105 @@
+import functools
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+PERFIL_PRODUCAO = 'producao'
+
+
+def perfil_producao_ativo():
+    """Indica se o perfil de produção do SQLite está ativo para o banco padrão."""
+    return settings.SQLITE_PERFIL == PERFIL_PRODUCAO and settings.DATABASES['default']['ENGINE'].endswith('sqlite3')
+
+
+def configurar_conexao_sqlite(sender, connection, **kwargs):
+    """
+    Aplica os pragmas do perfil de produção em cada nova conexão SQLite (sinal connection_created).
+
+    WAL permite leituras simultâneas a uma escrita, synchronous=NORMAL faz um fsync por
+    checkpoint em vez de um por transação (seguro com WAL), busy_timeout faz as conexões
+    esperarem o lock em vez de falhar na hora e mmap_size serve as leituras direto do
+    cache de páginas do sistema operacional.
+    """
+    if connection.vendor != 'sqlite' or settings.SQLITE_PERFIL != PERFIL_PRODUCAO:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT * 1000)}')
+        cursor.execute(f'PRAGMA mmap_size={settings.SQLITE_MMAP_MB * 1024 * 1024}')
+        cursor.execute(f'PRAGMA cache_size={-settings.SQLITE_CACHE_MB * 1024}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+
+
+class EscritorBanco:
+    """
+    Fila única de escrita do processo.
+
+    As gravações do pipeline são executadas, uma de cada vez, por uma thread dedicada com
+    a própria conexão. Assim as escritas do processo nunca disputam o lock de escrita do
+    SQLite entre si (a causa dos "database is locked" em transações que leem e depois
+    escrevem) e, com WAL, as leituras das views seguem em paralelo sem esperar por elas.
+
+    Chamadas feitas pela própria thread de escrita ou dentro de um transaction.atomic de
+    quem chamou são executadas na hora, para não separar a transação em duas conexões.
+    """
+
+    def __init__(self, ativo):
+        self.ativo = ativo
+        self._fila = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar_fila, name='escritor-banco', daemon=True)
+                self._thread.start()
+
+    def executar(self, funcao, *args, **kwargs):
+        """
+        Executa a função na thread de escrita e devolve o resultado (ou levanta a exceção dela).
+
+        Args:
+            funcao: Função que faz as gravações
+            *args, **kwargs: Argumentos repassados à função
+        """
+        if (not self.ativo or threading.current_thread() is self._thread
+                or connection.in_atomic_block):
+            return funcao(*args, **kwargs)
+        self._iniciar()
+        futuro = Future()
+        self._fila.put((futuro, funcao, args, kwargs))
+        return futuro.result()
+
+    def pendentes(self):
+        """Quantidade aproximada de gravações aguardando na fila."""
+        return self._fila.qsize()
+
+    def _executar_fila(self):
+        while True:
+            futuro, funcao, args, kwargs = self._fila.get()
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                futuro.set_result(funcao(*args, **kwargs))
+            except BaseException as e:
+                logger.error(f"Erro na gravação de {funcao.__qualname__}: {str(e)}")
+                futuro.set_exception(e)
+
+
+escritor_banco = EscritorBanco(ativo=perfil_producao_ativo())
+
+
+def escrita_serializada(funcao):
+    """Decorador: a função passa a ser executada pela fila única de escrita (ver EscritorBanco)."""
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+        return escritor_banco.executar(funcao, *args, **kwargs)
+    return envolvida
@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PesquisaAcademica
+
+logger = logging.getLogger(__name__)
+
+# Estados possíveis de uma consulta ao cache (expostos no cabeçalho da resposta)
+CACHE_HIT = 'HIT'
+CACHE_STALE = 'STALE'
+CACHE_MISS = 'MISS'
+# Resultado compartilhado com uma busca idêntica que estava em andamento
+CACHE_COALESCED = 'COALESCED'
+
+
+class CacheBuscas:
+    """
+    Cache LRU em memória das buscas já realizadas, indexado pelo termo normalizado.
+
+    Cada entrada guarda apenas o ID da PesquisaAcademica e o instante em que ela foi
+    concluída; as fontes continuam no banco de dados. Quando a entrada não está em
+    memória, ou já passou do TTL, o cache procura a pesquisa mais recente com o mesmo
+    termo normalizado no banco, o que permite reaproveitar buscas feitas por outros
+    processos (como o aquecimento do cache).
+    """
+
+    def __init__(self, ttl, janela_obsoleta, max_entradas):
+        self.ttl = ttl
+        self.janela_obsoleta = janela_obsoleta
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self):
+        return self.ttl > 0 and self.max_entradas > 0
+
+    def _classificar(self, idade):
+        if idade <= self.ttl:
+            return CACHE_HIT
+        if idade <= self.ttl + self.janela_obsoleta:
+            return CACHE_STALE
+        return CACHE_MISS
+
+    def consultar(self, chave):
+        """
+        Consulta o cache para um termo normalizado.
+
+        Args:
+            chave: O termo normalizado
+
+        Returns:
+            Tupla com (estado do cache, ID da pesquisa ou None)
+        """
+        if not self.ativo or not chave:
+            return CACHE_MISS, None
+
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                self._entradas.move_to_end(chave)
+
+        if entrada is None or self._classificar(time.time() - entrada[1]) != CACHE_HIT:
+            # Outro processo pode ter gravado um resultado mais novo para o termo
+            do_banco = self._carregar_do_banco(chave)
+            if do_banco is not None and (entrada is None or do_banco[1] > entrada[1]):
+                entrada = do_banco
+                self._guardar(chave, entrada)
+            if entrada is None:
+                return CACHE_MISS, None
+
+        pesquisa_id, registrado_em = entrada
+        estado = self._classificar(time.time() - registrado_em)
+        if estado == CACHE_MISS:
+            self.remover(chave)
+            return CACHE_MISS, None
+        return estado, pesquisa_id
+
+    def registrar(self, chave, pesquisa):
+        """Registra uma pesquisa concluída como resultado atual para o termo."""
+        if not self.ativo or not chave:
+            return
+        # atualizado_em marca a conclusão; data_pesquisa (criação) descontaria do TTL a duração da busca
+        self._guardar(chave, (pesquisa.id, pesquisa.atualizado_em.timestamp()))
+
+    def remover(self, chave):
+        with self._lock:
+            self._entradas.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def _guardar(self, chave, entrada):
+        with self._lock:
+            self._entradas[chave] = entrada
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def _carregar_do_banco(self, chave):
+        limite = timezone.now() - timedelta(seconds=self.ttl + self.janela_obsoleta)
+        pesquisa = (
+            PesquisaAcademica.objects
+            # data_pesquisa também precisa estar na janela: a reidratação de uma pesquisa
+            # arquivada atualiza atualizado_em, mas não torna o resultado recente
+            .filter(termo_normalizado=chave, atualizado_em__gte=limite, data_pesquisa__gte=limite,
+                    status=PesquisaAcademica.Status.CONCLUIDA, fontes__isnull=False)
+            .order_by('-atualizado_em')
+            .only('id', 'atualizado_em')
+            .first()
+        )
+        if pesquisa is None:
+            return None
+        return pesquisa.id, pesquisa.atualizado_em.timestamp()
+
+
+cache_buscas = CacheBuscas(
+    ttl=settings.BUSCA_CACHE_TTL,
+    janela_obsoleta=settings.BUSCA_CACHE_JANELA_OBSOLETA,
+    max_entradas=settings.BUSCA_CACHE_MAX_ENTRADAS,
+)
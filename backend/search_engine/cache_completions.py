@@ -0,0 +1,204 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from openai.types.chat import ChatCompletion
+
+from .metricas import CACHE_COMPLETIONS
+
+logger = logging.getLogger(__name__)
+
+# Modos do cache (OPENAI_CACHE_MODO)
+MODO_DESATIVADO = 'desativado'
+MODO_ATIVO = 'ativo'            # serve o que estiver gravado e grava as novas respostas
+MODO_GRAVAR = 'gravar'          # sempre chama a API e grava (ou regrava) as respostas
+MODO_REPRODUZIR = 'reproduzir'  # só serve do cache; nunca chama a API
+
+# Parâmetros que não alteram o conteúdo da resposta e ficam fora da chave
+PARAMETROS_FORA_DA_CHAVE = {'timeout', 'extra_headers', 'extra_query', 'extra_body', 'user'}
+
+# Chamadas feitas dentro de renovar_respostas(): no modo ativo, não leem o cache
+_renovando = ContextVar('cache_completions_renovando', default=False)
+
+
+@contextmanager
+def renovar_respostas():
+    """
+    Dentro do bloco, o modo ativo se comporta como o modo gravar: as chamadas vão à API e
+    regravam a resposta em vez de servir a gravada.
+
+    Usado pelas buscas que existem para trazer resultados novos (revalidação do cache de
+    buscas e aquecimento), que de outro modo receberiam as mesmas completions de antes e
+    apenas regravariam o resultado antigo como se fosse novo. O modo reproduzir não muda.
+    """
+    token = _renovando.set(True)
+    try:
+        yield
+    finally:
+        _renovando.reset(token)
+
+
+class CompletionAusente(Exception):
+    """No modo reproduzir, a completion pedida não está gravada no cache."""
+
+
+class CacheCompletions:
+    """
+    Cache em disco das respostas de chat completions, endereçado pelo conteúdo da requisição.
+
+    A chave é o SHA-256 do JSON canônico dos parâmetros da chamada (modelo, mensagens,
+    ferramentas, response_format etc.), de modo que prompts idênticos reaproveitam a
+    resposta mesmo quando o resultado final da busca é diferente. Cada resposta fica em um
+    arquivo JSON comprimido com gzip (<diretório>/<2 primeiros caracteres>/<chave>.json.gz).
+
+    Quando o diretório passa de `max_bytes`, os arquivos usados há mais tempo (data de
+    modificação, atualizada a cada acerto) são removidos até sobrar 90% do limite.
+    Chamadas com stream=True não são armazenadas.
+    """
+
+    def __init__(self, diretorio, modo, max_bytes):
+        self.diretorio = Path(diretorio)
+        self.modo = modo
+        self.max_bytes = max_bytes
+        self._tamanho = None
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self):
+        return self.modo != MODO_DESATIVADO
+
+    def chave(self, kwargs):
+        """
+        Chave da requisição ou None se ela não pode ser armazenada.
+
+        Args:
+            kwargs: Parâmetros de chat.completions.create
+
+        Returns:
+            Hash hexadecimal dos parâmetros ou None (cache desativado ou stream)
+        """
+        if not self.ativo or kwargs.get('stream'):
+            return None
+        parametros = {nome: valor for nome, valor in kwargs.items() if nome not in PARAMETROS_FORA_DA_CHAVE}
+        canonico = json.dumps(parametros, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+    def _caminho(self, chave):
+        return self.diretorio / chave[:2] / f"{chave}.json.gz"
+
+    def obter(self, chave, etapa, kwargs):
+        """
+        Resposta gravada para a chave, se houver.
+
+        Args:
+            chave: Chave retornada por chave(); None consulta apenas o modo
+            etapa: Nome da etapa do pipeline usado nas métricas
+            kwargs: Parâmetros da chamada (usados na mensagem de erro do modo reproduzir)
+
+        Returns:
+            ChatCompletion gravada ou None
+
+        Raises:
+            CompletionAusente: no modo reproduzir, se a resposta não estiver gravada
+        """
+        if not self.ativo or (chave is None and self.modo != MODO_REPRODUZIR):
+            return None
+        resposta = None
+        if chave is not None and self.modo != MODO_GRAVAR and not (self.modo == MODO_ATIVO and _renovando.get()):
+            resposta = self._ler(chave)
+        if resposta is not None:
+            CACHE_COMPLETIONS.incrementar(etapa=etapa, resultado='hit')
+            return resposta
+        CACHE_COMPLETIONS.incrementar(etapa=etapa, resultado='miss')
+        if self.modo == MODO_REPRODUZIR:
+            motivo = 'chamadas com stream não são gravadas' if chave is None else f"chave {chave[:12]}"
+            raise CompletionAusente(
+                f"Completion da etapa {etapa} (modelo {kwargs.get('model')}) ausente do cache: {motivo}"
+            )
+        return None
+
+    def _ler(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            with gzip.open(caminho, 'rb') as arquivo:
+                dados = json.loads(arquivo.read())
+            os.utime(caminho)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada corrompida no cache de completions ({caminho}): {str(e)}")
+            return None
+        return ChatCompletion.model_validate(dados)
+
+    def guardar(self, chave, etapa, resposta):
+        """Grava a resposta de uma chamada bem-sucedida (escrita atômica) e aplica o limite de tamanho."""
+        if chave is None or self.modo not in (MODO_ATIVO, MODO_GRAVAR):
+            return
+        caminho = self._caminho(chave)
+        dados = gzip.compress(resposta.model_dump_json().encode('utf-8'))
+        try:
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            anterior = caminho.stat().st_size if caminho.exists() else 0
+            descritor, temporario = tempfile.mkstemp(dir=caminho.parent, suffix='.tmp')
+            with os.fdopen(descritor, 'wb') as arquivo:
+                arquivo.write(dados)
+            os.replace(temporario, caminho)
+        except OSError as e:
+            logger.warning(f"Falha ao gravar no cache de completions: {str(e)}")
+            return
+        CACHE_COMPLETIONS.incrementar(etapa=etapa, resultado='gravada')
+        self._acrescentar_tamanho(len(dados) - anterior)
+
+    def _arquivos(self):
+        arquivos = []
+        for entrada in self.diretorio.glob('*/*.json.gz'):
+            try:
+                estado = entrada.stat()
+            except FileNotFoundError:
+                # Removido por outro processo durante a listagem
+                continue
+            arquivos.append((estado.st_mtime, estado.st_size, entrada))
+        return arquivos
+
+    def _acrescentar_tamanho(self, diferenca):
+        with self._lock:
+            if self._tamanho is None:
+                # Primeira gravação do processo: o diretório pode já ter sido preenchido antes
+                self._tamanho = sum(tamanho for _, tamanho, _ in self._arquivos())
+            else:
+                self._tamanho += diferenca
+            if self.max_bytes > 0 and self._tamanho > self.max_bytes:
+                self._remover_antigos()
+
+    def _remover_antigos(self):
+        # Recalcula pelo disco, já que outros processos também gravam no diretório
+        arquivos = sorted(self._arquivos())
+        tamanho = sum(tamanho for _, tamanho, _ in arquivos)
+        alvo = self.max_bytes * 0.9
+        removidos = 0
+        for _, tamanho_arquivo, caminho in arquivos:
+            if tamanho <= alvo:
+                break
+            try:
+                caminho.unlink()
+            except FileNotFoundError:
+                pass
+            tamanho -= tamanho_arquivo
+            removidos += 1
+        self._tamanho = tamanho
+        logger.info(f"Cache de completions: {removidos} entradas removidas, {tamanho} bytes restantes")
+
+
+cache_completions = CacheCompletions(
+    diretorio=settings.OPENAI_CACHE_DIR,
+    modo=settings.OPENAI_CACHE_MODO,
+    max_bytes=settings.OPENAI_CACHE_MAX_MB * 1024 * 1024,
+)
@@ -0,0 +1,419 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import openai
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from openai.types import CompletionUsage
+
+from .cache_completions import cache_completions
+from .metricas import CHAMADAS_RECUSADAS, NOVAS_TENTATIVAS, medir_etapa, registrar_uso_tokens
+
+logger = logging.getLogger(__name__)
+
+# Códigos HTTP que indicam falha temporária do provedor e justificam nova tentativa
+STATUS_REPETIVEIS = {408, 409, 429}
+
+
+class CircuitoAberto(Exception):
+    """Chamada recusada sem contatar o provedor, que falhou seguidamente há pouco."""
+
+
+class LimitadorTaxa:
+    """
+    Limitador de requisições e tokens por minuto (token bucket) compartilhado pelas chamadas.
+
+    Cada chamada reserva uma requisição e a estimativa de tokens nos dois baldes, que se
+    recarregam continuamente. Quando falta saldo a reserva é feita mesmo assim e o
+    chamador recebe quanto tempo deve esperar, o que mantém a ordem de chegada sem
+    segurar o lock durante a espera. Limites iguais a 0 desativam o balde correspondente.
+    """
+
+    def __init__(self, requisicoes_por_minuto, tokens_por_minuto):
+        self._baldes = [
+            [limite / 60.0, float(limite), float(limite)]  # taxa por segundo, capacidade, saldo
+            for limite in (requisicoes_por_minuto, tokens_por_minuto)
+        ]
+        self._atualizado_em = time.monotonic()
+        self._suspenso_ate = 0.0
+        self._lock = threading.Lock()
+
+    def _recarregar(self, agora):
+        decorrido = agora - self._atualizado_em
+        self._atualizado_em = agora
+        for balde in self._baldes:
+            taxa, capacidade, saldo = balde
+            balde[2] = min(capacidade, saldo + decorrido * taxa)
+
+    def reservar(self, tokens):
+        """
+        Reserva uma requisição e os tokens estimados.
+
+        Returns:
+            Segundos que o chamador deve aguardar antes de fazer a requisição
+        """
+        with self._lock:
+            agora = time.monotonic()
+            self._recarregar(agora)
+            espera = max(0.0, self._suspenso_ate - agora)
+            for balde, quantidade in zip(self._baldes, (1, tokens)):
+                taxa, capacidade, saldo = balde
+                if not taxa:
+                    continue
+                balde[2] = saldo - min(quantidade, capacidade)
+                if balde[2] < 0:
+                    espera = max(espera, -balde[2] / taxa)
+            return espera
+
+    def ajustar_tokens(self, diferenca):
+        """Corrige o balde de tokens com a diferença entre o uso real e o estimado."""
+        taxa, capacidade, saldo = self._baldes[1]
+        if not taxa or not diferenca:
+            return
+        with self._lock:
+            self._baldes[1][2] = min(capacidade, self._baldes[1][2] - diferenca)
+
+    def suspender(self, segundos):
+        """Segura todas as novas chamadas por alguns segundos (ex.: após um Retry-After)."""
+        with self._lock:
+            self._suspenso_ate = max(self._suspenso_ate, time.monotonic() + segundos)
+
+
+class DisjuntorCircuito:
+    """
+    Circuit breaker das chamadas ao provedor.
+
+    Depois de `limiar_falhas` chamadas seguidas que falharam por indisponibilidade do
+    provedor (já esgotadas as novas tentativas), o circuito abre e as chamadas são
+    recusadas imediatamente com CircuitoAberto. Passado `tempo_abertura`, uma única chamada
+    de teste é liberada: se ela funcionar o circuito fecha, senão volta a abrir.
+    """
+
+    FECHADO = 'fechado'
+    ABERTO = 'aberto'
+    SEMIABERTO = 'semiaberto'
+
+    def __init__(self, limiar_falhas, tempo_abertura):
+        self.limiar_falhas = limiar_falhas
+        self.tempo_abertura = tempo_abertura
+        self.estado = self.FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        """
+        Libera a chamada ou levanta CircuitoAberto.
+
+        Returns:
+            True se a chamada liberada é a chamada de teste do circuito semiaberto
+        """
+        if self.limiar_falhas <= 0:
+            return False
+        with self._lock:
+            if self.estado == self.FECHADO:
+                return False
+            restante = self._aberto_em + self.tempo_abertura - time.monotonic()
+            if self.estado == self.ABERTO and restante <= 0:
+                self.estado = self.SEMIABERTO
+                logger.info("Circuito da OpenAI semiaberto: liberando uma chamada de teste")
+                return True
+        raise CircuitoAberto(
+            f"Serviço do modelo indisponível após falhas seguidas; nova tentativa em {max(restante, 0):.0f}s"
+        )
+
+    def registrar_sucesso(self):
+        with self._lock:
+            if self.estado != self.FECHADO:
+                logger.info("Circuito da OpenAI fechado")
+            self.estado = self.FECHADO
+            self._falhas = 0
+
+    def cancelar_teste(self):
+        """
+        Devolve o circuito semiaberto ao estado aberto quando a chamada de teste termina sem
+        resposta nem erro do provedor (ex.: cancelada), liberando uma nova chamada de teste.
+        """
+        with self._lock:
+            if self.estado == self.SEMIABERTO:
+                self.estado = self.ABERTO
+                logger.info("Chamada de teste do circuito da OpenAI interrompida; circuito aberto de novo")
+
+    def registrar_falha(self):
+        with self._lock:
+            self._falhas += 1
+            if self.estado == self.SEMIABERTO or (
+                self.estado == self.FECHADO and 0 < self.limiar_falhas <= self._falhas
+            ):
+                self.estado = self.ABERTO
+                self._aberto_em = time.monotonic()
+                logger.warning(
+                    f"Circuito da OpenAI aberto após {self._falhas} falhas seguidas; "
+                    f"chamadas recusadas por {self.tempo_abertura}s"
+                )
+
+
+def estimar_tokens(kwargs):
+    """Estimativa dos tokens de uma chamada: ~4 caracteres por token nas mensagens mais a resposta esperada."""
+    caracteres = sum(len(str(mensagem.get('content') or '')) for mensagem in kwargs.get('messages', ()))
+    return caracteres // 4 + kwargs.get('max_tokens', settings.OPENAI_TOKENS_RESPOSTA_ESTIMADOS)
+
+
+def erro_repetivel(erro):
+    """Indica se o erro é temporário (limite de taxa, falha do servidor ou de conexão)."""
+    if isinstance(erro, openai.APIConnectionError):
+        return True
+    if isinstance(erro, openai.APIStatusError):
+        return erro.status_code in STATUS_REPETIVEIS or erro.status_code >= 500
+    return False
+
+
+def tempo_retry_after(erro):
+    """Segundos pedidos pelo provedor nos cabeçalhos retry-after-ms ou Retry-After, se houver."""
+    resposta = getattr(erro, 'response', None)
+    if resposta is None:
+        return None
+    cabecalhos = resposta.headers
+    try:
+        if cabecalhos.get('retry-after-ms'):
+            return float(cabecalhos['retry-after-ms']) / 1000
+        valor = cabecalhos.get('retry-after')
+        if not valor:
+            return None
+        try:
+            return float(valor)
+        except ValueError:
+            return parsedate_to_datetime(valor).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+def pedir_uso_no_stream(kwargs):
+    """
+    Parâmetros de uma chamada com stream=True pedindo o usage no último chunk.
+
+    Sem stream_options a API não informa os tokens de respostas em stream; a versão do
+    SDK em uso ainda não tem o parâmetro, que segue em extra_body.
+    """
+    extra_body = dict(kwargs.get('extra_body') or {})
+    extra_body.setdefault('stream_options', {'include_usage': True})
+    return {**kwargs, 'extra_body': extra_body}
+
+
+def uso_da_resposta(resposta):
+    """usage de uma resposta ou de um chunk de stream (em que o SDK o entrega como dicionário), ou None."""
+    uso = getattr(resposta, 'usage', None)
+    if isinstance(uso, dict):
+        uso = CompletionUsage(**uso)
+    return uso
+
+
+class ChamadorOpenAI:
+    """
+    Camada compartilhada das chamadas de chat completions.
+
+    Aplica o limitador de taxa antes de cada tentativa, repete erros temporários com
+    espera exponencial e jitter (ou o tempo pedido em Retry-After) e passa pelo circuit
+    breaker, para que uma indisponibilidade do provedor falhe rápido em vez de ocupar os
+    workers. Os clientes da OpenAI devem ser criados com max_retries=0, deixando as novas
+    tentativas a cargo desta camada.
+
+    Antes de tudo isso a chamada é procurada no cache de completions; respostas servidas
+    por ele não passam pelo limitador nem pelo circuit breaker.
+
+    Chamadas com stream=True pedem o usage no último chunk; os tokens são registrados
+    quando o stream devolvido chega a esse chunk.
+    """
+
+    def __init__(self, limitador, disjuntor, max_tentativas, espera_base, espera_maxima, cache):
+        self.limitador = limitador
+        self.disjuntor = disjuntor
+        self.cache = cache
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.novas_tentativas = 0
+        self.recusadas = 0
+
+    def _espera_apos_erro(self, erro, tentativa):
+        """
+        Tempo até a próxima tentativa ou None se o erro não deve ser repetido.
+        """
+        if not erro_repetivel(erro) or tentativa >= self.max_tentativas:
+            return None
+        retry_after = tempo_retry_after(erro)
+        if retry_after is not None:
+            if retry_after > self.espera_maxima:
+                return None
+            retry_after = max(retry_after, 0.0)
+            self.limitador.suspender(retry_after)
+            return retry_after
+        # Full jitter: espalha as novas tentativas de chamadas que falharam juntas
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** (tentativa - 1)))
+
+    def _registrar_resultado(self, resposta, tokens_estimados, etapa):
+        self.disjuntor.registrar_sucesso()
+        self._registrar_uso(uso_da_resposta(resposta), tokens_estimados, etapa)
+
+    def _registrar_uso(self, uso, tokens_estimados, etapa):
+        if uso is None:
+            return
+        registrar_uso_tokens(etapa, uso)
+        self.limitador.ajustar_tokens(uso.total_tokens - tokens_estimados)
+
+    def _acompanhar_stream(self, stream, tokens_estimados, etapa):
+        """Repassa os chunks de uma resposta em stream e registra o usage enviado no último."""
+        for chunk in stream:
+            self._registrar_uso(uso_da_resposta(chunk), tokens_estimados, etapa)
+            yield chunk
+
+    async def _acompanhar_stream_async(self, stream, tokens_estimados, etapa):
+        """Versão assíncrona de _acompanhar_stream."""
+        async for chunk in stream:
+            self._registrar_uso(uso_da_resposta(chunk), tokens_estimados, etapa)
+            yield chunk
+
+    def _registrar_falha(self, erro, tentativa):
+        if erro_repetivel(erro):
+            self.disjuntor.registrar_falha()
+        else:
+            # O provedor respondeu (ex.: requisição inválida): não é indisponibilidade
+            self.disjuntor.registrar_sucesso()
+        logger.error(f"Chamada à OpenAI falhou após {tentativa} tentativa(s): {str(erro)}")
+
+    def _verificar_circuito(self, etapa):
+        """Consulta o circuito; devolve True se a chamada é a de teste do circuito semiaberto."""
+        try:
+            return self.disjuntor.permitir()
+        except CircuitoAberto:
+            self.recusadas += 1
+            CHAMADAS_RECUSADAS.incrementar(etapa=etapa)
+            raise
+
+    def criar(self, client, etapa='modelo', **kwargs):
+        """
+        Executa client.chat.completions.create com limite de taxa, novas tentativas e circuit breaker.
+
+        A duração da chamada (incluindo esperas e novas tentativas), os tokens informados em
+        usage e os erros são registrados nas métricas com o rótulo da etapa.
+
+        Args:
+            client: Cliente OpenAI (com max_retries=0)
+            etapa: Nome da etapa do pipeline usado nas métricas
+            **kwargs: Parâmetros de chat.completions.create
+
+        Returns:
+            A resposta da API (com stream=True, um iterador dos chunks)
+
+        Raises:
+            CircuitoAberto: se o circuito estiver aberto
+            CompletionAusente: no modo reproduzir do cache, se a resposta não estiver gravada
+            openai.OpenAIError: se o erro não for temporário ou as tentativas se esgotarem
+        """
+        if kwargs.get('stream'):
+            kwargs = pedir_uso_no_stream(kwargs)
+        tokens = estimar_tokens(kwargs)
+        tentativa = 0
+        chave = self.cache.chave(kwargs)
+        with medir_etapa(etapa):
+            resposta = self.cache.obter(chave, etapa, kwargs)
+            if resposta is not None:
+                return resposta
+            # O circuito é consultado uma vez por chamada: as novas tentativas de uma chamada
+            # já liberada (inclusive a chamada de teste do circuito semiaberto) seguem adiante
+            teste = self._verificar_circuito(etapa)
+            try:
+                while True:
+                    tentativa += 1
+                    time.sleep(self.limitador.reservar(tokens))
+                    try:
+                        resposta = client.chat.completions.create(**kwargs)
+                    except openai.OpenAIError as e:
+                        espera = self._espera_apos_erro(e, tentativa)
+                        if espera is None:
+                            self._registrar_falha(e, tentativa)
+                            raise
+                        self.novas_tentativas += 1
+                        NOVAS_TENTATIVAS.incrementar(etapa=etapa)
+                        logger.warning(f"Erro temporário da OpenAI ({str(e)}); nova tentativa em {espera:.1f}s")
+                        time.sleep(espera)
+                        continue
+                    self._registrar_resultado(resposta, tokens, etapa)
+                    if kwargs.get('stream'):
+                        return self._acompanhar_stream(resposta, tokens, etapa)
+                    self.cache.guardar(chave, etapa, resposta)
+                    return resposta
+            except openai.OpenAIError:
+                # Erros do provedor já foram registrados no circuito
+                raise
+            except BaseException:
+                # Sem isso uma chamada de teste cancelada deixaria o circuito semiaberto para sempre
+                if teste:
+                    self.disjuntor.cancelar_teste()
+                raise
+
+    async def criar_async(self, client, etapa='modelo', **kwargs):
+        """Versão assíncrona de criar, para o cliente AsyncOpenAI."""
+        if kwargs.get('stream'):
+            kwargs = pedir_uso_no_stream(kwargs)
+        tokens = estimar_tokens(kwargs)
+        tentativa = 0
+        chave = self.cache.chave(kwargs)
+        with medir_etapa(etapa):
+            if self.cache.ativo:
+                resposta = await sync_to_async(self.cache.obter, thread_sensitive=False)(chave, etapa, kwargs)
+                if resposta is not None:
+                    return resposta
+            # O circuito é consultado uma vez por chamada: as novas tentativas de uma chamada
+            # já liberada (inclusive a chamada de teste do circuito semiaberto) seguem adiante
+            teste = self._verificar_circuito(etapa)
+            try:
+                while True:
+                    tentativa += 1
+                    await asyncio.sleep(self.limitador.reservar(tokens))
+                    try:
+                        resposta = await client.chat.completions.create(**kwargs)
+                    except openai.OpenAIError as e:
+                        espera = self._espera_apos_erro(e, tentativa)
+                        if espera is None:
+                            self._registrar_falha(e, tentativa)
+                            raise
+                        self.novas_tentativas += 1
+                        NOVAS_TENTATIVAS.incrementar(etapa=etapa)
+                        logger.warning(f"Erro temporário da OpenAI ({str(e)}); nova tentativa em {espera:.1f}s")
+                        await asyncio.sleep(espera)
+                        continue
+                    self._registrar_resultado(resposta, tokens, etapa)
+                    if kwargs.get('stream'):
+                        return self._acompanhar_stream_async(resposta, tokens, etapa)
+                    if chave is not None:
+                        await sync_to_async(self.cache.guardar, thread_sensitive=False)(chave, etapa, resposta)
+                    return resposta
+            except openai.OpenAIError:
+                # Erros do provedor já foram registrados no circuito
+                raise
+            except BaseException:
+                # Sem isso uma chamada de teste cancelada deixaria o circuito semiaberto para sempre
+                if teste:
+                    self.disjuntor.cancelar_teste()
+                raise
+
+
+chamador_openai = ChamadorOpenAI(
+    limitador=LimitadorTaxa(
+        requisicoes_por_minuto=settings.OPENAI_LIMITE_REQUISICOES_MINUTO,
+        tokens_por_minuto=settings.OPENAI_LIMITE_TOKENS_MINUTO,
+    ),
+    disjuntor=DisjuntorCircuito(
+        limiar_falhas=settings.OPENAI_CIRCUITO_LIMIAR_FALHAS,
+        tempo_abertura=settings.OPENAI_CIRCUITO_TEMPO_ABERTURA,
+    ),
+    max_tentativas=settings.OPENAI_MAX_TENTATIVAS,
+    espera_base=settings.OPENAI_ESPERA_BASE,
+    espera_maxima=settings.OPENAI_ESPERA_MAXIMA,
+    cache=cache_completions,
+)
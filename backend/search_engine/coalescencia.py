@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .metricas import BUSCAS_COALESCIDAS
+
+try:
+    import fcntl
+except ImportError:  # Windows: a coalescência fica restrita ao processo
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de arquivos de trava: termos diferentes podem compartilhar um arquivo, o que
+# apenas serializa as duas buscas entre processos, sem misturar os resultados
+FAIXAS_TRAVA = 1024
+
+# Intervalo (s) entre as tentativas de obter a trava de outro processo
+INTERVALO_TRAVA = 0.1
+
+
+class _Voo:
+    """Busca em andamento para um termo, aguardada pelas requisições idênticas que chegarem depois."""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self.aguardando_async = []
+
+
+class CoalescedorBuscas:
+    """
+    Single-flight das buscas: requisições simultâneas para o mesmo termo normalizado
+    compartilham uma única execução do pipeline.
+
+    No processo, a primeira requisição executa a busca e as seguintes (threads ou
+    corrotinas) aguardam o resultado dela. Entre processos (ex.: workers do gunicorn), a
+    execução é protegida por uma trava de arquivo (flock): quem encontra a trava ocupada
+    espera ela ser liberada e reaproveita a pesquisa concluída pelo outro processo nesse
+    meio-tempo, se houver. Passado `espera_maxima` a busca é executada mesmo assim.
+    """
+
+    def __init__(self, ativo, diretorio, espera_maxima):
+        self.ativo = ativo
+        self.diretorio = Path(diretorio) if diretorio else Path(tempfile.gettempdir()) / 'busca-academica-travas'
+        self.espera_maxima = espera_maxima
+        self._voos = {}
+        self._lock = threading.Lock()
+
+    def _entrar(self, chave):
+        """Devolve (voo, True se quem chamou deve executar a busca)."""
+        with self._lock:
+            voo = self._voos.get(chave)
+            if voo is not None:
+                return voo, False
+            voo = self._voos[chave] = _Voo()
+            return voo, True
+
+    def _sair(self, chave, voo, resultado=None, erro=None):
+        with self._lock:
+            self._voos.pop(chave, None)
+            voo.resultado, voo.erro = resultado, erro
+            voo.evento.set()
+            aguardando, voo.aguardando_async = voo.aguardando_async, []
+        for loop, futuro in aguardando:
+            loop.call_soon_threadsafe(_resolver_futuro, futuro)
+
+    def _adquirir_trava(self, chave):
+        """
+        Obtém a trava de arquivo do termo, esperando até espera_maxima se outro processo a tiver.
+
+        Returns:
+            Tupla com (arquivo aberto a liberar ou None, True se a trava estava ocupada)
+        """
+        if fcntl is None:
+            return None, False
+        faixa = int(hashlib.sha256(chave.encode('utf-8')).hexdigest()[:8], 16) % FAIXAS_TRAVA
+        try:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            arquivo = open(self.diretorio / f"busca-{faixa:04d}.lock", 'a')
+        except OSError as e:
+            logger.warning(f"Trava entre processos indisponível para '{chave}': {str(e)}")
+            return None, False
+
+        ocupada = False
+        limite = time.monotonic() + self.espera_maxima
+        while True:
+            try:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return arquivo, ocupada
+            except BlockingIOError:
+                ocupada = True
+                if time.monotonic() >= limite:
+                    logger.warning(f"Busca de '{chave}' em outro processo excedeu {self.espera_maxima}s; executando mesmo assim")
+                    arquivo.close()
+                    return None, True
+                time.sleep(INTERVALO_TRAVA)
+
+    @staticmethod
+    def _liberar_trava(arquivo):
+        if arquivo is not None:
+            # Fechar o arquivo libera o flock
+            arquivo.close()
+
+    def executar(self, chave, buscar, procurar_concluida):
+        """
+        Executa a busca do termo ou aguarda a que já está em andamento.
+
+        Args:
+            chave: Termo normalizado
+            buscar: Função sem argumentos que executa a busca e devolve a pesquisa
+            procurar_concluida: Função que recebe o instante (timezone.now()) em que a espera
+                começou e devolve a pesquisa do termo concluída por outro processo desde então,
+                ou None
+
+        Returns:
+            Tupla com (pesquisa, True se o resultado veio de outra execução)
+        """
+        if not self.ativo or not chave:
+            return buscar(), False
+
+        voo, lider = self._entrar(chave)
+        if not lider:
+            if not voo.evento.wait(self.espera_maxima):
+                logger.warning(f"Busca de '{chave}' excedeu {self.espera_maxima}s; executando outra")
+                return buscar(), False
+            if voo.resultado is None and voo.erro is None:
+                return buscar(), False
+            BUSCAS_COALESCIDAS.incrementar(origem='processo')
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.resultado, True
+
+        try:
+            inicio = timezone.now()
+            arquivo, ocupada = self._adquirir_trava(chave)
+            try:
+                if ocupada:
+                    pesquisa = procurar_concluida(inicio)
+                    if pesquisa is not None:
+                        BUSCAS_COALESCIDAS.incrementar(origem='outro_processo')
+                        self._sair(chave, voo, pesquisa)
+                        return pesquisa, True
+                pesquisa = buscar()
+            finally:
+                self._liberar_trava(arquivo)
+        except BaseException as e:
+            # Interrupções (ex.: corrotina cancelada) não são repassadas: quem aguardava executa a própria busca
+            self._sair(chave, voo, erro=e if isinstance(e, Exception) else None)
+            raise
+        self._sair(chave, voo, pesquisa)
+        return pesquisa, False
+
+    async def executar_async(self, chave, buscar, procurar_concluida):
+        """
+        Versão assíncrona de executar: buscar é uma corrotina sem argumentos e
+        procurar_concluida continua síncrona (é executada em uma thread).
+        """
+        if not self.ativo or not chave:
+            return await buscar(), False
+
+        voo, lider = self._entrar(chave)
+        if not lider:
+            loop = asyncio.get_running_loop()
+            futuro = loop.create_future()
+            with self._lock:
+                if voo.evento.is_set():
+                    futuro.set_result(None)
+                else:
+                    voo.aguardando_async.append((loop, futuro))
+            try:
+                await asyncio.wait_for(futuro, self.espera_maxima)
+            except asyncio.TimeoutError:
+                logger.warning(f"Busca de '{chave}' excedeu {self.espera_maxima}s; executando outra")
+                return await buscar(), False
+            if voo.resultado is None and voo.erro is None:
+                return await buscar(), False
+            BUSCAS_COALESCIDAS.incrementar(origem='processo')
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.resultado, True
+
+        try:
+            inicio = timezone.now()
+            # A espera pela trava de outro processo fica em uma thread, fora do event loop
+            arquivo, ocupada = await sync_to_async(self._adquirir_trava, thread_sensitive=False)(chave)
+            try:
+                if ocupada:
+                    pesquisa = await sync_to_async(procurar_concluida)(inicio)
+                    if pesquisa is not None:
+                        BUSCAS_COALESCIDAS.incrementar(origem='outro_processo')
+                        self._sair(chave, voo, pesquisa)
+                        return pesquisa, True
+                pesquisa = await buscar()
+            finally:
+                self._liberar_trava(arquivo)
+        except BaseException as e:
+            # Interrupções (ex.: corrotina cancelada) não são repassadas: quem aguardava executa a própria busca
+            self._sair(chave, voo, erro=e if isinstance(e, Exception) else None)
+            raise
+        self._sair(chave, voo, pesquisa)
+        return pesquisa, False
+
+
+def _resolver_futuro(futuro):
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+coalescedor_buscas = CoalescedorBuscas(
+    ativo=settings.BUSCA_COALESCENCIA_ATIVA,
+    diretorio=settings.BUSCA_COALESCENCIA_DIR,
+    espera_maxima=settings.BUSCA_COALESCENCIA_ESPERA,
+)
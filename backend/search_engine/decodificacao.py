@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from typing import Callable, NamedTuple, Optional
+
+from .models import FonteAcademica
+
+
+class ErroCampo(ValueError):
+    """Valor de um campo da fonte que não pode ser convertido (a mensagem vai para a resposta)."""
+
+
+@dataclass(slots=True)
+class FonteExtraida:
+    """
+    Fonte extraída da resposta do modelo, já convertida e validada.
+
+    Os campos são os de FonteAcademica, na ordem de ESQUEMA_FONTE, e respeitam os
+    limites de tamanho do modelo. indice é a posição da fonte na resposta do modelo,
+    usada ao descrever uma rejeição posterior (ex.: link inacessível).
+    """
+
+    link: str
+    titulo: str
+    autores: Optional[str]
+    instituicao: Optional[str]
+    ano_publicacao: Optional[int]
+    descricao: Optional[str]
+    tipo_acesso: str
+    indice: Optional[int] = None
+
+    def campos_modelo(self):
+        """Dicionário com os campos para criar uma FonteAcademica."""
+        return {campo.nome: getattr(self, campo.nome) for campo in ESQUEMA_FONTE}
+
+
+class CampoFonte(NamedTuple):
+    """
+    Regra de decodificação de um campo da fonte.
+
+    converter recebe o valor bruto e devolve o valor convertido ou None (campo vazio),
+    ou levanta ErroCampo. Acima do limite o valor é truncado ou, se truncar for False,
+    a fonte é rejeitada. padrao é usado para campos vazios (se for uma função, recebe o
+    índice da fonte).
+    """
+
+    nome: str
+    rotulo: str
+    converter: Callable
+    limite: Optional[int] = None
+    truncar: bool = False
+    padrao: object = None
+
+
+def converter_texto(valor):
+    """Texto sem espaços nas pontas; vazio ou ausente vira None."""
+    if valor is None:
+        return None
+    texto = (valor if type(valor) is str else str(valor)).strip()
+    return texto or None
+
+
+def converter_link(valor):
+    """Link http(s), obrigatório: ausente ou com outro esquema levanta ErroCampo."""
+    link = valor.strip() if type(valor) is str else None
+    if not link or not link.startswith(('http://', 'https://')):
+        raise ErroCampo('O link deve começar com http:// ou https://.')
+    return link
+
+
+def converter_ano(valor):
+    """Ano com quatro dígitos a partir de um inteiro ou do início de um texto (ex.: "2021 (online)")."""
+    if type(valor) is int:
+        ano = valor
+    elif valor is None or isinstance(valor, bool):
+        return None
+    else:
+        try:
+            ano = int(str(valor).strip()[:4])
+        except (ValueError, TypeError):
+            return None
+    return ano if 1000 <= ano <= 9999 else None
+
+
+def _limite(nome):
+    return FonteAcademica._meta.get_field(nome).max_length
+
+
+# Esquema dos campos, na ordem de FonteExtraida; os limites vêm do modelo uma única vez
+ESQUEMA_FONTE = (
+    CampoFonte('link', 'O link', converter_link, _limite('link')),
+    CampoFonte('titulo', 'O título', converter_texto, _limite('titulo'), padrao=lambda indice: f'Fonte {indice + 1}'),
+    CampoFonte('autores', 'Os autores', converter_texto, _limite('autores'), truncar=True),
+    CampoFonte('instituicao', 'A instituição', converter_texto, _limite('instituicao'), truncar=True),
+    CampoFonte('ano_publicacao', 'O ano de publicação', converter_ano),
+    CampoFonte('descricao', 'A descrição', converter_texto),
+    CampoFonte('tipo_acesso', 'O tipo de acesso', converter_texto, _limite('tipo_acesso'), truncar=True,
+               padrao='Informação online'),
+)
+
+# O esquema como tuplas simples, mais rápidas de desempacotar no laço de decodificar_fonte
+_REGRAS = tuple(tuple(campo) for campo in ESQUEMA_FONTE)
+_FUNCAO = type(lambda: None)
+
+
+def decodificar_fonte(dados, indice):
+    """
+    Converte e valida, em uma única passada pelo esquema, uma fonte devolvida pelo modelo.
+
+    Links ausentes, sem http(s) ou maiores que o campo do modelo e títulos maiores que
+    o campo do modelo rejeitam a fonte. Os demais textos são truncados ao limite do campo.
+
+    Args:
+        dados: Dicionário da fonte retornado pelo modelo
+        indice: Posição da fonte na lista (usada no título padrão e guardada na FonteExtraida)
+
+    Returns:
+        Tupla com (FonteExtraida ou None, dicionário de erros por campo)
+    """
+    if type(dados) is not dict:
+        return None, {'fonte': ['A fonte deve ser um objeto JSON.']}
+
+    obter = dados.get
+    valores = []
+    erros = None
+    for nome, rotulo, converter, limite, truncar, padrao in _REGRAS:
+        bruto = obter(nome)
+        if converter is converter_texto and type(bruto) is str:
+            # Caminho mais comum, sem chamada de função: texto já como string
+            valor = bruto.strip() or None
+        else:
+            try:
+                valor = converter(bruto)
+            except ErroCampo as e:
+                erros = erros or {}
+                erros[nome] = [str(e)]
+                continue
+        if valor is None:
+            valor = padrao(indice) if padrao.__class__ is _FUNCAO else padrao
+        elif limite is not None and len(valor) > limite:
+            if not truncar:
+                erros = erros or {}
+                erros[nome] = [f"{rotulo} excede {limite} caracteres."]
+                continue
+            valor = valor[:limite]
+        valores.append(valor)
+
+    if erros:
+        return None, erros
+    return FonteExtraida(*valores, indice), {}
+
+
+def descrever_rejeicao(dados, indice, erros):
+    """Descrição de uma fonte rejeitada, no formato de fontes_rejeitadas."""
+    dados = dados if isinstance(dados, dict) else {}
+    link = dados.get('link')
+    return {
+        'indice': indice,
+        'titulo': converter_texto(dados.get('titulo')),
+        'link': link if isinstance(link, str) else None,
+        'erros': erros,
+    }
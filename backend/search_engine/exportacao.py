@@ -0,0 +1,220 @@
+import csv
+import io
+import json
+import re
+from itertools import chain
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PesquisaAcademica, FonteAcademica, PesquisaFonte
+from .normalizacao import normalizar_termo
+from .retencao import retencao_pesquisas
+
+# Tamanho aproximado (caracteres) de cada bloco enviado na resposta
+TAMANHO_BLOCO = 64 * 1024
+
+COLUNAS_CSV = [
+    'pesquisa_id', 'termo', 'data_pesquisa', 'status', 'modo', 'posicao', 'pontuacao', 'fonte_id', 'titulo',
+    'autores', 'instituicao', 'ano_publicacao', 'link', 'tipo_acesso', 'descricao',
+]
+
+CAMPOS_FONTE = ['id', 'titulo', 'autores', 'instituicao', 'ano_publicacao', 'link', 'descricao', 'tipo_acesso']
+
+
+def filtrar_pesquisas(desde=None, ate=None, termo=None, status=None):
+    """
+    Pesquisas do histórico dentro dos filtros, da mais recente para a mais antiga.
+
+    Args:
+        desde: Data inicial (inclusive) da pesquisa
+        ate: Data final (inclusive) da pesquisa
+        termo: Trecho do termo, comparado sem acentos e sem diferenciar maiúsculas
+        status: Status da pesquisa
+
+    Returns:
+        QuerySet de PesquisaAcademica ordenado como o histórico
+    """
+    pesquisas = PesquisaAcademica.objects.order_by('-data_pesquisa', '-id')
+    # Intervalos de datetime (e não __date) para aproveitar o índice de data_pesquisa
+    if desde is not None:
+        pesquisas = pesquisas.filter(data_pesquisa__gte=timezone.make_aware(datetime.combine(desde, time.min)))
+    if ate is not None:
+        pesquisas = pesquisas.filter(
+            data_pesquisa__lt=timezone.make_aware(datetime.combine(ate + timedelta(days=1), time.min))
+        )
+    if termo:
+        pesquisas = pesquisas.filter(termo_normalizado__contains=normalizar_termo(termo))
+    if status:
+        pesquisas = pesquisas.filter(status=status)
+    return pesquisas
+
+
+# Colunas lidas de cada pesquisa e de cada fonte associada (LEFT JOIN: pesquisas sem
+# fontes aparecem uma vez, com as colunas da fonte nulas)
+CAMPOS_PESQUISA = ['id', 'termo', 'data_pesquisa', 'status', 'erro', 'modo']
+CAMPOS_ITEM = ['itens__posicao', 'itens__pontuacao'] + [f'itens__fonte__{campo}' for campo in CAMPOS_FONTE]
+CAMPOS_ARQUIVO = ['arquivo', 'arquivo_posicao', 'arquivo_tamanho']
+
+
+def _linhas_pesquisa_fonte(pesquisas):
+    """
+    Tuplas (campos da pesquisa + posição e pontuação + campos da fonte) em uma única consulta percorrida
+    pelo cursor em lotes, sem instanciar modelos. As linhas de uma pesquisa são consecutivas
+    e seguem a ordem das fontes; as fontes de pesquisas arquivadas são lidas do arquivo.
+    """
+    linhas = pesquisas.order_by('-data_pesquisa', '-id', 'itens__posicao', 'itens__id').values_list(
+        *CAMPOS_PESQUISA, *CAMPOS_ITEM, *CAMPOS_ARQUIVO
+    ).iterator(chunk_size=settings.HISTORICO_EXPORTACAO_LOTE)
+    for linha in linhas:
+        if linha[-3] is None:
+            yield linha[:-3]
+            continue
+        # Pesquisa arquivada pela retenção: uma única linha no banco, sem fontes associadas
+        dados_pesquisa = linha[:len(CAMPOS_PESQUISA)]
+        fontes = sorted(retencao_pesquisas.ler_registro(*linha[-3:])['fontes'], key=lambda fonte: fonte['posicao'])
+        if not fontes:
+            yield dados_pesquisa + (None,) * len(CAMPOS_ITEM)
+        for fonte in fontes:
+            yield dados_pesquisa + (fonte['posicao'], fonte.get('pontuacao')) + tuple(fonte[campo] for campo in CAMPOS_FONTE)
+
+
+def _em_blocos(registros):
+    """Agrupa os textos gerados em blocos de cerca de TAMANHO_BLOCO caracteres."""
+    partes = []
+    tamanho = 0
+    for registro in registros:
+        partes.append(registro)
+        tamanho += len(registro)
+        if tamanho >= TAMANHO_BLOCO:
+            yield ''.join(partes)
+            partes, tamanho = [], 0
+    if partes:
+        yield ''.join(partes)
+
+
+def gerar_csv(pesquisas):
+    """Uma linha por fonte de cada pesquisa; pesquisas sem fontes ocupam uma linha com as colunas da fonte vazias."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS_CSV)
+    for id_, termo, data, status, _erro, modo, posicao, pontuacao, *fonte in _linhas_pesquisa_fonte(pesquisas):
+        fonte_id, titulo, autores, instituicao, ano, link, descricao, tipo_acesso = fonte
+        escritor.writerow((id_, termo, data.isoformat(), status, modo, posicao, pontuacao, fonte_id, titulo,
+                           autores, instituicao, ano, link, tipo_acesso, descricao))
+        if buffer.tell() >= TAMANHO_BLOCO:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _linhas_jsonl(pesquisas):
+    registro = None
+    for linha in _linhas_pesquisa_fonte(pesquisas):
+        if registro is None or registro['id'] != linha[0]:
+            if registro is not None:
+                yield json.dumps(registro, ensure_ascii=False) + '\n'
+            id_, termo, data, status, erro, modo = linha[:6]
+            registro = {'id': id_, 'termo': termo, 'data_pesquisa': data.isoformat(), 'status': status,
+                        'erro': erro, 'modo': modo, 'fontes': []}
+        if linha[8] is not None:
+            registro['fontes'].append({'pontuacao': linha[7], **dict(zip(CAMPOS_FONTE, linha[8:]))})
+    if registro is not None:
+        yield json.dumps(registro, ensure_ascii=False) + '\n'
+
+
+def gerar_jsonl(pesquisas):
+    """Um objeto JSON por linha para cada pesquisa, com as fontes (e a pontuação de cada uma) na ordem da pesquisa."""
+    return _em_blocos(_linhas_jsonl(pesquisas))
+
+
+_ESPECIAIS_BIBTEX = re.compile(r'([\\{}&%$#_])')
+
+
+def _escapar_bibtex(texto):
+    def escapar(correspondencia):
+        caractere = correspondencia.group(1)
+        return r'\textbackslash{}' if caractere == '\\' else '\\' + caractere
+    return _ESPECIAIS_BIBTEX.sub(escapar, ' '.join(str(texto).split()))
+
+
+def _chave_bibtex(fonte_id, autores, ano):
+    """Chave da entrada: sobrenome do primeiro autor, ano e id da fonte (ex.: silva2021_42)."""
+    autor = re.sub(r'[^a-z0-9]', '', normalizar_termo((autores or '').split(',')[0].split(';')[0]))
+    return f"{autor[:20] or 'fonte'}{ano or ''}_{fonte_id}"
+
+
+def _fontes_arquivadas_bibtex(pesquisas):
+    """
+    Fontes das pesquisas arquivadas, exceto as que também pertencem a pesquisas exportadas
+    que continuam no banco (já incluídas na primeira parte do arquivo).
+    """
+    quentes = pesquisas.order_by().filter(arquivo__isnull=True)
+    emitidas = set()
+    arquivadas = pesquisas.filter(arquivo__isnull=False).order_by('id').values_list(*CAMPOS_ARQUIVO)
+    for ponteiro in arquivadas.iterator(chunk_size=settings.HISTORICO_EXPORTACAO_LOTE):
+        fontes = [fonte for fonte in retencao_pesquisas.ler_registro(*ponteiro)['fontes'] if fonte['id'] not in emitidas]
+        no_banco = set(PesquisaFonte.objects.filter(
+            fonte_id__in=[fonte['id'] for fonte in fontes], pesquisa__in=quentes
+        ).values_list('fonte_id', flat=True))
+        for fonte in fontes:
+            if fonte['id'] not in no_banco:
+                emitidas.add(fonte['id'])
+                yield tuple(fonte[campo] for campo in CAMPOS_FONTE)
+
+
+def _entradas_bibtex(pesquisas):
+    fontes = FonteAcademica.objects.filter(
+        id__in=PesquisaFonte.objects.filter(pesquisa__in=pesquisas.order_by()).values('fonte_id')
+    ).order_by('id').values_list(*CAMPOS_FONTE)
+    for fonte_id, titulo, autores, instituicao, ano, link, descricao, tipo_acesso in chain(
+        fontes.iterator(chunk_size=settings.HISTORICO_EXPORTACAO_LOTE), _fontes_arquivadas_bibtex(pesquisas)
+    ):
+        campos = [('title', titulo)]
+        if autores:
+            campos.append(('author', ' and '.join(a.strip() for a in autores.split(';') if a.strip())))
+        if ano:
+            campos.append(('year', ano))
+        if instituicao:
+            campos.append(('organization', instituicao))
+        if tipo_acesso:
+            campos.append(('howpublished', tipo_acesso))
+        if descricao:
+            campos.append(('abstract', descricao))
+        corpo = ''.join(f"  {nome} = {{{_escapar_bibtex(valor)}}},\n" for nome, valor in campos)
+        if link:
+            # O link vai sem escape, como esperado pelo campo url
+            corpo += f"  url = {{{link.replace('{', '%7B').replace('}', '%7D')}}},\n"
+        yield f"@misc{{{_chave_bibtex(fonte_id, autores, ano)},\n{corpo}}}\n\n"
+
+
+def gerar_bibtex(pesquisas):
+    """Uma entrada @misc por fonte das pesquisas, sem repetir fontes encontradas por mais de uma pesquisa."""
+    return _em_blocos(_entradas_bibtex(pesquisas))
+
+
+# Formato -> (função geradora, content type, extensão do arquivo)
+FORMATOS = {
+    'csv': (gerar_csv, 'text/csv; charset=utf-8', 'csv'),
+    'jsonl': (gerar_jsonl, 'application/x-ndjson; charset=utf-8', 'jsonl'),
+    'bibtex': (gerar_bibtex, 'application/x-bibtex; charset=utf-8', 'bib'),
+}
+
+
+async def iterar_async(blocos):
+    """
+    Percorre um gerador síncrono de blocos a partir de código assíncrono, um bloco por vez.
+
+    Via ASGI, o Django 4.2 consome geradores síncronos inteiros antes de enviar a resposta;
+    com este adaptador cada bloco é lido (e o cursor avançado) na thread do ORM sob demanda.
+    """
+    proximo = sync_to_async(next)
+    fim = object()
+    while True:
+        bloco = await proximo(blocos, fim)
+        if bloco is fim:
+            return
+        yield bloco
@@ -0,0 +1,79 @@
+import logging
+
+from django.db import connection, DatabaseError
+
+from .models import FonteAcademica
+from .normalizacao import palavras_relevantes
+
+logger = logging.getLogger(__name__)
+
+# Tabela FTS5 criada pela migração 0007 e mantida por gatilhos
+TABELA_FTS = 'search_engine_fonteacademica_fts'
+
+# Pesos do BM25 por coluna, na ordem do índice: titulo, descricao, autores, instituicao
+PESOS_BM25 = (5.0, 1.0, 2.0, 1.0)
+
+
+def indice_disponivel():
+    """Indica se o banco atual possui o índice FTS5 (apenas SQLite)."""
+    return connection.vendor == 'sqlite'
+
+
+def montar_consulta_fts(termo, todos_os_termos=False):
+    """
+    Converte um termo de pesquisa em uma expressão MATCH do FTS5.
+
+    Cada palavra vira uma frase entre aspas (o que neutraliza a sintaxe do FTS5 no
+    texto do usuário), com busca por prefixo em palavras maiores, para que "rede"
+    encontre "redes".
+
+    Args:
+        termo: O termo digitado pelo usuário
+        todos_os_termos: Se True, exige todas as palavras (AND); senão, qualquer uma (OR)
+
+    Returns:
+        A expressão de consulta ou string vazia se o termo não tiver palavras úteis
+    """
+    frases = [f'"{p}"*' if len(p) >= 4 else f'"{p}"' for p in palavras_relevantes(termo)]
+    return (' AND ' if todos_os_termos else ' OR ').join(frases)
+
+
+def buscar_fontes_locais(termo, limite=20, todos_os_termos=False):
+    """
+    Busca fontes já armazenadas, ordenadas por relevância (BM25).
+
+    Args:
+        termo: O termo a ser pesquisado
+        limite: Quantidade máxima de fontes retornadas
+        todos_os_termos: Se True, retorna apenas fontes que contenham todas as palavras
+
+    Returns:
+        Lista de objetos FonteAcademica com o atributo relevancia (maior é melhor)
+    """
+    consulta = montar_consulta_fts(termo, todos_os_termos)
+    if not consulta or not indice_disponivel():
+        return []
+
+    pesos = ', '.join(str(peso) for peso in PESOS_BM25)
+    sql = (
+        f"SELECT rowid, bm25({TABELA_FTS}, {pesos}) AS pontuacao FROM {TABELA_FTS} "
+        f"WHERE {TABELA_FTS} MATCH %s ORDER BY pontuacao LIMIT %s"
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [consulta, limite])
+            candidatos = cursor.fetchall()
+    except DatabaseError as e:
+        logger.error(f"Erro na busca do índice local para '{termo}': {str(e)}")
+        return []
+
+    fontes_por_id = FonteAcademica.objects.in_bulk([fonte_id for fonte_id, _ in candidatos])
+    resultado = []
+    for fonte_id, pontuacao in candidatos:
+        fonte = fontes_por_id.get(fonte_id)
+        if fonte is None:
+            continue
+        # O bm25() do SQLite é negativo: quanto menor, mais relevante
+        fonte.relevancia = -pontuacao
+        resultado.append(fonte)
+    return resultado
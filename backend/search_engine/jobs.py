@@ -0,0 +1,140 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .models import PesquisaAcademica
+from .services import executar_busca
+
+logger = logging.getLogger(__name__)
+
+
+class PoolPesquisas:
+    """
+    Pool local de workers que processa pesquisas pendentes em segundo plano.
+
+    A fila é a própria tabela de pesquisas: um worker reserva a pesquisa pendente mais
+    antiga com um UPDATE condicional (pendente -> executando), o que permite que vários
+    processos compartilhem o mesmo banco sem processar a mesma pesquisa duas vezes.
+    Como o estado fica no banco, pesquisas pendentes sobrevivem a reinicializações e são
+    retomadas quando o pool volta a rodar.
+    """
+
+    def __init__(self, workers, intervalo_consulta, prazo_execucao):
+        self.workers = workers
+        self.intervalo_consulta = intervalo_consulta
+        self.prazo_execucao = prazo_execucao
+        self._sinal = threading.Semaphore(0)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+
+    @property
+    def ativo(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def iniciar(self):
+        """Inicia os workers, se ainda não estiverem rodando. Pode ser chamado várias vezes."""
+        with self._lock:
+            if self.ativo:
+                return
+            self._parar.clear()
+            self.recuperar_abandonadas()
+            self._threads = [
+                threading.Thread(target=self._executar_worker, name=f"pesquisa-worker-{i + 1}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            logger.info(f"Pool de pesquisas iniciado com {self.workers} workers")
+
+    def parar(self, timeout=None):
+        self._parar.set()
+        for _ in self._threads:
+            self._sinal.release()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def notificar(self):
+        """Acorda um worker para processar uma pesquisa recém-enfileirada."""
+        self._sinal.release()
+
+    def recuperar_abandonadas(self):
+        """
+        Devolve à fila as pesquisas que ficaram em execução além do prazo, normalmente
+        porque o processo que as executava foi encerrado.
+
+        Returns:
+            Quantidade de pesquisas devolvidas à fila
+        """
+        limite = timezone.now() - timedelta(seconds=self.prazo_execucao)
+        recuperadas = PesquisaAcademica.objects.filter(
+            status=PesquisaAcademica.Status.EXECUTANDO, atualizado_em__lt=limite
+        ).update(status=PesquisaAcademica.Status.PENDENTE, atualizado_em=timezone.now())
+        if recuperadas:
+            logger.warning(f"{recuperadas} pesquisas abandonadas voltaram para a fila")
+        return recuperadas
+
+    def quantidade_pendente(self):
+        return PesquisaAcademica.objects.filter(status=PesquisaAcademica.Status.PENDENTE).count()
+
+    def reservar_proxima(self):
+        """
+        Reserva a pesquisa pendente mais antiga para este worker.
+
+        Returns:
+            A pesquisa reservada ou None se a fila estiver vazia
+        """
+        while True:
+            pesquisa_id = (
+                PesquisaAcademica.objects
+                .filter(status=PesquisaAcademica.Status.PENDENTE)
+                .order_by('id')
+                .values_list('id', flat=True)
+                .first()
+            )
+            if pesquisa_id is None:
+                return None
+            reservada = PesquisaAcademica.objects.filter(
+                id=pesquisa_id, status=PesquisaAcademica.Status.PENDENTE
+            ).update(status=PesquisaAcademica.Status.EXECUTANDO, atualizado_em=timezone.now())
+            if reservada:
+                return PesquisaAcademica.objects.get(id=pesquisa_id)
+            # Outro worker reservou a mesma pesquisa; tenta a próxima
+
+    def processar_proxima(self):
+        """
+        Processa uma única pesquisa pendente, se houver.
+
+        Returns:
+            True se alguma pesquisa foi processada
+        """
+        pesquisa = self.reservar_proxima()
+        if pesquisa is None:
+            return False
+        logger.info(f"Processando pesquisa {pesquisa.id} em segundo plano: {pesquisa.termo}")
+        executar_busca(pesquisa)
+        return True
+
+    def _executar_worker(self):
+        try:
+            while not self._parar.is_set():
+                close_old_connections()
+                try:
+                    if self.processar_proxima():
+                        continue
+                except Exception as e:
+                    logger.error(f"Erro no worker de pesquisas: {str(e)}")
+                self._sinal.acquire(timeout=self.intervalo_consulta)
+        finally:
+            connection.close()
+
+
+pool_pesquisas = PoolPesquisas(
+    workers=settings.BUSCA_JOBS_WORKERS,
+    intervalo_consulta=settings.BUSCA_JOBS_INTERVALO_CONSULTA,
+    prazo_execucao=settings.BUSCA_JOBS_PRAZO_EXECUCAO,
+)
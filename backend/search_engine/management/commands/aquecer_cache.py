@@ -0,0 +1,123 @@
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from search_engine.aquecimento import SEM_ORCAMENTO, aquecedor_cache
+from search_engine.cache import cache_buscas
+from search_engine.models import PesquisaAcademica
+
+# Quantidades de termos para as quais a cobertura da demanda é informada
+CORTES_COBERTURA = (10, 25, 50, 100, 200, 500, 1000)
+
+# Candidatos listados no relatório (o resumo considera todos)
+TERMOS_LISTADOS = 20
+
+
+class Command(BaseCommand):
+    help = ("Refaz as buscas dos termos mais procurados no histórico que não estão com o resultado "
+            "dentro do TTL do cache, para que o pico de acesso encontre o cache aquecido")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=settings.AQUECIMENTO_TERMOS,
+                            help="Quantidade de termos mais procurados considerados")
+        parser.add_argument('--paralelas', type=int, default=settings.AQUECIMENTO_PARALELAS,
+                            help="Buscas executadas ao mesmo tempo")
+        parser.add_argument('--orcamento-tokens', type=int, default=settings.AQUECIMENTO_ORCAMENTO_TOKENS,
+                            help="Tokens disponíveis por execução (0 = sem limite)")
+        parser.add_argument('--forcar', action='store_true',
+                            help="Busca também os termos com resultado dentro do TTL")
+        parser.add_argument('--simular', action='store_true',
+                            help="Apenas lista os termos candidatos, o estado do cache e a cobertura da demanda")
+        parser.add_argument('--agendar', action='store_true',
+                            help="Repete o aquecimento todos os dias no horário de --horario, sem encerrar")
+        parser.add_argument('--horario', default=settings.AQUECIMENTO_HORARIO,
+                            help="Horário (HH:MM, horário local) das execuções com --agendar")
+
+    def handle(self, *args, **options):
+        if not cache_buscas.ativo:
+            raise CommandError("O cache de buscas está desativado (BUSCA_CACHE_TTL ou BUSCA_CACHE_MAX_ENTRADAS = 0)")
+
+        if options['simular']:
+            self._relatorio(aquecedor_cache.avaliar(options['limite']))
+            return
+
+        if not options['agendar']:
+            self._aquecer(options)
+            return
+
+        try:
+            horario = datetime.strptime(options['horario'], '%H:%M').time()
+        except ValueError:
+            raise CommandError(f"Horário inválido: {options['horario']} (use HH:MM)")
+        self.stdout.write(f"Aquecendo o cache todos os dias às {horario:%H:%M} (Ctrl+C para encerrar)")
+        try:
+            while True:
+                time.sleep(self._segundos_ate(horario))
+                close_old_connections()
+                try:
+                    self._aquecer(options)
+                except Exception as e:
+                    self.stderr.write(f"Erro ao aquecer o cache: {str(e)}")
+        except KeyboardInterrupt:
+            self.stdout.write("Encerrando...")
+
+    @staticmethod
+    def _segundos_ate(horario):
+        agora = datetime.now()
+        proxima = datetime.combine(agora.date(), horario)
+        if proxima <= agora:
+            proxima += timedelta(days=1)
+        return (proxima - agora).total_seconds()
+
+    def _aquecer(self, options):
+        inicio = time.monotonic()
+        resumo = aquecedor_cache.aquecer(
+            options['limite'], paralelas=options['paralelas'],
+            orcamento_tokens=options['orcamento_tokens'], forcar=options['forcar'],
+        )
+        self._relatorio(resumo)
+
+        status = [candidato['status'] for candidato in resumo['candidatos']]
+        orcamento = options['orcamento_tokens']
+        self.stdout.write(self.style.SUCCESS(
+            f"{status.count(PesquisaAcademica.Status.CONCLUIDA)} termos aquecidos, "
+            f"{status.count(PesquisaAcademica.Status.FALHOU)} falharam, {status.count(None)} já estavam em cache, "
+            f"{status.count(SEM_ORCAMENTO)} sem orçamento; {resumo['tokens']} tokens"
+            f"{f' de {orcamento}' if orcamento else ''} em {time.monotonic() - inicio:.0f}s"
+        ))
+
+    def _relatorio(self, resumo):
+        candidatos = resumo['candidatos']
+        depois = 'taxa_depois' in resumo
+        self.stdout.write(f"{'termo':<40}{'demanda/dia':>12}{'janela':>8}{'recentes':>9}{'antes':>10}"
+                          + (f"{'depois':>10}{'tokens':>9}" if depois else ''))
+        for candidato in candidatos[:TERMOS_LISTADOS]:
+            self.stdout.write(
+                f"{candidato['termo'][:39]:<40}{candidato['demanda']:>12.2f}{candidato['total']:>8}"
+                f"{candidato['recentes']:>9}{candidato['antes']:>10}"
+                + (f"{candidato['depois']:>10}{candidato['tokens']:>9}" if depois else '')
+            )
+        if len(candidatos) > TERMOS_LISTADOS:
+            self.stdout.write(f"... e mais {len(candidatos) - TERMOS_LISTADOS} termos")
+
+        if not resumo['demanda_total']:
+            self.stdout.write("Nenhuma pesquisa no histórico da janela")
+            return
+        # Quanto da demanda prevista os N primeiros termos representam, para ajustar --limite
+        acumulada = 0.0
+        cobertura = []
+        cortes = [corte for corte in CORTES_COBERTURA if corte < len(candidatos)] + [len(candidatos)]
+        for posicao, candidato in enumerate(candidatos, start=1):
+            acumulada += candidato['demanda']
+            if posicao in cortes:
+                cobertura.append(f"{posicao}: {acumulada / resumo['demanda_total']:.1%}")
+        self.stdout.write(f"Demanda prevista coberta pelos primeiros termos: {', '.join(cobertura)}")
+
+        mensagem = f"Taxa de acerto prevista do cache: {resumo['taxa_antes']:.1%}"
+        if depois:
+            ganho = (resumo['taxa_depois'] - resumo['taxa_antes']) * 100
+            mensagem += f" -> {resumo['taxa_depois']:.1%} ({ganho:+.1f} p.p.)"
+        self.stdout.write(mensagem)
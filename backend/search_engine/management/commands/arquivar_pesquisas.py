@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from search_engine.retencao import retencao_pesquisas
+
+
+class Command(BaseCommand):
+    help = "Move as pesquisas antigas para os arquivos de retenção compactados, deixando no banco apenas o registro enxuto"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.RETENCAO_DIAS,
+                            help="Idade mínima (dias) das pesquisas arquivadas")
+        parser.add_argument('--limite', type=int, default=None,
+                            help="Quantidade máxima de pesquisas arquivadas por execução")
+        parser.add_argument('--simular', action='store_true',
+                            help="Apenas informa quantas pesquisas seriam arquivadas")
+        parser.add_argument('--vacuum', action='store_true',
+                            help="Executa VACUUM ao final para devolver ao disco o espaço liberado")
+        parser.add_argument('--continuo', action='store_true',
+                            help="Repete o arquivamento a cada RETENCAO_INTERVALO_HORAS, sem encerrar")
+
+    def handle(self, *args, **options):
+        if options['simular']:
+            total = retencao_pesquisas.candidatas(options['dias']).count()
+            self.stdout.write(f"{total} pesquisas com mais de {options['dias']} dias seriam arquivadas")
+            return
+
+        if not options['continuo']:
+            self._arquivar(options)
+            return
+
+        intervalo = settings.RETENCAO_INTERVALO_HORAS * 3600
+        self.stdout.write(f"Arquivando pesquisas a cada {settings.RETENCAO_INTERVALO_HORAS}h (Ctrl+C para encerrar)")
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    self._arquivar(options)
+                except Exception as e:
+                    self.stderr.write(f"Erro ao arquivar pesquisas: {str(e)}")
+                time.sleep(intervalo)
+        except KeyboardInterrupt:
+            self.stdout.write("Encerrando...")
+
+    def _arquivar(self, options):
+        resumo = retencao_pesquisas.arquivar(dias=options['dias'], limite=options['limite'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumo['pesquisas']} pesquisas arquivadas em {retencao_pesquisas.diretorio} "
+            f"({resumo['bytes'] / 1024:.1f} KB), {resumo['fontes_removidas']} fontes removidas do banco"
+        ))
+        if options['vacuum'] and resumo['pesquisas'] and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+            self.stdout.write("Banco compactado (VACUUM)")
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from search_engine.jobs import PoolPesquisas
+
+
+class Command(BaseCommand):
+    help = "Processa as pesquisas pendentes (modo job) em um processo dedicado"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.BUSCA_JOBS_WORKERS,
+                            help="Quantidade de workers simultâneos")
+        parser.add_argument('--uma-vez', action='store_true',
+                            help="Processa as pesquisas pendentes e encerra, sem aguardar novas")
+
+    def handle(self, *args, **options):
+        pool = PoolPesquisas(
+            workers=options['workers'],
+            intervalo_consulta=settings.BUSCA_JOBS_INTERVALO_CONSULTA,
+            prazo_execucao=settings.BUSCA_JOBS_PRAZO_EXECUCAO,
+        )
+
+        if options['uma_vez']:
+            pool.recuperar_abandonadas()
+            processadas = 0
+            while pool.processar_proxima():
+                processadas += 1
+            self.stdout.write(self.style.SUCCESS(f"{processadas} pesquisas processadas"))
+            return
+
+        pool.iniciar()
+        self.stdout.write(f"Processando pesquisas com {options['workers']} workers (Ctrl+C para encerrar)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            self.stdout.write("Encerrando workers...")
+            pool.parar(timeout=30)
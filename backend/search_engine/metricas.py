@@ -0,0 +1,220 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Limites dos baldes de latência, em segundos (as chamadas ao modelo chegam a dezenas de segundos)
+BALDES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Limites dos baldes de tokens por chamada ao modelo
+BALDES_TOKENS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+def _formatar_valor(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(nomes, valores, extras=()):
+    pares = list(zip(nomes, valores)) + list(extras)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _chave(self, rotulos):
+        if set(rotulos) != set(self.rotulos):
+            raise ValueError(f"A métrica {self.nome} espera os rótulos {self.rotulos}, recebeu {tuple(rotulos)}")
+        return tuple(str(rotulos[nome]) for nome in self.rotulos)
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} {self.tipo}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            linhas.extend(self._linhas(chave, valor) for chave, valor in series)
+        return '\n'.join(linhas)
+
+
+class Contador(_Metrica):
+    """Contador que só cresce (ex.: total de erros por etapa)."""
+
+    tipo = 'counter'
+
+    def incrementar(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+    def valor(self, **rotulos):
+        return self._series.get(self._chave(rotulos), 0)
+
+    def _linhas(self, chave, valor):
+        return f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_valor(valor)}"
+
+
+class Histograma(_Metrica):
+    """Histograma com baldes cumulativos, soma e contagem, como no formato do Prometheus."""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, descricao, rotulos=(), baldes=BALDES_LATENCIA):
+        super().__init__(nome, descricao, rotulos)
+        self.baldes = tuple(sorted(baldes))
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.baldes) + 1), 0.0]
+            serie[0][bisect.bisect_left(self.baldes, valor)] += 1
+            serie[1] += valor
+
+    def contagem(self, **rotulos):
+        serie = self._series.get(self._chave(rotulos))
+        return sum(serie[0]) if serie else 0
+
+    def _linhas(self, chave, serie):
+        contagens, soma = serie
+        linhas = []
+        acumulado = 0
+        for limite, quantidade in zip(self.baldes + (float('inf'),), contagens):
+            acumulado += quantidade
+            rotulos = _formatar_rotulos(self.rotulos, chave, [('le', _formatar_valor(limite))])
+            linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+        rotulos = _formatar_rotulos(self.rotulos, chave)
+        linhas.append(f"{self.nome}_sum{rotulos} {_formatar_valor(soma)}")
+        linhas.append(f"{self.nome}_count{rotulos} {acumulado}")
+        return '\n'.join(linhas)
+
+
+class RegistroMetricas:
+    """
+    Registro em memória das métricas do processo, exportadas no formato de texto do Prometheus.
+
+    Cada processo (ex.: cada worker do gunicorn) mantém as próprias métricas.
+    """
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, classe, nome, *args, **kwargs):
+        with self._lock:
+            if nome not in self._metricas:
+                self._metricas[nome] = classe(nome, *args, **kwargs)
+            return self._metricas[nome]
+
+    def contador(self, nome, descricao, rotulos=()):
+        return self._registrar(Contador, nome, descricao, rotulos)
+
+    def histograma(self, nome, descricao, rotulos=(), baldes=BALDES_LATENCIA):
+        return self._registrar(Histograma, nome, descricao, rotulos, baldes)
+
+    def exportar(self):
+        with self._lock:
+            metricas = list(self._metricas.values())
+        return '\n'.join(metrica.exportar() for metrica in metricas) + '\n'
+
+
+registro = RegistroMetricas()
+
+DURACAO_ETAPA = registro.histograma(
+    'busca_etapa_duracao_segundos', 'Duração de cada etapa do pipeline de busca.', ['etapa']
+)
+ERROS_ETAPA = registro.contador(
+    'busca_etapa_erros_total', 'Etapas do pipeline de busca que terminaram com exceção.', ['etapa']
+)
+TOKENS_MODELO = registro.contador(
+    'busca_modelo_tokens_total', 'Tokens informados em usage pelas chamadas ao modelo.', ['etapa', 'tipo']
+)
+TOKENS_POR_CHAMADA = registro.histograma(
+    'busca_modelo_tokens_por_chamada', 'Tokens de cada chamada ao modelo.', ['etapa', 'tipo'], BALDES_TOKENS
+)
+NOVAS_TENTATIVAS = registro.contador(
+    'busca_modelo_novas_tentativas_total', 'Novas tentativas de chamadas ao modelo após erros temporários.', ['etapa']
+)
+CHAMADAS_RECUSADAS = registro.contador(
+    'busca_modelo_recusadas_total', 'Chamadas ao modelo recusadas pelo circuit breaker.', ['etapa']
+)
+CACHE_COMPLETIONS = registro.contador(
+    'busca_modelo_cache_total', 'Consultas ao cache de completions: hit, miss e gravada.', ['etapa', 'resultado']
+)
+BUSCAS_COALESCIDAS = registro.contador(
+    'busca_coalescidas_total',
+    'Buscas que reaproveitaram uma execução idêntica em andamento, no mesmo processo ou em outro.',
+    ['origem'],
+)
+FONTES = registro.contador(
+    'busca_fontes_total',
+    'Fontes por resultado: extraidas, validas, rejeitadas (validação), inacessiveis e salvas.',
+    ['resultado'],
+)
+PESQUISAS = registro.contador(
+    'busca_pesquisas_total', 'Pesquisas executadas pelo pipeline, por status final.', ['status']
+)
+RETENCAO = registro.contador(
+    'busca_retencao_pesquisas_total', 'Pesquisas movidas para os arquivos de retenção e reidratadas.', ['operacao']
+)
+
+
+# Contagem de tokens do bloco contar_tokens em andamento na thread (ou tarefa) atual
+_tokens_do_contexto = ContextVar('tokens_do_contexto', default=None)
+
+
+@contextmanager
+def contar_tokens():
+    """
+    Soma os tokens informados em usage pelas chamadas ao modelo feitas dentro do bloco, na
+    mesma thread ou tarefa. Respostas servidas pelo cache de completions não contam.
+
+    Yields:
+        Dicionário cujo valor 'tokens' é atualizado a cada chamada
+    """
+    consumo = {'tokens': 0}
+    marcador = _tokens_do_contexto.set(consumo)
+    try:
+        yield consumo
+    finally:
+        _tokens_do_contexto.reset(marcador)
+
+
+@contextmanager
+def medir_etapa(etapa):
+    """Registra a duração da etapa e, se ela levantar uma exceção, conta o erro."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERROS_ETAPA.incrementar(etapa=etapa)
+        raise
+    finally:
+        DURACAO_ETAPA.observar(time.perf_counter() - inicio, etapa=etapa)
+
+
+def registrar_uso_tokens(etapa, uso):
+    """Contabiliza os tokens de prompt e de resposta de um usage da OpenAI (None é ignorado)."""
+    if uso is None:
+        return
+    for tipo, quantidade in (('prompt', uso.prompt_tokens), ('completion', uso.completion_tokens)):
+        TOKENS_MODELO.incrementar(quantidade, etapa=etapa, tipo=tipo)
+        TOKENS_POR_CHAMADA.observar(quantidade, etapa=etapa, tipo=tipo)
+    consumo = _tokens_do_contexto.get()
+    if consumo is not None:
+        consumo['tokens'] += uso.prompt_tokens + uso.completion_tokens
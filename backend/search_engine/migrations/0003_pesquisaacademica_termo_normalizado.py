@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+from search_engine.normalizacao import normalizar_termo
+
+
+def preencher_termo_normalizado(apps, schema_editor):
+    PesquisaAcademica = apps.get_model('search_engine', 'PesquisaAcademica')
+    pesquisas = list(PesquisaAcademica.objects.only('id', 'termo'))
+    for pesquisa in pesquisas:
+        pesquisa.termo_normalizado = normalizar_termo(pesquisa.termo)
+    PesquisaAcademica.objects.bulk_update(pesquisas, ['termo_normalizado'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_engine', '0002_fonteacademica_tipo_acesso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pesquisaacademica',
+            name='termo_normalizado',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Termo sem acentos, em minúsculas e com espaços colapsados', max_length=255),
+        ),
+        migrations.RunPython(preencher_termo_normalizado, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def marcar_pesquisas_existentes_como_concluidas(apps, schema_editor):
+    PesquisaAcademica = apps.get_model('search_engine', 'PesquisaAcademica')
+    PesquisaAcademica.objects.update(status='concluida')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_engine', '0003_pesquisaacademica_termo_normalizado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pesquisaacademica',
+            name='status',
+            field=models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Em execução'), ('concluida', 'Concluída'), ('falhou', 'Falhou')], db_index=True, default='pendente', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='pesquisaacademica',
+            name='erro',
+            field=models.TextField(blank=True, help_text='Motivo da falha, quando a pesquisa falhou', null=True),
+        ),
+        migrations.AddField(
+            model_name='pesquisaacademica',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(marcar_pesquisas_existentes_como_concluidas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_engine', '0004_pesquisaacademica_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pesquisaacademica',
+            index=models.Index(fields=['-data_pesquisa', '-id'], name='pesquisa_data_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pesquisaacademica',
+            index=models.Index(fields=['termo'], name='pesquisa_termo_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_engine', '0005_indices_historico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerificacaoURL',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=1000, unique=True)),
+                ('acessivel', models.BooleanField()),
+                ('status_code', models.IntegerField(blank=True, null=True)),
+                ('url_final', models.URLField(blank=True, help_text='URL após seguir os redirecionamentos', max_length=1000, null=True)),
+                ('content_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('erro', models.CharField(blank=True, max_length=255, null=True)),
+                ('verificado_em', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations
+
+# Índice FTS5 de conteúdo externo: o texto continua apenas na tabela de fontes e o
+# índice é mantido pelos gatilhos abaixo, o que cobre também os bulk_create (que não
+# disparam sinais do Django).
+CRIAR_INDICE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_engine_fonteacademica_fts USING fts5(
+        titulo, descricao, autores, instituicao,
+        content='search_engine_fonteacademica', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_engine_fonteacademica_fts_ai
+    AFTER INSERT ON search_engine_fonteacademica BEGIN
+        INSERT INTO search_engine_fonteacademica_fts(rowid, titulo, descricao, autores, instituicao)
+        VALUES (new.id, new.titulo, new.descricao, new.autores, new.instituicao);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_engine_fonteacademica_fts_ad
+    AFTER DELETE ON search_engine_fonteacademica BEGIN
+        INSERT INTO search_engine_fonteacademica_fts(search_engine_fonteacademica_fts, rowid, titulo, descricao, autores, instituicao)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.autores, old.instituicao);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_engine_fonteacademica_fts_au
+    AFTER UPDATE ON search_engine_fonteacademica BEGIN
+        INSERT INTO search_engine_fonteacademica_fts(search_engine_fonteacademica_fts, rowid, titulo, descricao, autores, instituicao)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.autores, old.instituicao);
+        INSERT INTO search_engine_fonteacademica_fts(rowid, titulo, descricao, autores, instituicao)
+        VALUES (new.id, new.titulo, new.descricao, new.autores, new.instituicao);
+    END
+    """,
+    # Indexa as fontes já existentes
+    "INSERT INTO search_engine_fonteacademica_fts(search_engine_fonteacademica_fts) VALUES ('rebuild')",
+]
+
+REMOVER_INDICE = [
+    "DROP TRIGGER IF EXISTS search_engine_fonteacademica_fts_ai",
+    "DROP TRIGGER IF EXISTS search_engine_fonteacademica_fts_ad",
+    "DROP TRIGGER IF EXISTS search_engine_fonteacademica_fts_au",
+    "DROP TABLE IF EXISTS search_engine_fonteacademica_fts",
+]
+
+
+def criar_indice(apps, schema_editor):
+    # FTS5 é específico do SQLite; em outros bancos a busca local fica desativada
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CRIAR_INDICE:
+        schema_editor.execute(sql)
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in REMOVER_INDICE:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_engine', '0006_verificacaourl'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,140 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+from search_engine.normalizacao import canonizar_url
+
+LOTE = 2000
+
+
+def deduplicar_fontes(apps, schema_editor):
+    """
+    Mantém uma única fonte por URL canônica (a mais antiga) e converte a antiga chave
+    estrangeira de cada fonte em uma associação PesquisaFonte, preservando a ordem.
+    """
+    FonteAcademica = apps.get_model('search_engine', 'FonteAcademica')
+    PesquisaFonte = apps.get_model('search_engine', 'PesquisaFonte')
+    limite = FonteAcademica._meta.get_field('url_canonica').max_length
+
+    canonicas = {}
+    posicoes = {}
+    associadas = set()
+    ultimo_id = 0
+    while True:
+        # Lotes por faixa de ID: o SQLite não garante a leitura de um cursor aberto
+        # enquanto a mesma tabela é alterada
+        lote = list(
+            FonteAcademica.objects.filter(id__gt=ultimo_id).order_by('id')
+            .values_list('id', 'pesquisa_id', 'link')[:LOTE]
+        )
+        if not lote:
+            break
+        ultimo_id = lote[-1][0]
+
+        itens, atualizar, remover = [], [], []
+        for fonte_id, pesquisa_id, link in lote:
+            canonica = canonizar_url(link)
+            if canonica and len(canonica) > limite:
+                canonica = None
+            if canonica is not None:
+                if canonica in canonicas:
+                    remover.append(fonte_id)
+                    fonte_id = canonicas[canonica]
+                else:
+                    canonicas[canonica] = fonte_id
+                    atualizar.append(FonteAcademica(id=fonte_id, url_canonica=canonica))
+            if (pesquisa_id, fonte_id) in associadas:
+                continue
+            associadas.add((pesquisa_id, fonte_id))
+            posicao = posicoes.get(pesquisa_id, 0)
+            posicoes[pesquisa_id] = posicao + 1
+            itens.append(PesquisaFonte(pesquisa_id=pesquisa_id, fonte_id=fonte_id, posicao=posicao))
+
+        FonteAcademica.objects.bulk_update(atualizar, ['url_canonica'], batch_size=500)
+        PesquisaFonte.objects.bulk_create(itens, batch_size=500)
+        for inicio in range(0, len(remover), 500):
+            FonteAcademica.objects.filter(id__in=remover[inicio:inicio + 500]).delete()
+
+
+# A remoção da coluna pesquisa recria a tabela de fontes no SQLite, o que descarta os
+# gatilhos do índice FTS criados na migração 0007; eles são recriados ao final
+GATILHOS_INDICE = [
+    """
+    CREATE TRIGGER IF NOT EXISTS search_engine_fonteacademica_fts_ai
+    AFTER INSERT ON search_engine_fonteacademica BEGIN
+        INSERT INTO search_engine_fonteacademica_fts(rowid, titulo, descricao, autores, instituicao)
+        VALUES (new.id, new.titulo, new.descricao, new.autores, new.instituicao);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_engine_fonteacademica_fts_ad
+    AFTER DELETE ON search_engine_fonteacademica BEGIN
+        INSERT INTO search_engine_fonteacademica_fts(search_engine_fonteacademica_fts, rowid, titulo, descricao, autores, instituicao)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.autores, old.instituicao);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_engine_fonteacademica_fts_au
+    AFTER UPDATE ON search_engine_fonteacademica BEGIN
+        INSERT INTO search_engine_fonteacademica_fts(search_engine_fonteacademica_fts, rowid, titulo, descricao, autores, instituicao)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.autores, old.instituicao);
+        INSERT INTO search_engine_fonteacademica_fts(rowid, titulo, descricao, autores, instituicao)
+        VALUES (new.id, new.titulo, new.descricao, new.autores, new.instituicao);
+    END
+    """,
+    "INSERT INTO search_engine_fonteacademica_fts(search_engine_fonteacademica_fts) VALUES ('rebuild')",
+]
+
+
+def recriar_gatilhos_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in GATILHOS_INDICE:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_engine', '0007_indice_fts_fontes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PesquisaFonte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicao', models.PositiveIntegerField(default=0)),
+                ('fonte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocorrencias', to='search_engine.fonteacademica')),
+                ('pesquisa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='search_engine.pesquisaacademica')),
+            ],
+            options={
+                'ordering': ['posicao', 'id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pesquisafonte',
+            constraint=models.UniqueConstraint(fields=('pesquisa', 'fonte'), name='pesquisa_fonte_unica'),
+        ),
+        migrations.AddField(
+            model_name='fonteacademica',
+            name='url_canonica',
+            field=models.CharField(blank=True, help_text='Forma canônica do link, usada para reaproveitar a fonte entre pesquisas', max_length=1000, null=True),
+        ),
+        # A deduplicação não pode ser desfeita: as cópias removidas não são recriadas
+        migrations.RunPython(deduplicar_fontes),
+        migrations.RemoveField(
+            model_name='fonteacademica',
+            name='pesquisa',
+        ),
+        migrations.AlterField(
+            model_name='fonteacademica',
+            name='url_canonica',
+            field=models.CharField(blank=True, help_text='Forma canônica do link, usada para reaproveitar a fonte entre pesquisas', max_length=1000, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='pesquisaacademica',
+            name='fontes',
+            field=models.ManyToManyField(related_name='pesquisas', through='search_engine.PesquisaFonte', to='search_engine.fonteacademica'),
+        ),
+        migrations.RunPython(recriar_gatilhos_indice, migrations.RunPython.noop),
+    ]
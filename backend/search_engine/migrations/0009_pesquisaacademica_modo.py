@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_engine', '0008_fontes_compartilhadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pesquisaacademica',
+            name='modo',
+            field=models.CharField(choices=[('tres_chamadas', 'Três chamadas (termo, resultados e extração)'), ('chamada_unica', 'Chamada única')], default='tres_chamadas', help_text='Pipeline de chamadas ao modelo usado na busca', max_length=20),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.10 on 2026-10-18 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_engine', '0009_pesquisaacademica_modo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pesquisaacademica',
+            name='arquivo',
+            field=models.CharField(blank=True, help_text='Arquivo de retenção com as fontes da pesquisa, quando ela foi arquivada', max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='pesquisaacademica',
+            name='arquivo_posicao',
+            field=models.BigIntegerField(blank=True, help_text='Posição do registro no arquivo (bytes)', null=True),
+        ),
+        migrations.AddField(
+            model_name='pesquisaacademica',
+            name='arquivo_tamanho',
+            field=models.IntegerField(blank=True, help_text='Tamanho do registro no arquivo (bytes)', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_engine', '0010_pesquisaacademica_arquivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pesquisafonte',
+            name='pontuacao',
+            field=models.FloatField(blank=True, help_text='Pontuação local da fonte na pesquisa (relevância e confiança do domínio, de 0 a 1)', null=True),
+        ),
+    ]
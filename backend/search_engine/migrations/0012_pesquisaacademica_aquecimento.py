@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_engine', '0011_pesquisafonte_pontuacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pesquisaacademica',
+            name='aquecimento',
+            field=models.BooleanField(default=False, help_text='Pesquisa feita pelo aquecimento do cache, e não por um usuário'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.10 on 2026-10-18 02:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_engine', '0012_pesquisaacademica_aquecimento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotPesquisa',
+            fields=[
+                ('pesquisa', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='search_engine.pesquisaacademica')),
+                ('conteudo', models.TextField(help_text='Saída de PesquisaAcademicaSerializer renderizada em JSON')),
+                ('gerado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
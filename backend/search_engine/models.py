@@ -1,16 +1,66 @@
 from django.db import models
+from .normalizacao import normalizar_termo
 
 class PesquisaAcademica(models.Model):
     """Modelo para armazenar pesquisas acadêmicas realizadas"""
+    class Status(models.TextChoices):
+        PENDENTE = 'pendente', 'Pendente'
+        EXECUTANDO = 'executando', 'Em execução'
+        CONCLUIDA = 'concluida', 'Concluída'
+        FALHOU = 'falhou', 'Falhou'
+    
+    class Modo(models.TextChoices):
+        TRES_CHAMADAS = 'tres_chamadas', 'Três chamadas (termo, resultados e extração)'
+        CHAMADA_UNICA = 'chamada_unica', 'Chamada única'
+    
     termo = models.CharField(max_length=255)
+    termo_normalizado = models.CharField(max_length=255, db_index=True, blank=True, default='',
+                                         help_text="Termo sem acentos, em minúsculas e com espaços colapsados")
     data_pesquisa = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDENTE, db_index=True)
+    erro = models.TextField(blank=True, null=True, help_text="Motivo da falha, quando a pesquisa falhou")
+    atualizado_em = models.DateTimeField(auto_now=True)
+    modo = models.CharField(max_length=20, choices=Modo.choices, default=Modo.TRES_CHAMADAS,
+                            help_text="Pipeline de chamadas ao modelo usado na busca")
+    fontes = models.ManyToManyField('FonteAcademica', through='PesquisaFonte', related_name='pesquisas')
+    arquivo = models.CharField(max_length=100, blank=True, null=True,
+                               help_text="Arquivo de retenção com as fontes da pesquisa, quando ela foi arquivada")
+    arquivo_posicao = models.BigIntegerField(blank=True, null=True, help_text="Posição do registro no arquivo (bytes)")
+    arquivo_tamanho = models.IntegerField(blank=True, null=True, help_text="Tamanho do registro no arquivo (bytes)")
+    aquecimento = models.BooleanField(default=False,
+                                      help_text="Pesquisa feita pelo aquecimento do cache, e não por um usuário")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-data_pesquisa', '-id'], name='pesquisa_data_id_idx'),
+            models.Index(fields=['termo'], name='pesquisa_termo_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.termo_normalizado = normalizar_termo(self.termo)
+        super().save(*args, **kwargs)
+    
+    @property
+    def fontes_ordenadas(self):
+        """Fontes da pesquisa na ordem da pontuação local, com o atributo pontuacao de cada uma"""
+        if self.arquivo:
+            # Pesquisa arquivada pela retenção: as fontes são lidas do arquivo, sem voltar ao banco
+            from .retencao import retencao_pesquisas
+            return retencao_pesquisas.fontes_arquivadas(self)
+        itens = self.itens.all()
+        if 'itens' not in getattr(self, '_prefetched_objects_cache', {}):
+            itens = itens.select_related('fonte')
+        fontes = []
+        for item in itens:
+            item.fonte.pontuacao = item.pontuacao
+            fontes.append(item.fonte)
+        return fontes
     
     def __str__(self):
         return self.termo
 
 class FonteAcademica(models.Model):
-    """Modelo para armazenar as fontes acadêmicas encontradas"""
-    pesquisa = models.ForeignKey(PesquisaAcademica, on_delete=models.CASCADE, related_name='fontes')
+    """Modelo para armazenar as fontes acadêmicas encontradas, compartilhadas entre as pesquisas"""
     titulo = models.CharField(max_length=500)
     autores = models.CharField(max_length=500, blank=True, null=True)
     instituicao = models.CharField(max_length=255, blank=True, null=True)
@@ -19,6 +69,49 @@ class FonteAcademica(models.Model):
     descricao = models.TextField(blank=True, null=True)
     tipo_acesso = models.CharField(max_length=100, blank=True, null=True, 
                                  help_text="Tipo de acesso ao documento, ex: PDF, Texto completo, Acesso aberto")
+    url_canonica = models.CharField(max_length=1000, unique=True, blank=True, null=True,
+                                    help_text="Forma canônica do link, usada para reaproveitar a fonte entre pesquisas")
+    
+    def __str__(self):
+        return self.titulo
+
+class PesquisaFonte(models.Model):
+    """Associação entre uma pesquisa e as fontes que ela encontrou, da maior para a menor pontuação"""
+    pesquisa = models.ForeignKey(PesquisaAcademica, on_delete=models.CASCADE, related_name='itens')
+    fonte = models.ForeignKey(FonteAcademica, on_delete=models.CASCADE, related_name='ocorrencias')
+    posicao = models.PositiveIntegerField(default=0)
+    pontuacao = models.FloatField(blank=True, null=True,
+                                  help_text="Pontuação local da fonte na pesquisa (relevância e confiança do domínio, de 0 a 1)")
+    
+    class Meta:
+        ordering = ['posicao', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['pesquisa', 'fonte'], name='pesquisa_fonte_unica'),
+        ]
+    
+    def __str__(self):
+        return f"{self.pesquisa_id} -> {self.fonte_id}"
+
+class SnapshotPesquisa(models.Model):
+    """Resposta JSON já renderizada de uma pesquisa terminada, servida pelo histórico e pelo detalhe"""
+    pesquisa = models.OneToOneField(PesquisaAcademica, on_delete=models.CASCADE, primary_key=True,
+                                    related_name='snapshot')
+    conteudo = models.TextField(help_text="Saída de PesquisaAcademicaSerializer renderizada em JSON")
+    gerado_em = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Snapshot da pesquisa {self.pesquisa_id}"
+
+class VerificacaoURL(models.Model):
+    """Cache persistente das verificações de acessibilidade dos links"""
+    url = models.URLField(max_length=1000, unique=True)
+    acessivel = models.BooleanField()
+    status_code = models.IntegerField(blank=True, null=True)
+    url_final = models.URLField(max_length=1000, blank=True, null=True,
+                                help_text="URL após seguir os redirecionamentos")
+    content_type = models.CharField(max_length=100, blank=True, null=True)
+    erro = models.CharField(max_length=255, blank=True, null=True)
+    verificado_em = models.DateTimeField()
     
     def __str__(self):
-        return self.titulo 
\ No newline at end of file
+        return self.url
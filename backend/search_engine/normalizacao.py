@@ -0,0 +1,120 @@
+import re
+import unicodedata
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
+
+_ESPACOS = re.compile(r'\s+')
+_PALAVRAS = re.compile(r'\w+')
+_DOI = re.compile(r'^(?:doi:\s*)?(10\.\d{4,9}/\S+)$', re.IGNORECASE)
+
+# Hosts de resolução de DOI: todos levam ao mesmo documento
+HOSTS_DOI = {'doi.org', 'dx.doi.org'}
+
+# Parâmetros de rastreamento que não mudam o documento apontado pela URL
+PARAMETROS_RASTREAMENTO = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', '_ga', '_gl',
+    'igshid', 'ref_src', 'spm',
+}
+PREFIXOS_RASTREAMENTO = ('utm_', 'pk_', 'hsa_')
+
+# Palavras ignoradas na comparação de termos por não ajudarem a distinguir buscas
+PALAVRAS_VAZIAS = {
+    'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'na', 'no', 'nas', 'nos',
+    'um', 'uma', 'para', 'por', 'com', 'sobre', 'the', 'of', 'and', 'in', 'on', 'for', 'to',
+}
+
+
+def normalizar_termo(termo):
+    """
+    Normaliza um termo de pesquisa para comparação entre buscas.
+
+    Remove acentos, ignora maiúsculas/minúsculas e colapsa espaços em branco,
+    de forma que "Aprendizado  de Máquina" e "aprendizado de maquina" gerem
+    a mesma chave.
+
+    Args:
+        termo: O termo digitado pelo usuário
+
+    Returns:
+        O termo normalizado (string vazia se o termo for nulo)
+    """
+    if not termo:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', termo)
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return _ESPACOS.sub(' ', sem_acentos.casefold()).strip()
+
+
+def palavras_relevantes(termo, ja_normalizado=False):
+    """
+    Extrai as palavras significativas de um termo, já normalizadas.
+
+    Args:
+        termo: O termo digitado pelo usuário
+        ja_normalizado: Se True, o termo já passou por normalizar_termo (evita repetir a
+            normalização em caminhos críticos)
+
+    Returns:
+        Lista de palavras sem repetição, na ordem do termo, sem palavras vazias.
+        Letras e números isolados são mantidos ("vitamina d", "covid 19").
+    """
+    if not ja_normalizado:
+        termo = normalizar_termo(termo)
+    return [
+        palavra for palavra in dict.fromkeys(_PALAVRAS.findall(termo))
+        if palavra not in PALAVRAS_VAZIAS
+    ]
+
+
+def _parametro_de_rastreamento(nome):
+    nome = nome.lower()
+    return nome in PARAMETROS_RASTREAMENTO or nome.startswith(PREFIXOS_RASTREAMENTO)
+
+
+def canonizar_url(url):
+    """
+    Gera a forma canônica de uma URL, usada para reconhecer a mesma fonte entre buscas.
+
+    O esquema passa a ser https, o host fica em minúsculas e sem "www." e sem a porta
+    padrão, barras finais, fragmentos e parâmetros de rastreamento (utm_*, fbclid...)
+    são removidos e os demais parâmetros são ordenados. Links de DOI (doi.org,
+    dx.doi.org ou "doi:10.xxxx/...") são reduzidos a https://doi.org/<doi em minúsculas>,
+    já que DOIs não diferenciam maiúsculas de minúsculas.
+
+    Args:
+        url: A URL original
+
+    Returns:
+        A URL canônica ou None se a URL for vazia ou não for http(s)/DOI
+    """
+    if not url or not isinstance(url, str):
+        return None
+    url = url.strip()
+
+    doi = _DOI.match(url)
+    if doi:
+        return f"https://doi.org/{doi.group(1).lower()}"
+
+    try:
+        partes = urlsplit(url)
+        porta = partes.port
+    except ValueError:
+        return None
+    if partes.scheme.lower() not in ('http', 'https') or not partes.hostname:
+        return None
+
+    host = partes.hostname.lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    if host in HOSTS_DOI:
+        caminho = unquote(partes.path).lstrip('/')
+        if _DOI.match(caminho):
+            return f"https://doi.org/{caminho.lower()}"
+    if porta and porta not in (80, 443):
+        host = f"{host}:{porta}"
+
+    caminho = re.sub(r'/{2,}', '/', partes.path).rstrip('/')
+    parametros = sorted(
+        (nome, valor) for nome, valor in parse_qsl(partes.query, keep_blank_values=True)
+        if not _parametro_de_rastreamento(nome)
+    )
+    return urlunsplit(('https', host, caminho, urlencode(parametros), ''))
@@ -0,0 +1,20 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class HistoricoCursorPagination(CursorPagination):
+    """
+    Paginação por cursor do histórico, da pesquisa mais recente para a mais antiga.
+
+    Como no CursorPagination do DRF, o cursor guarda apenas o valor do primeiro campo da
+    ordenação (data_pesquisa) da última pesquisa da página, mais um deslocamento para as
+    pesquisas com essa mesma data já entregues. Cada página é obtida por uma consulta no
+    índice (data_pesquisa, id) a partir desse valor, com custo constante mesmo com dezenas de
+    milhares de pesquisas. O id não entra no cursor: só ordena, de forma estável, as
+    pesquisas com a mesma data, e o deslocamento só cresce se muitas delas tiverem
+    exatamente a mesma data (data_pesquisa tem microssegundos, então isso é raro).
+    """
+    ordering = ('-data_pesquisa', '-id')
+    page_size = settings.HISTORICO_TAMANHO_PAGINA
+    page_size_query_param = 'limite'
+    max_page_size = 100
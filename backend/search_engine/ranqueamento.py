@@ -0,0 +1,177 @@
+import math
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.conf import settings
+
+# Lista de domínios acadêmicos confiáveis
+DOMINIOS_ACADEMICOS = [
+    'scielo', 'pubmed', 'arxiv', 'researchgate', 'academia.edu', 'scholar.google',
+    'springer', 'ieee', 'acm.org', 'nature.com', 'science', 'doaj', 'eric.ed.gov',
+    'ssrn', 'jstor', 'wiley', 'tandfonline', 'oup.com', 'sage', 'emerald',
+    'elsevier', 'biomedcentral', 'frontiersin', 'hindawi', 'mdpi'
+]
+
+# Lista de extensões de universidades e institutos
+EXTENSOES_ACADEMICAS = [
+    '.edu', '.edu.br', '.ac.uk', '.edu.au', '.ca', '.fr', '.de', '.it', '.jp',
+    '.ac.', '.uni-', '.usp.br', '.unicamp.br', '.ufrj.br', '.ufmg.br'
+]
+
+# Confiança atribuída a cada grupo do classificador de domínios
+CONFIANCA_DOMINIO_ACADEMICO = 1.0
+CONFIANCA_EXTENSAO_ACADEMICA = 0.6
+
+# Parâmetros do BM25 e peso do título em relação à descrição
+BM25_K1 = 1.2
+BM25_B = 0.75
+PESO_TITULO = 2
+
+# Palavras ignoradas na relevância (sem acentos)
+PALAVRAS_VAZIAS = frozenset(
+    'a ao aos as com da das de do dos e em na nas no nos o os ou para por pela pelas pelo pelos '
+    'que se sem sob sobre um uma umas uns an and at by for from in of on or the to with'.split()
+)
+
+_PALAVRA = re.compile(r'[a-z0-9]+')
+
+# Host de um link http(s), sem usuário e porta (mais barato que urlsplit para milhares de links)
+_HOST = re.compile(r'https?://(?:[^@/?#]*@)?([^:/?#]+)', re.IGNORECASE)
+
+
+def _compilar_classificador(dominios, extensoes):
+    """
+    Expressão única que reconhece, em uma passada pelo host (precedido de "."), os domínios
+    acadêmicos (grupo "dominio") e as extensões de universidades e institutos (grupo "extensao").
+
+    Os domínios precisam começar um rótulo do host ("sage" reconhece sagepub.com, mas não
+    message.com). Extensões terminadas em "." ou "-" podem aparecer em qualquer ponto do host;
+    as demais precisam terminá-lo. Todas as alternativas começam em um ".", o que permite à
+    expressão descartar rapidamente as demais posições do host.
+    """
+    def alternativas(itens):
+        # Mais longas primeiro, para que a alternação prefira o trecho mais específico
+        return '|'.join(re.escape(item) for item in sorted(itens, key=len, reverse=True))
+
+    extensoes = [extensao[1:] if extensao.startswith('.') else extensao for extensao in extensoes]
+    internas = [extensao for extensao in extensoes if extensao.endswith(('.', '-'))]
+    finais = [extensao for extensao in extensoes if extensao not in internas]
+    extensao = [alternativas(internas)] if internas else []
+    if finais:
+        extensao.append(f"(?:{alternativas(finais)})$")
+    return re.compile(rf"\.(?:(?P<dominio>{alternativas(dominios)})|(?P<extensao>{'|'.join(extensao)}))")
+
+
+_CLASSIFICADOR_DOMINIOS = _compilar_classificador(DOMINIOS_ACADEMICOS, EXTENSOES_ACADEMICAS)
+
+
+@lru_cache(maxsize=4096)
+def confianca_host(host):
+    """Confiança (0 a 1) de um host, pelo classificador de domínios. O resultado fica em cache por host."""
+    if not host:
+        return 0.0
+    confianca = 0.0
+    for correspondencia in _CLASSIFICADOR_DOMINIOS.finditer('.' + host):
+        if correspondencia.lastgroup == 'dominio':
+            return CONFIANCA_DOMINIO_ACADEMICO
+        confianca = CONFIANCA_EXTENSAO_ACADEMICA
+    return confianca
+
+
+def confianca_link(link):
+    """Confiança (0 a 1) do domínio de um link."""
+    correspondencia = _HOST.match(link) if link else None
+    return confianca_host(correspondencia.group(1).lower()) if correspondencia else 0.0
+
+
+def palavras(texto):
+    """Palavras de um texto para a relevância: sem acentos, sem palavras vazias e sem o plural em "s"."""
+    if not texto:
+        return []
+    resultado = []
+    # As palavras só têm letras e dígitos ASCII: basta decompor os acentos e descartar o que
+    # não for ASCII, bem mais rápido que normalizar_termo para descrições longas
+    ascii_ = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii').lower()
+    for palavra in _PALAVRA.findall(ascii_):
+        if len(palavra) < 2 or palavra in PALAVRAS_VAZIAS:
+            continue
+        resultado.append(palavra[:-1] if len(palavra) > 4 and palavra[-1] == 's' else palavra)
+    return resultado
+
+
+def relevancia_bm25(termo, fontes):
+    """
+    BM25 do título e da descrição de cada fonte em relação ao termo, normalizado entre 0 e 1.
+
+    O corpus é o próprio conjunto de fontes da pesquisa: o IDF de cada palavra do termo
+    considera em quantas delas ela aparece. O título conta PESO_TITULO vezes.
+
+    Args:
+        termo: Termo pesquisado
+        fontes: Objetos com os atributos titulo e descricao
+
+    Returns:
+        Lista de relevâncias, na ordem das fontes
+    """
+    consulta = set(palavras(termo))
+    if not consulta or not fontes:
+        return [0.0] * len(fontes)
+
+    frequencias = []
+    tamanhos = []
+    documentos_com = dict.fromkeys(consulta, 0)
+    for fonte in fontes:
+        titulo = palavras(fonte.titulo)
+        descricao = palavras(fonte.descricao)
+        frequencia = {}
+        for palavra in titulo:
+            if palavra in consulta:
+                frequencia[palavra] = frequencia.get(palavra, 0) + PESO_TITULO
+        for palavra in descricao:
+            if palavra in consulta:
+                frequencia[palavra] = frequencia.get(palavra, 0) + 1
+        for palavra in frequencia:
+            documentos_com[palavra] += 1
+        frequencias.append(frequencia)
+        tamanhos.append(len(titulo) * PESO_TITULO + len(descricao))
+
+    total = len(fontes)
+    media = (sum(tamanhos) / total) or 1
+    idf = {palavra: math.log(1 + (total - df + 0.5) / (df + 0.5)) for palavra, df in documentos_com.items()}
+    pontuacoes = []
+    for frequencia, tamanho in zip(frequencias, tamanhos):
+        normalizacao = BM25_K1 * (1 - BM25_B + BM25_B * tamanho / media)
+        pontuacoes.append(sum(
+            idf[palavra] * tf * (BM25_K1 + 1) / (tf + normalizacao) for palavra, tf in frequencia.items()
+        ))
+    maior = max(pontuacoes)
+    return [pontuacao / maior for pontuacao in pontuacoes] if maior > 0 else pontuacoes
+
+
+def ranquear_fontes(termo, fontes):
+    """
+    Ordena as fontes pela pontuação local, que combina a relevância (BM25) e a confiança do domínio.
+
+    pontuação = (1 - BUSCA_RANQUEAMENTO_PESO_CONFIANCA) x relevância + BUSCA_RANQUEAMENTO_PESO_CONFIANCA x confiança
+
+    Fontes com a mesma pontuação mantêm a ordem recebida. Com BUSCA_RANQUEAMENTO_ATIVO=False
+    a ordem é mantida e as pontuações são None.
+
+    Args:
+        termo: Termo pesquisado
+        fontes: Objetos com os atributos titulo, descricao e link (FonteExtraida ou FonteAcademica)
+
+    Returns:
+        Lista de tuplas (fonte, pontuação de 0 a 1), da maior para a menor pontuação
+    """
+    if not settings.BUSCA_RANQUEAMENTO_ATIVO:
+        return [(fonte, None) for fonte in fontes]
+    peso = settings.BUSCA_RANQUEAMENTO_PESO_CONFIANCA
+    relevancias = relevancia_bm25(termo, fontes)
+    pontuadas = [
+        (fonte, round((1 - peso) * relevancia + peso * confianca_link(fonte.link), 6))
+        for fonte, relevancia in zip(fontes, relevancias)
+    ]
+    pontuadas.sort(key=lambda par: -par[1])
+    return pontuadas
@@ -0,0 +1,247 @@
+import gzip
+import json
+import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .banco import escrita_serializada
+from .metricas import RETENCAO
+from .models import PesquisaAcademica, FonteAcademica, PesquisaFonte
+from .snapshots import invalidacao_em_lote
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava, apenas uma execução do arquivamento por vez
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Campos de cada fonte gravados no arquivo (e usados para recriá-la na reidratação)
+CAMPOS_FONTE = [
+    'id', 'titulo', 'autores', 'instituicao', 'ano_publicacao', 'link', 'descricao', 'tipo_acesso', 'url_canonica',
+]
+
+
+class RetencaoPesquisas:
+    """
+    Retenção do histórico em dois níveis: banco (quente) e arquivos compactados (frio).
+
+    Pesquisas concluídas ou com falha cuja data e último acesso são mais antigos que
+    `dias` são gravadas em arquivos JSONL só de acréscimo, um por mês da pesquisa
+    (<diretório>/AAAA-MM.jsonl.gz). No banco a pesquisa vira um registro enxuto, com o
+    nome do arquivo e a posição do registro nele; as associações com as fontes são
+    removidas, assim como as fontes que não pertencem a nenhuma outra pesquisa.
+
+    Cada pesquisa é gravada como um membro gzip independente. O arquivo continua sendo um
+    .jsonl.gz comum (os membros são concatenados), mas cada registro pode ser lido sozinho
+    a partir da posição e do tamanho guardados no banco, sem descompactar o mês inteiro.
+    """
+
+    def __init__(self, diretorio, dias, lote):
+        self.diretorio = Path(diretorio)
+        self.dias = dias
+        self.lote = lote
+
+    def candidatas(self, dias=None):
+        """Pesquisas que já podem ser arquivadas."""
+        limite = timezone.now() - timedelta(days=self.dias if dias is None else dias)
+        return PesquisaAcademica.objects.filter(
+            arquivo__isnull=True,
+            status__in=[PesquisaAcademica.Status.CONCLUIDA, PesquisaAcademica.Status.FALHOU],
+            data_pesquisa__lt=limite,
+            # Pesquisas reidratadas ficam no banco por mais um período
+            atualizado_em__lt=limite,
+        )
+
+    def arquivar(self, dias=None, limite=None):
+        """
+        Move as pesquisas antigas para os arquivos, em lotes de `lote` pesquisas.
+
+        Args:
+            dias: Idade mínima das pesquisas; por padrão, a configurada
+            limite: Quantidade máxima de pesquisas arquivadas nesta execução
+
+        Returns:
+            Dicionário com as pesquisas arquivadas, as fontes removidas do banco e os
+            bytes acrescentados aos arquivos
+        """
+        resumo = {'pesquisas': 0, 'fontes_removidas': 0, 'bytes': 0}
+        ultimo_id = 0
+        while limite is None or resumo['pesquisas'] < limite:
+            tamanho = self.lote if limite is None else min(self.lote, limite - resumo['pesquisas'])
+            pesquisas = list(
+                self.candidatas(dias).filter(id__gt=ultimo_id).order_by('id').prefetch_related(
+                    Prefetch('itens', queryset=PesquisaFonte.objects.select_related('fonte'))
+                )[:tamanho]
+            )
+            if not pesquisas:
+                break
+            ultimo_id = pesquisas[-1].id
+
+            # Os registros são gravados (e sincronizados com o disco) antes de o banco apontar para eles
+            ponteiros = self._gravar_registros(pesquisas)
+            fontes = {item.fonte_id for pesquisa in pesquisas for item in pesquisa.itens.all()}
+            arquivadas, removidas = self._substituir_por_registros_enxutos(ponteiros, fontes)
+            resumo['pesquisas'] += arquivadas
+            resumo['fontes_removidas'] += removidas
+            resumo['bytes'] += sum(tamanho for _, _, tamanho in ponteiros.values())
+            RETENCAO.incrementar(arquivadas, operacao='arquivadas')
+
+        if resumo['pesquisas']:
+            logger.info(f"Retenção: {resumo['pesquisas']} pesquisas arquivadas, {resumo['fontes_removidas']} "
+                        f"fontes removidas do banco, {resumo['bytes']} bytes gravados")
+        return resumo
+
+    @staticmethod
+    def _registro(pesquisa):
+        return {
+            'id': pesquisa.id,
+            'termo': pesquisa.termo,
+            'data_pesquisa': pesquisa.data_pesquisa.isoformat(),
+            'atualizado_em': pesquisa.atualizado_em.isoformat(),
+            'status': pesquisa.status,
+            'erro': pesquisa.erro,
+            'modo': pesquisa.modo,
+            'fontes': [
+                {'posicao': item.posicao, 'pontuacao': item.pontuacao,
+                 **{campo: getattr(item.fonte, campo) for campo in CAMPOS_FONTE}}
+                for item in pesquisa.itens.all()
+            ],
+        }
+
+    def _gravar_registros(self, pesquisas):
+        """
+        Acrescenta um membro gzip por pesquisa ao arquivo do mês dela.
+
+        Returns:
+            Dicionário id da pesquisa -> (arquivo, posição, tamanho)
+        """
+        por_arquivo = {}
+        for pesquisa in pesquisas:
+            por_arquivo.setdefault(f"{pesquisa.data_pesquisa:%Y-%m}.jsonl.gz", []).append(pesquisa)
+
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        ponteiros = {}
+        for nome, pesquisas_do_mes in por_arquivo.items():
+            with open(self.diretorio / nome, 'ab') as arquivo:
+                if fcntl is not None:
+                    # Outra execução pode estar acrescentando registros ao mesmo arquivo
+                    fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+                arquivo.seek(0, os.SEEK_END)
+                for pesquisa in pesquisas_do_mes:
+                    linha = json.dumps(self._registro(pesquisa), ensure_ascii=False) + '\n'
+                    membro = gzip.compress(linha.encode('utf-8'), mtime=0)
+                    ponteiros[pesquisa.id] = (nome, arquivo.tell(), len(membro))
+                    arquivo.write(membro)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+        return ponteiros
+
+    @staticmethod
+    @escrita_serializada
+    def _substituir_por_registros_enxutos(ponteiros, fontes):
+        with transaction.atomic():
+            arquivadas = []
+            for pesquisa_id, (nome, posicao, tamanho) in ponteiros.items():
+                # update() não altera atualizado_em, que continua marcando o último acesso
+                if PesquisaAcademica.objects.filter(id=pesquisa_id, arquivo__isnull=True).update(
+                    arquivo=nome, arquivo_posicao=posicao, arquivo_tamanho=tamanho
+                ):
+                    arquivadas.append(pesquisa_id)
+            # O snapshot guardaria as fontes no banco; a pesquisa arquivada é servida pelo arquivo
+            with invalidacao_em_lote(arquivadas):
+                PesquisaFonte.objects.filter(pesquisa_id__in=arquivadas).delete()
+            # Fontes compartilhadas com pesquisas que continuam no banco são mantidas
+            removidas, _ = FonteAcademica.objects.filter(id__in=fontes, ocorrencias__isnull=True).delete()
+        return len(arquivadas), removidas
+
+    def ler_registro(self, nome, posicao, tamanho):
+        """
+        Registro arquivado de uma pesquisa (dicionário com os dados dela e as fontes).
+
+        Args:
+            nome, posicao, tamanho: Campos arquivo, arquivo_posicao e arquivo_tamanho da pesquisa
+        """
+        with open(self.diretorio / nome, 'rb') as arquivo:
+            arquivo.seek(posicao)
+            membro = arquivo.read(tamanho)
+        return json.loads(gzip.decompress(membro))
+
+    def fontes_arquivadas(self, pesquisa):
+        """
+        Fontes de uma pesquisa arquivada, na ordem original e com a pontuação de cada uma, como
+        objetos FonteAcademica não salvos (com o id original). O resultado fica guardado na pesquisa.
+        """
+        if not hasattr(pesquisa, '_fontes_arquivadas'):
+            registro = self.ler_registro(pesquisa.arquivo, pesquisa.arquivo_posicao, pesquisa.arquivo_tamanho)
+            pesquisa._fontes_arquivadas = []
+            for dados in sorted(registro['fontes'], key=lambda fonte: fonte['posicao']):
+                fonte = FonteAcademica(**{campo: dados[campo] for campo in CAMPOS_FONTE})
+                # Registros gravados antes do ranqueamento não têm pontuação
+                fonte.pontuacao = dados.get('pontuacao')
+                pesquisa._fontes_arquivadas.append(fonte)
+        return pesquisa._fontes_arquivadas
+
+    @escrita_serializada
+    def reidratar(self, pesquisa):
+        """
+        Traz uma pesquisa arquivada de volta ao banco, com as fontes, a ordem e as pontuações originais.
+
+        Fontes que continuam no banco (pelo id ou pela URL canônica) são reaproveitadas;
+        as demais são recriadas com o id original. O registro no arquivo é mantido (os
+        arquivos são só de acréscimo) e a pesquisa volta a contar o prazo de retenção.
+
+        Args:
+            pesquisa: Pesquisa arquivada; é atualizada no lugar
+
+        Returns:
+            A própria pesquisa
+        """
+        nome = pesquisa.arquivo
+        fontes = sorted(self.ler_registro(pesquisa.arquivo, pesquisa.arquivo_posicao, pesquisa.arquivo_tamanho)['fontes'], key=lambda fonte: fonte['posicao'])
+        with transaction.atomic():
+            por_id = FonteAcademica.objects.in_bulk([fonte['id'] for fonte in fontes])
+            canonicas = [fonte['url_canonica'] for fonte in fontes if fonte['id'] not in por_id and fonte['url_canonica']]
+            por_canonica = FonteAcademica.objects.in_bulk(canonicas, field_name='url_canonica')
+            novas = [
+                FonteAcademica(**{campo: fonte[campo] for campo in CAMPOS_FONTE})
+                for fonte in fontes
+                if fonte['id'] not in por_id and fonte['url_canonica'] not in por_canonica
+            ]
+            if novas:
+                FonteAcademica.objects.bulk_create(novas, ignore_conflicts=True)
+                por_id.update(FonteAcademica.objects.in_bulk([fonte.id for fonte in novas]))
+                # Fonte com a mesma URL canônica gravada por outra pesquisa nesse meio-tempo
+                por_canonica.update(FonteAcademica.objects.in_bulk(
+                    [fonte.url_canonica for fonte in novas if fonte.id not in por_id and fonte.url_canonica],
+                    field_name='url_canonica',
+                ))
+
+            PesquisaFonte.objects.bulk_create(
+                [
+                    PesquisaFonte(pesquisa=pesquisa, fonte=salva, posicao=fonte['posicao'], pontuacao=fonte.get('pontuacao'))
+                    for fonte in fontes
+                    if (salva := por_id.get(fonte['id']) or por_canonica.get(fonte['url_canonica'])) is not None
+                ],
+                ignore_conflicts=True,
+            )
+            pesquisa.arquivo = pesquisa.arquivo_posicao = pesquisa.arquivo_tamanho = None
+            pesquisa.save(update_fields=['arquivo', 'arquivo_posicao', 'arquivo_tamanho', 'atualizado_em'])
+        if hasattr(pesquisa, '_fontes_arquivadas'):
+            del pesquisa._fontes_arquivadas
+        RETENCAO.incrementar(operacao='reidratadas')
+        logger.info(f"Pesquisa {pesquisa.id} reidratada com {len(fontes)} fontes do arquivo {nome}")
+        return pesquisa
+
+
+retencao_pesquisas = RetencaoPesquisas(
+    diretorio=settings.RETENCAO_DIR,
+    dias=settings.RETENCAO_DIAS,
+    lote=settings.RETENCAO_LOTE,
+)
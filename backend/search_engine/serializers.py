@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import PesquisaAcademica, FonteAcademica
 
@@ -6,17 +7,71 @@ class FonteAcademicaSerializer(serializers.ModelSerializer):
         model = FonteAcademica
         fields = ['id', 'titulo', 'autores', 'instituicao', 'ano_publicacao', 'link', 'descricao', 'tipo_acesso']
 
+class FontePesquisaSerializer(FonteAcademicaSerializer):
+    pontuacao = serializers.FloatField(read_only=True, allow_null=True)
+    
+    class Meta(FonteAcademicaSerializer.Meta):
+        fields = FonteAcademicaSerializer.Meta.fields + ['pontuacao']
+
 class PesquisaAcademicaSerializer(serializers.ModelSerializer):
-    fontes = FonteAcademicaSerializer(many=True, read_only=True)
+    fontes = FontePesquisaSerializer(source='fontes_ordenadas', many=True, read_only=True)
     
     class Meta:
         model = PesquisaAcademica
-        fields = ['id', 'termo', 'data_pesquisa', 'fontes']
+        fields = ['id', 'termo', 'data_pesquisa', 'status', 'erro', 'modo', 'fontes']
+
+class PesquisaStreamSerializer(serializers.ModelSerializer):
+    """Dados da pesquisa no evento "pesquisa" do stream, no mesmo formato das demais respostas"""
+    class Meta:
+        model = PesquisaAcademica
+        fields = ['id', 'termo', 'data_pesquisa']
 
 class PesquisaInputSerializer(serializers.Serializer):
     termo = serializers.CharField(max_length=255)
+    em_segundo_plano = serializers.BooleanField(required=False, default=False)
+    busca_local = serializers.BooleanField(required=False, default=settings.BUSCA_LOCAL_PADRAO)
+    modo = serializers.ChoiceField(choices=PesquisaAcademica.Modo.choices, required=False)
     
     def validate_termo(self, value):
         if len(value.strip()) < 3:
             raise serializers.ValidationError("O termo de pesquisa deve ter pelo menos 3 caracteres.")
-        return value 
\ No newline at end of file
+        return value 
+
+class PesquisaLoteInputSerializer(serializers.Serializer):
+    termos = serializers.ListField(
+        child=serializers.CharField(
+            max_length=255, min_length=3,
+            error_messages={'min_length': "O termo de pesquisa deve ter pelo menos 3 caracteres."},
+        ),
+        min_length=1,
+        max_length=settings.BUSCA_LOTE_MAX_TERMOS,
+    )
+    busca_local = serializers.BooleanField(required=False, default=settings.BUSCA_LOCAL_PADRAO)
+    modo = serializers.ChoiceField(choices=PesquisaAcademica.Modo.choices, required=False)
+
+class ExportacaoHistoricoInputSerializer(serializers.Serializer):
+    formato = serializers.ChoiceField(choices=['csv', 'jsonl', 'bibtex'], required=False, default='csv')
+    desde = serializers.DateField(required=False)
+    ate = serializers.DateField(required=False)
+    termo = serializers.CharField(max_length=255, required=False)
+    status = serializers.ChoiceField(choices=PesquisaAcademica.Status.choices, required=False)
+    
+    def validate(self, data):
+        if data.get('desde') and data.get('ate') and data['desde'] > data['ate']:
+            raise serializers.ValidationError({'ate': "A data final deve ser igual ou posterior à inicial."})
+        return data
+
+class FonteBuscaSerializer(FonteAcademicaSerializer):
+    relevancia = serializers.FloatField(read_only=True)
+    
+    class Meta(FonteAcademicaSerializer.Meta):
+        fields = FonteAcademicaSerializer.Meta.fields + ['relevancia']
+
+class BuscaFontesInputSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=255)
+    limite = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+    
+    def validate_q(self, value):
+        if len(value.strip()) < 3:
+            raise serializers.ValidationError("O termo de busca deve ter pelo menos 3 caracteres.")
+        return value
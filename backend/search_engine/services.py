@@ -3,31 +3,364 @@ import json
 import time
 import logging
 import re
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from urllib.parse import urlparse
-from openai import OpenAI
+from openai import OpenAI, OpenAIError
 from django.conf import settings
-from .models import PesquisaAcademica, FonteAcademica
+from django.db import connection, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
+from .models import PesquisaAcademica, FonteAcademica, PesquisaFonte
+from .chamadas_modelo import chamador_openai, CircuitoAberto
+from .metricas import FONTES, PESQUISAS, ERROS_ETAPA, medir_etapa
+from .banco import escrita_serializada
+from .cache import cache_buscas, CACHE_STALE, CACHE_MISS, CACHE_COALESCED
+from .cache_completions import renovar_respostas
+from .coalescencia import coalescedor_buscas
+from .decodificacao import decodificar_fonte, descrever_rejeicao
+from .normalizacao import normalizar_termo, canonizar_url
+from .streaming import ExtratorFontesIncremental
+from .indice_local import buscar_fontes_locais
+from .ranqueamento import ranquear_fontes
+from .similaridade import indice_similaridade
+from .snapshots import STATUS_FINAIS, gravar_snapshots
+from .verificacao import verificador_links, separar_links_inacessiveis
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
 
-# Configuração da API OpenAI
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# Configuração da API OpenAI (as novas tentativas ficam com chamador_openai)
+client = OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
 
-# Lista de domínios acadêmicos confiáveis
-DOMINIOS_ACADEMICOS = [
-    'scielo', 'pubmed', 'arxiv', 'researchgate', 'academia.edu', 'scholar.google',
-    'springer', 'ieee', 'acm.org', 'nature.com', 'science', 'doaj', 'eric.ed.gov',
-    'ssrn', 'jstor', 'wiley', 'tandfonline', 'oup.com', 'sage', 'emerald',
-    'elsevier', 'biomedcentral', 'frontiersin', 'hindawi', 'mdpi'
-]
+# Definição da ferramenta de pesquisa web exposta ao modelo
+FERRAMENTA_WEB_SEARCH = {
+    "type": "function",
+    "function": {
+        "name": "web_search",
+        "description": "Pesquisa na web por informações atualizadas sobre qualquer tópico",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "search_term": {
+                    "type": "string",
+                    "description": "Termo de pesquisa para buscar na web"
+                }
+            },
+            "required": ["search_term"]
+        }
+    }
+}
+
+# Instruções para análise dos resultados da pesquisa - versão mais flexível
+INSTRUCOES_EXTRACAO_FONTES = """
+    Você é um assistente de pesquisa que ajuda a extrair fontes úteis e relevantes dos resultados de busca.
+    
+    EXTRAÇÃO DE RESULTADOS:
+    1. Extraia cada fonte de informação mencionada nos resultados (artigos, posts, vídeos, etc)
+    2. Foque em identificar corretamente os links para cada fonte
+    3. Certifique-se de que os links tenham formato correto e pareçam válidos
+    
+    CRITÉRIOS DE ACEITAÇÃO:
+    - O link deve começar com http:// ou https://
+    - Prefira sites conhecidos e populares (Wikipedia, portais de notícias, sites oficiais)
+    - Aceite diversos tipos de conteúdo: artigos, blogs, vídeos, tutoriais, documentação, etc
+    - É melhor ter menos resultados com links reais do que muitos com links inválidos
+    
+    PARA CADA FONTE, FORNEÇA:
+    - Título: título claro e descritivo do conteúdo
+    - Fonte: o site ou plataforma de origem (ex: "Wikipedia", "YouTube", "Medium")
+    - Ano: ano de publicação, se disponível (ou null se não for possível determinar)
+    - Link: URL completa e direta para o conteúdo
+    - Tipo: tipo de conteúdo ("Artigo", "Vídeo", "Tutorial", "Documentação", etc)
+    - Descrição: breve resumo do conteúdo (2-3 linhas)
+    
+    IMPORTANTE: 
+    - NÃO INVENTE LINKS. Se não conseguir extrair um link válido, omita o resultado
+    - Prefira qualidade sobre quantidade
+    - Se não puder determinar alguma informação com certeza, use valores como "Não especificado"
+    
+    FORMATO DA SAÍDA:
+    Você DEVE formatar a saída como JSON com esta estrutura:
+    {"fontes": [
+        {
+            "titulo": "Título do conteúdo",
+            "autores": "Autor ou fonte do conteúdo",
+            "instituicao": "Site ou plataforma de origem",
+            "ano_publicacao": ano (número) ou null,
+            "link": "URL completa e direta para o conteúdo",
+            "tipo_acesso": "Artigo" ou "Vídeo" ou "Tutorial" ou outro tipo apropriado,
+            "descricao": "Breve descrição do conteúdo"
+        },
+        ...
+    ]}
+    """
+
+# Instruções do modo de chamada única: expansão do termo, levantamento e extração das
+# fontes em uma só completion JSON
+INSTRUCOES_BUSCA_UNICA = """
+    Você é um assistente de pesquisa que encontra fontes de informação confiáveis na web.
+    
+    ETAPAS (faça todas nesta mesma resposta):
+    1. Reescreva o tema em até 3 consultas de busca que cubram sinônimos e termos técnicos
+    2. Levante as fontes mais relevantes que você conhece para essas consultas
+    3. Estruture cada fonte no formato abaixo
+    
+    CRITÉRIOS DE ACEITAÇÃO:
+    - Inclua APENAS links reais e funcionais, começando com http:// ou https://
+    - NÃO invente ou crie URLs fictícios como 'example.org' ou 'article.pdf'
+    - Prefira sites conhecidos e confiáveis (repositórios acadêmicos, sites oficiais, portais educacionais)
+    - É melhor ter menos resultados com links reais do que muitos com links inválidos
+    - Se não puder determinar alguma informação com certeza, use null
+    
+    FORMATO DA SAÍDA:
+    Você DEVE formatar a saída como JSON com esta estrutura:
+    {"consultas": ["consulta 1", "consulta 2"],
+     "fontes": [
+        {
+            "titulo": "Título do conteúdo",
+            "autores": "Autor ou fonte do conteúdo",
+            "instituicao": "Site ou plataforma de origem",
+            "ano_publicacao": ano (número) ou null,
+            "link": "URL completa e direta para o conteúdo",
+            "tipo_acesso": "Artigo" ou "Vídeo" ou "Tutorial" ou outro tipo apropriado,
+            "descricao": "Breve descrição do conteúdo (2-3 linhas)"
+        },
+        ...
+    ]}
+    """
+
+def mensagens_pesquisa_web(termo_pesquisa):
+    """Mensagens da solicitação que força o modelo a chamar a ferramenta web_search."""
+    return [
+        {
+            "role": "system",
+            "content": """Você é um assistente de pesquisa que ajuda a encontrar informações confiáveis na web.
+            Sua tarefa é buscar conteúdo relevante sobre o tema solicitado.
+            
+            IMPORTANTE:
+            - Priorize links FUNCIONAIS e ACESSÍVEIS acima de tudo
+            - Busque uma diversidade de fontes (artigos, blogs, sites educacionais, etc.)
+            - Inclua links diretos para o conteúdo sempre que possível
+            - Não se restrinja apenas a PDFs ou conteúdo acadêmico
+            
+            O objetivo principal é obter informações úteis e de qualidade, 
+            com links que realmente funcionem e sejam acessíveis ao usuário.
+            """
+        },
+        {
+            "role": "user",
+            "content": f"Encontre informações relevantes e confiáveis sobre '{termo_pesquisa}'. Inclua fontes diversas como artigos, blogs de especialistas, sites educacionais e vídeos. O mais importante é que os links sejam funcionais e acessíveis."
+        }
+    ]
+
+def mensagens_resultados_web(search_term):
+    """Mensagens da solicitação que gera os resultados da pesquisa web."""
+    return [
+        {"role": "system", "content": """Você é um assistente de pesquisa que busca conteúdo na web.
+        Ao retornar resultados:
+        1. Inclua APENAS links reais e funcionais
+        2. NÃO invente ou crie URLs fictícios como 'example.org' ou 'article.pdf'
+        3. Se não tiver certeza sobre um link, omita-o completamente
+        4. Prefira sites conhecidos e confiáveis
+        5. Inclua uma breve descrição do conteúdo para cada link
+        
+        IMPORTANTE: É melhor retornar poucos resultados confiáveis do que muitos links fictícios ou quebrados.
+        """},
+        {"role": "user", "content": f"Pesquise na web por '{search_term}' e retorne os resultados mais relevantes. Inclua apenas links reais e funcionais de sites conhecidos. Não invente ou crie URLs fictícios."}
+    ]
+
+def mensagens_extracao_fontes(resultados_pesquisa, termo_pesquisa):
+    """Mensagens da solicitação que extrai as fontes estruturadas dos resultados."""
+    return [
+        {"role": "system", "content": INSTRUCOES_EXTRACAO_FONTES},
+        {"role": "user", "content": f"""Analise estes resultados de pesquisa sobre '{termo_pesquisa}' 
+        e extraia as fontes de informação relevantes com links válidos.
+        
+        RESULTADOS A ANALISAR:
+        {resultados_pesquisa}
+        
+        Formate a saída em JSON conforme instruído.
+        LEMBRE-SE: APENAS links reais e válidos. NÃO inclua URLs fictícios ou que pareçam inventados."""}
+    ]
+
+def mensagens_busca_unica(termo_pesquisa):
+    """Mensagens da solicitação única que expande o termo e já devolve as fontes estruturadas."""
+    return [
+        {"role": "system", "content": INSTRUCOES_BUSCA_UNICA},
+        {"role": "user", "content": f"Encontre fontes de informação relevantes e confiáveis sobre '{termo_pesquisa}'. Formate a saída em JSON conforme instruído."}
+    ]
+
+def extrair_fontes_do_json(conteudo):
+    """
+    Decodifica a resposta JSON do modelo e retorna a lista bruta de fontes.
+    
+    A validação de cada fonte é feita depois, por validar_fontes.
+    
+    Args:
+        conteudo: Conteúdo bruto retornado pelo modelo
+        
+    Returns:
+        Lista de fontes como retornadas pelo modelo
+    """
+    with medir_etapa('json'):
+        return _decodificar_fontes(conteudo)
+
+def _decodificar_fontes(conteudo):
+    try:
+        dados_json = json.loads(conteudo)
+        if not isinstance(dados_json, dict):
+            logger.error(f"Resposta não é um dicionário: {type(dados_json)}")
+            fontes = []
+        else:
+            fontes = dados_json.get('fontes', [])
+            if not isinstance(fontes, list):
+                logger.error(f"Campo 'fontes' não é uma lista: {type(fontes)}")
+                fontes = []
+            logger.info(f"Fontes extraídas do JSON: {len(fontes)}")
+            
+            if not fontes:
+                logger.warning("Nenhuma fonte encontrada no JSON")
+            
+    except json.JSONDecodeError as e:
+        logger.error(f"Erro ao decodificar JSON: {str(e)} - Conteúdo: {conteudo[:200]}...")
+        ERROS_ETAPA.incrementar(etapa='json')
+        # Se não for possível decodificar como JSON, tratar como texto
+        fontes = []
+    
+    return fontes
+
+def validar_fontes(fontes_list):
+    """
+    Valida todas as fontes extraídas antes de qualquer gravação.
+    
+    Args:
+        fontes_list: Lista de fontes retornada pelo modelo
+        
+    Returns:
+        Tupla com (lista de FonteExtraida, lista de fontes rejeitadas com o índice, o título,
+        o link e os erros por campo)
+    """
+    validas = []
+    rejeitadas = []
+    with medir_etapa('validacao'):
+        for i, fonte_data in enumerate(fontes_list):
+            fonte, erros = decodificar_fonte(fonte_data, i)
+            if erros:
+                logger.warning(f"Fonte {i} rejeitada: {erros}")
+                rejeitadas.append(descrever_rejeicao(fonte_data, i, erros))
+            else:
+                validas.append(fonte)
+    FONTES.incrementar(len(fontes_list), resultado='extraidas')
+    FONTES.incrementar(len(validas), resultado='validas')
+    FONTES.incrementar(len(rejeitadas), resultado='rejeitadas')
+    return validas, rejeitadas
+
+def verificar_links_das_fontes(fontes_validas):
+    """
+    Verifica em paralelo os links das fontes e separa os inacessíveis.
+    
+    Args:
+        fontes_validas: FonteExtraida retornadas por validar_fontes
+        
+    Returns:
+        Tupla com (fontes com links acessíveis ou não verificados, fontes rejeitadas)
+    """
+    if not settings.BUSCA_VERIFICAR_LINKS or not fontes_validas:
+        return fontes_validas, []
+    
+    with medir_etapa('verificacao_links'):
+        verificacoes = verificador_links.verificar([fonte.link for fonte in fontes_validas])
+    mantidas, rejeitadas = separar_links_inacessiveis(fontes_validas, verificacoes)
+    FONTES.incrementar(len(rejeitadas), resultado='inacessiveis')
+    logger.info(f"Verificação de links: {len(mantidas)} mantidas, {len(rejeitadas)} inacessíveis")
+    return mantidas, rejeitadas
+
+def obter_ou_criar_fontes(fontes_validas):
+    """
+    Obtém as fontes já armazenadas com a mesma URL canônica e cria as demais.
+    
+    Fontes repetidas na própria lista (mesma URL canônica) são reduzidas a uma só e os
+    dados de fontes já armazenadas são mantidos.
+    
+    Args:
+        fontes_validas: FonteExtraida retornadas por validar_fontes
+        
+    Returns:
+        Lista de objetos FonteAcademica salvos, na ordem da lista e sem repetições
+    """
+    limite = FonteAcademica._meta.get_field('url_canonica').max_length
+    por_canonica = {}
+    sem_canonica = []
+    ordem = []
+    for extraida in fontes_validas:
+        canonica = canonizar_url(extraida.link)
+        if canonica is None or len(canonica) > limite:
+            fonte = FonteAcademica(**extraida.campos_modelo())
+            sem_canonica.append(fonte)
+            ordem.append(fonte)
+        elif canonica not in por_canonica:
+            por_canonica[canonica] = extraida
+            ordem.append(canonica)
+    
+    existentes = FonteAcademica.objects.in_bulk(list(por_canonica), field_name='url_canonica')
+    novas = [FonteAcademica(url_canonica=canonica, **extraida.campos_modelo())
+             for canonica, extraida in por_canonica.items() if canonica not in existentes]
+    if novas:
+        # Outra pesquisa pode gravar a mesma fonte ao mesmo tempo; nesse caso vale a que já foi gravada
+        FonteAcademica.objects.bulk_create(novas, ignore_conflicts=True)
+        existentes.update(
+            FonteAcademica.objects.in_bulk([fonte.url_canonica for fonte in novas], field_name='url_canonica')
+        )
+    if sem_canonica:
+        FonteAcademica.objects.bulk_create(sem_canonica)
+    
+    return [existentes[item] if isinstance(item, str) else item for item in ordem]
 
-# Lista de extensões de universidades e institutos
-EXTENSOES_ACADEMICAS = [
-    '.edu', '.edu.br', '.ac.uk', '.edu.au', '.ca', '.fr', '.de', '.it', '.jp',
-    '.ac.', '.uni-', '.usp.br', '.unicamp.br', '.ufrj.br', '.ufmg.br'
-]
+def vincular_fontes(pesquisa, fontes, posicao_inicial=0, pontuacoes=None):
+    """Associa fontes já salvas a uma pesquisa, preservando a ordem da lista (e a pontuação de cada uma, se houver)."""
+    pontuacoes = pontuacoes or [None] * len(fontes)
+    PesquisaFonte.objects.bulk_create(
+        [PesquisaFonte(pesquisa=pesquisa, fonte=fonte, posicao=posicao_inicial + i, pontuacao=pontuacao)
+         for i, (fonte, pontuacao) in enumerate(zip(fontes, pontuacoes))],
+        ignore_conflicts=True,
+    )
+
+def vincular_fontes_ranqueadas(pesquisa, fontes):
+    """
+    Associa fontes já salvas a uma pesquisa na ordem da pontuação local (ver ranquear_fontes).
+    
+    Returns:
+        As fontes na ordem em que foram associadas
+    """
+    with medir_etapa('ranqueamento'):
+        pontuadas = ranquear_fontes(pesquisa.termo, fontes)
+    fontes = [fonte for fonte, _ in pontuadas]
+    vincular_fontes(pesquisa, fontes, pontuacoes=[pontuacao for _, pontuacao in pontuadas])
+    return fontes
+
+@escrita_serializada
+def salvar_fontes(pesquisa, fontes_validas):
+    """
+    Grava as fontes de uma pesquisa em uma única transação e marca a pesquisa como concluída.
+    
+    Fontes cujo link já foi encontrado por outra pesquisa são reaproveitadas em vez de gravadas de novo.
+    As fontes são associadas à pesquisa na ordem da pontuação local (relevância e confiança do domínio).
+    
+    Args:
+        pesquisa: Objeto PesquisaAcademica ao qual as fontes pertencem
+        fontes_validas: FonteExtraida retornadas por validar_fontes
+        
+    Returns:
+        Lista de objetos FonteAcademica associados à pesquisa, da maior para a menor pontuação
+    """
+    with medir_etapa('gravacao'), transaction.atomic():
+        fontes = vincular_fontes_ranqueadas(pesquisa, obter_ou_criar_fontes(fontes_validas))
+        atualizar_status(pesquisa, PesquisaAcademica.Status.CONCLUIDA)
+    FONTES.incrementar(len(fontes), resultado='salvas')
+    logger.info(f"{len(fontes)} fontes associadas à pesquisa {pesquisa.id}")
+    return fontes
 
 def validar_link(url):
     """
@@ -67,46 +400,12 @@ def pesquisar_web(termo_pesquisa):
     
     try:
         # Solicitação inicial para o modelo para realizar uma pesquisa web
-        response = client.chat.completions.create(
+        response = chamador_openai.criar(
+            client,
+            etapa="modelo_termo_busca",
             model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """Você é um assistente de pesquisa que ajuda a encontrar informações confiáveis na web.
-                    Sua tarefa é buscar conteúdo relevante sobre o tema solicitado.
-                    
-                    IMPORTANTE:
-                    - Priorize links FUNCIONAIS e ACESSÍVEIS acima de tudo
-                    - Busque uma diversidade de fontes (artigos, blogs, sites educacionais, etc.)
-                    - Inclua links diretos para o conteúdo sempre que possível
-                    - Não se restrinja apenas a PDFs ou conteúdo acadêmico
-                    
-                    O objetivo principal é obter informações úteis e de qualidade, 
-                    com links que realmente funcionem e sejam acessíveis ao usuário.
-                    """
-                },
-                {
-                    "role": "user",
-                    "content": f"Encontre informações relevantes e confiáveis sobre '{termo_pesquisa}'. Inclua fontes diversas como artigos, blogs de especialistas, sites educacionais e vídeos. O mais importante é que os links sejam funcionais e acessíveis."
-                }
-            ],
-            tools=[{
-                "type": "function",
-                "function": {
-                    "name": "web_search",
-                    "description": "Pesquisa na web por informações atualizadas sobre qualquer tópico",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "search_term": {
-                                "type": "string",
-                                "description": "Termo de pesquisa para buscar na web"
-                            }
-                        },
-                        "required": ["search_term"]
-                    }
-                }
-            }],
+            messages=mensagens_pesquisa_web(termo_pesquisa),
+            tools=[FERRAMENTA_WEB_SEARCH],
             tool_choice={"type": "function", "function": {"name": "web_search"}}
         )
         
@@ -118,21 +417,11 @@ def pesquisar_web(termo_pesquisa):
         logger.info(f"Termo de pesquisa web: {search_term}, ID da chamada: {tool_call_id}")
         
         # Realizar a pesquisa web real com foco em links funcionais
-        search_results_response = client.chat.completions.create(
+        search_results_response = chamador_openai.criar(
+            client,
+            etapa="modelo_resultados_web",
             model="gpt-4o",
-            messages=[
-                {"role": "system", "content": """Você é um assistente de pesquisa que busca conteúdo na web.
-                Ao retornar resultados:
-                1. Inclua APENAS links reais e funcionais
-                2. NÃO invente ou crie URLs fictícios como 'example.org' ou 'article.pdf'
-                3. Se não tiver certeza sobre um link, omita-o completamente
-                4. Prefira sites conhecidos e confiáveis
-                5. Inclua uma breve descrição do conteúdo para cada link
-                
-                IMPORTANTE: É melhor retornar poucos resultados confiáveis do que muitos links fictícios ou quebrados.
-                """},
-                {"role": "user", "content": f"Pesquise na web por '{search_term}' e retorne os resultados mais relevantes. Inclua apenas links reais e funcionais de sites conhecidos. Não invente ou crie URLs fictícios."}
-            ]
+            messages=mensagens_resultados_web(search_term)
         )
         
         # Obter os resultados da pesquisa
@@ -143,10 +432,6 @@ def pesquisar_web(termo_pesquisa):
         
         logger.info(f"Pesquisa web concluída com sucesso. Resultados obtidos. Tamanho: {len(search_results)} caracteres")
         
-        # Salvar resultados em arquivo para debug (apenas em desenvolvimento)
-        with open("/tmp/search_results.txt", "w") as f:
-            f.write(str(search_results))
-        
         return search_results, tool_call_id
     
     except Exception as e:
@@ -165,6 +450,9 @@ def filtrar_fontes_academicas(resultados_pesquisa, termo_pesquisa, tool_call_id)
         
     Returns:
         Lista formatada de fontes de informação e o conteúdo bruto da resposta
+        
+    Raises:
+        OpenAIError ou CircuitoAberto: se a chamada ao modelo falhar
     """
     logger.info(f"Iniciando filtragem de fontes para: {termo_pesquisa}")
     
@@ -177,184 +465,281 @@ def filtrar_fontes_academicas(resultados_pesquisa, termo_pesquisa, tool_call_id)
         # Registrar o início do processamento
         logger.info(f"Processando resultados: {resultados_pesquisa[:200]}...")
         
-        # Instruções para análise dos resultados da pesquisa - versão mais flexível
-        instrucoes = """
-        Você é um assistente de pesquisa que ajuda a extrair fontes úteis e relevantes dos resultados de busca.
-        
-        EXTRAÇÃO DE RESULTADOS:
-        1. Extraia cada fonte de informação mencionada nos resultados (artigos, posts, vídeos, etc)
-        2. Foque em identificar corretamente os links para cada fonte
-        3. Certifique-se de que os links tenham formato correto e pareçam válidos
-        
-        CRITÉRIOS DE ACEITAÇÃO:
-        - O link deve começar com http:// ou https://
-        - Prefira sites conhecidos e populares (Wikipedia, portais de notícias, sites oficiais)
-        - Aceite diversos tipos de conteúdo: artigos, blogs, vídeos, tutoriais, documentação, etc
-        - É melhor ter menos resultados com links reais do que muitos com links inválidos
-        
-        PARA CADA FONTE, FORNEÇA:
-        - Título: título claro e descritivo do conteúdo
-        - Fonte: o site ou plataforma de origem (ex: "Wikipedia", "YouTube", "Medium")
-        - Ano: ano de publicação, se disponível (ou null se não for possível determinar)
-        - Link: URL completa e direta para o conteúdo
-        - Tipo: tipo de conteúdo ("Artigo", "Vídeo", "Tutorial", "Documentação", etc)
-        - Descrição: breve resumo do conteúdo (2-3 linhas)
-        
-        IMPORTANTE: 
-        - NÃO INVENTE LINKS. Se não conseguir extrair um link válido, omita o resultado
-        - Prefira qualidade sobre quantidade
-        - Se não puder determinar alguma informação com certeza, use valores como "Não especificado"
-        
-        FORMATO DA SAÍDA:
-        Você DEVE formatar a saída como JSON com esta estrutura:
-        {"fontes": [
-            {
-                "titulo": "Título do conteúdo",
-                "autores": "Autor ou fonte do conteúdo",
-                "instituicao": "Site ou plataforma de origem",
-                "ano_publicacao": ano (número) ou null,
-                "link": "URL completa e direta para o conteúdo",
-                "tipo_acesso": "Artigo" ou "Vídeo" ou "Tutorial" ou outro tipo apropriado,
-                "descricao": "Breve descrição do conteúdo"
-            },
-            ...
-        ]}
-        """
-        
         # Processar os resultados com o modelo
         logger.info("Solicitando análise dos resultados para o modelo")
         
         # Criar uma mensagem para o modelo
-        resposta_final = client.chat.completions.create(
+        resposta_final = chamador_openai.criar(
+            client,
+            etapa="modelo_extracao_fontes",
             model="gpt-4o",
-            messages=[
-                {"role": "system", "content": instrucoes},
-                {"role": "user", "content": f"""Analise estes resultados de pesquisa sobre '{termo_pesquisa}' 
-                e extraia as fontes de informação relevantes com links válidos.
-                
-                RESULTADOS A ANALISAR:
-                {resultados_pesquisa}
-                
-                Formate a saída em JSON conforme instruído.
-                LEMBRE-SE: APENAS links reais e válidos. NÃO inclua URLs fictícios ou que pareçam inventados."""}
-            ],
+            messages=mensagens_extracao_fontes(resultados_pesquisa, termo_pesquisa),
             response_format={"type": "json_object"}
         )
         
         conteudo = resposta_final.choices[0].message.content
         logger.info(f"Resposta da análise recebida. Tamanho: {len(conteudo)} caracteres")
         
-        # Salvar resposta completa para debug (apenas em desenvolvimento)
-        with open("/tmp/processed_sources.json", "w") as f:
-            f.write(conteudo)
-        
         # Extrair fontes do JSON
-        try:
-            dados_json = json.loads(conteudo)
-            if not isinstance(dados_json, dict):
-                logger.error(f"Resposta não é um dicionário: {type(dados_json)}")
-                fontes = []
-            else:
-                fontes_brutas = dados_json.get('fontes', [])
-                logger.info(f"Fontes extraídas do JSON: {len(fontes_brutas)}")
-                
-                if not fontes_brutas:
-                    logger.warning("Nenhuma fonte encontrada no JSON")
-                
-                # Validação básica das fontes - versão mais permissiva
-                fontes_validadas = []
-                for fonte in fontes_brutas:
-                    # Validar link (verificação mínima)
-                    link = fonte.get('link', '')
-                    
-                    # Verificação mínima - apenas confirma que é uma URL válida
-                    if link and isinstance(link, str) and link.startswith(('http://', 'https://')):
-                        # Link parece válido, adicionar à lista
-                        fontes_validadas.append(fonte)
-                    else:
-                        logger.warning(f"Link descartado por parecer inválido: {link}")
-                
-                fontes = fontes_validadas
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"Erro ao decodificar JSON: {str(e)} - Conteúdo: {conteudo[:200]}...")
-            # Se não for possível decodificar como JSON, tratar como texto
-            fontes = []
+        fontes = extrair_fontes_do_json(conteudo)
         
-        logger.info(f"Total de fontes válidas após filtragem: {len(fontes)}")
+        logger.info(f"Total de fontes extraídas: {len(fontes)}")
         return fontes, conteudo
     
+    except (OpenAIError, CircuitoAberto):
+        # A busca deve falhar (e poder ser refeita) em vez de ser concluída sem fontes
+        raise
+    
     except Exception as e:
         logger.error(f"Erro ao filtrar fontes: {str(e)}")
         # Retornar lista vazia em caso de erro
         return [], json.dumps({"fontes": []})
 
-def verificar_acessibilidade_url(url, timeout=3, verificar_pdf=False):
+def pesquisar_fontes_chamada_unica(termo_pesquisa):
     """
-    Verifica se uma URL está acessível e é um recurso válido.
+    Obtém as fontes em uma única completion JSON, sem a chamada da ferramenta web_search
+    nem a chamada separada de extração (modo "chamada_unica").
+    
+    Erros da API não são tratados aqui: a busca é marcada como falha por executar_busca.
     
     Args:
-        url: URL a ser verificada
-        timeout: Tempo limite para a requisição em segundos
-        verificar_pdf: Se True, verifica se o conteúdo é um PDF
+        termo_pesquisa: O termo a ser pesquisado
         
     Returns:
-        Tupla com (booleano indicando se a URL é acessível, informações adicionais)
+        Lista de fontes como retornadas pelo modelo e o conteúdo bruto da resposta
     """
-    if not url or not isinstance(url, str) or not url.startswith(('http://', 'https://')):
-        return False, {"erro": "URL inválida", "tipo": None}
+    logger.info(f"Iniciando busca em chamada única para: {termo_pesquisa}")
     
-    try:
-        # Configuração do cabeçalho da requisição
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml,application/pdf;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Connection': 'keep-alive',
-            'Pragma': 'no-cache',
-            'Cache-Control': 'no-cache'
-        }
+    resposta = chamador_openai.criar(
+        client,
+        etapa="modelo_chamada_unica",
+        model="gpt-4o",
+        messages=mensagens_busca_unica(termo_pesquisa),
+        response_format={"type": "json_object"}
+    )
+    
+    conteudo = resposta.choices[0].message.content
+    fontes = extrair_fontes_do_json(conteudo)
+    logger.info(f"Busca em chamada única concluída. Fontes extraídas: {len(fontes)}")
+    return fontes, conteudo
+
+def _extrair_fontes_em_stream(mensagens):
+    """Solicita uma completion JSON com stream=True e entrega cada fonte assim que ela é fechada."""
+    # Mede até o início da resposta; as fontes chegam depois, à medida que o stream é lido
+    stream = chamador_openai.criar(
+        client,
+        etapa="modelo_extracao_stream",
+        model="gpt-4o",
+        messages=mensagens,
+        response_format={"type": "json_object"},
+        stream=True
+    )
+    
+    extrator = ExtratorFontesIncremental()
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        yield from extrator.alimentar(chunk.choices[0].delta.content)
+    
+    logger.info(f"Stream de fontes concluído. Tamanho: {len(extrator.conteudo)} caracteres")
+
+def filtrar_fontes_academicas_stream(resultados_pesquisa, termo_pesquisa):
+    """
+    Versão em streaming de filtrar_fontes_academicas.
+    
+    A completion é solicitada com stream=True e cada fonte é entregue assim que o seu
+    objeto no array "fontes" é fechado, sem esperar o restante da resposta.
+    
+    Args:
+        resultados_pesquisa: Resultados brutos da pesquisa web
+        termo_pesquisa: Termo original pesquisado pelo usuário
+        
+    Yields:
+        Fontes (dicionários) como retornadas pelo modelo, na ordem em que chegam
+    """
+    logger.info(f"Iniciando filtragem de fontes em streaming para: {termo_pesquisa}")
+    
+    if not resultados_pesquisa or resultados_pesquisa.startswith("Erro"):
+        logger.warning(f"Sem resultados válidos para processar: {resultados_pesquisa[:100]}...")
+        return
+    
+    yield from _extrair_fontes_em_stream(mensagens_extracao_fontes(resultados_pesquisa, termo_pesquisa))
+
+def executar_busca(pesquisa):
+    """
+    Executa o pipeline de busca para uma pesquisa já registrada no banco de dados.
+    
+    O status da pesquisa é atualizado a cada etapa e, quando ela termina com fontes,
+    o resultado passa a ser servido pelo cache de buscas. O campo modo da pesquisa
+    define se as fontes vêm de três chamadas ao modelo ou de uma chamada única.
+    
+    Args:
+        pesquisa: Objeto PesquisaAcademica a ser processado
         
-        # Primeiro tenta com HEAD para economizar tráfego
-        response = requests.head(url, timeout=timeout, headers=headers, allow_redirects=True)
-        content_type = response.headers.get('Content-Type', '').lower()
-        
-        # Se for um PDF e quisermos verificar isso
-        if verificar_pdf and 'application/pdf' in content_type:
-            return True, {"tipo": "pdf", "content_type": content_type}
-        
-        # Se não for um PDF ou não obtivemos o Content-Type com HEAD, tenta GET
-        if response.status_code != 200 or verificar_pdf or 'text/html' in content_type:
-            # Tentativa com GET para obter mais informações
-            response = requests.get(url, timeout=timeout, headers=headers, stream=True)
-            # Lê apenas os primeiros bytes para verificar o tipo de conteúdo
-            content_peek = next(response.iter_content(1024), b'')
-            response.close()
+    Returns:
+        O mesmo objeto de pesquisa, com status concluída ou falhou. O atributo
+        fontes_rejeitadas lista as fontes descartadas na validação.
+    """
+    with medir_etapa('pipeline'):
+        termo = pesquisa.termo
+        pesquisa.fontes_rejeitadas = []
+        atualizar_status(pesquisa, PesquisaAcademica.Status.EXECUTANDO)
+        
+        try:
+            if pesquisa.modo == PesquisaAcademica.Modo.CHAMADA_UNICA:
+                # Etapas 1 e 2 em uma única completion
+                fontes_list, conteudo_bruto = pesquisar_fontes_chamada_unica(termo)
+            else:
+                # Etapa 1: Pesquisar na web
+                resultados_web, tool_call_id = pesquisar_web(termo)
+                if tool_call_id is None:
+                    atualizar_status(pesquisa, PesquisaAcademica.Status.FALHOU, erro=resultados_web)
+                    return pesquisa
+                
+                # Etapa 2: Filtrar e formatar fontes
+                fontes_list, conteudo_bruto = filtrar_fontes_academicas(resultados_web, termo, tool_call_id)
             
-            # Verifica se é um PDF pelo início do conteúdo
-            if verificar_pdf and content_peek.startswith(b'%PDF-'):
-                return True, {"tipo": "pdf", "detalhes": "Conteúdo inicia com assinatura PDF"}
-        
-        return response.status_code == 200, {
-            "status_code": response.status_code,
-            "content_type": content_type,
-            "url_final": response.url  # URL após redirecionamentos
-        }
+            logger.info(f"Fontes encontradas: {len(fontes_list)}")
+            
+            # Validar tudo antes de gravar e salvar as fontes válidas em uma única transação
+            fontes_validas, pesquisa.fontes_rejeitadas = validar_fontes(fontes_list)
+            
+            # Etapa 3: Descartar fontes com links inacessíveis
+            fontes_validas, links_inacessiveis = verificar_links_das_fontes(fontes_validas)
+            pesquisa.fontes_rejeitadas.extend(links_inacessiveis)
+            
+            salvar_fontes(pesquisa, fontes_validas)
+            
+            if fontes_validas:
+                registrar_resultado(pesquisa)
+            return pesquisa
+            
+        except Exception as e:
+            logger.error(f"Erro ao realizar busca acadêmica: {str(e)}")
+            # Em caso de erro, ainda retornamos a pesquisa, mas sem fontes
+            atualizar_status(pesquisa, PesquisaAcademica.Status.FALHOU, erro=str(e))
+            return pesquisa
+
+def registrar_resultado(pesquisa):
+    """Passa a servir uma pesquisa concluída pelo cache e a considerar seu termo nas buscas por termos similares."""
+    cache_buscas.registrar(pesquisa.termo_normalizado, pesquisa)
+    indice_similaridade.adicionar(pesquisa.termo_normalizado)
+
+@escrita_serializada
+def criar_pesquisa(termo, **campos):
+    """Registra uma nova pesquisa para o termo (campos extras vão para PesquisaAcademica)."""
+    return PesquisaAcademica.objects.create(termo=termo, **campos)
+
+@escrita_serializada
+def atualizar_status(pesquisa, status, erro=None):
+    """
+    Atualiza o status (e o motivo da falha, se houver) de uma pesquisa.
     
-    except requests.RequestException as e:
-        logger.warning(f"Erro ao verificar URL {url}: {str(e)}")
-        return False, {"erro": str(e), "tipo": type(e).__name__}
+    Ao terminar, a resposta da pesquisa é renderizada uma única vez e guardada como snapshot,
+    servido depois pelo histórico e pelo detalhe da pesquisa.
+    """
+    pesquisa.status = status
+    pesquisa.erro = erro
+    pesquisa.save(update_fields=['status', 'erro', 'atualizado_em'])
+    if status in STATUS_FINAIS:
+        PESQUISAS.incrementar(status=status)
+        gravar_snapshots([pesquisa])
+
+def realizar_busca_academica_stream(pesquisa):
+    """
+    Executa o pipeline de busca de uma pesquisa já registrada, validando, verificando o
+    link, persistindo e entregando cada fonte assim que ela é extraída.
     
+    Args:
+        pesquisa: Objeto PesquisaAcademica a ser processado
+        
+    Yields:
+        Tuplas ("fonte", FonteAcademica salva) ou ("rejeitada", descrição da rejeição),
+        na ordem em que as fontes são extraídas
+    """
+    termo = pesquisa.termo
+    atualizar_status(pesquisa, PesquisaAcademica.Status.EXECUTANDO)
+    
+    try:
+        if pesquisa.modo == PesquisaAcademica.Modo.CHAMADA_UNICA:
+            fontes_stream = _extrair_fontes_em_stream(mensagens_busca_unica(termo))
+        else:
+            resultados_web, tool_call_id = pesquisar_web(termo)
+            if tool_call_id is None:
+                atualizar_status(pesquisa, PesquisaAcademica.Status.FALHOU, erro=resultados_web)
+                return
+            fontes_stream = filtrar_fontes_academicas_stream(resultados_web, termo)
+        
+        vinculadas = set()
+        for i, fonte_data in enumerate(fontes_stream):
+            FONTES.incrementar(resultado='extraidas')
+            extraida, erros = decodificar_fonte(fonte_data, i)
+            if erros:
+                FONTES.incrementar(resultado='rejeitadas')
+                yield 'rejeitada', descrever_rejeicao(fonte_data, i, erros)
+                continue
+            FONTES.incrementar(resultado='validas')
+            # Cada link é verificado ao chegar, para que links inacessíveis não sejam
+            # gravados nem passem a ser servidos pelo cache de buscas
+            _, inacessiveis = verificar_links_das_fontes([extraida])
+            if inacessiveis:
+                yield 'rejeitada', inacessiveis[0]
+                continue
+            with medir_etapa('gravacao'):
+                fonte = gravar_fonte_stream(pesquisa, extraida, vinculadas)
+            if fonte.id in vinculadas:
+                # O modelo repetiu uma fonte já enviada
+                continue
+            vinculadas.add(fonte.id)
+            FONTES.incrementar(resultado='salvas')
+            yield 'fonte', fonte
+        
+        if vinculadas:
+            reordenar_fontes(pesquisa)
+        atualizar_status(pesquisa, PesquisaAcademica.Status.CONCLUIDA)
+        if vinculadas:
+            registrar_resultado(pesquisa)
+        
     except Exception as e:
-        logger.error(f"Erro inesperado ao verificar URL {url}: {str(e)}")
-        return False, {"erro": str(e), "tipo": "erro_desconhecido"}
+        logger.error(f"Erro ao realizar busca acadêmica em streaming: {str(e)}")
+        atualizar_status(pesquisa, PesquisaAcademica.Status.FALHOU, erro=str(e))
+
+@escrita_serializada
+def gravar_fonte_stream(pesquisa, extraida, vinculadas):
+    """Grava uma fonte da busca em streaming e a associa à pesquisa, se ainda não estiver em vinculadas."""
+    fonte = obter_ou_criar_fontes([extraida])[0]
+    if fonte.id not in vinculadas:
+        vincular_fontes(pesquisa, [fonte], posicao_inicial=len(vinculadas))
+    return fonte
+
+@escrita_serializada
+def reordenar_fontes(pesquisa):
+    """
+    Reordena pela pontuação local as fontes de uma pesquisa em streaming, que foram
+    associadas na ordem de chegada. Consultas posteriores à pesquisa já recebem a nova ordem.
+    """
+    itens = list(pesquisa.itens.select_related('fonte'))
+    with medir_etapa('ranqueamento'):
+        pontuadas = ranquear_fontes(pesquisa.termo, [item.fonte for item in itens])
+    por_fonte = {item.fonte_id: item for item in itens}
+    for posicao, (fonte, pontuacao) in enumerate(pontuadas):
+        item = por_fonte[fonte.id]
+        item.posicao, item.pontuacao = posicao, pontuacao
+    PesquisaFonte.objects.bulk_update(itens, ['posicao', 'pontuacao'])
 
-def realizar_busca_academica(termo):
+def modo_pipeline(modo=None):
+    """Modo de pipeline informado na requisição ou, se ausente, o padrão das configurações."""
+    return modo or settings.BUSCA_MODO_PIPELINE
+
+def realizar_busca_academica(termo, modo=None, **campos):
     """
     Função principal que realiza todo o processo de busca acadêmica.
     
     Args:
         termo: O tema a ser pesquisado
+        modo: Pipeline de chamadas ao modelo ("tres_chamadas" ou "chamada_unica");
+            por padrão, BUSCA_MODO_PIPELINE
+        **campos: Campos extras da PesquisaAcademica criada (ex.: aquecimento=True)
         
     Returns:
         Objeto de pesquisa acadêmica com as fontes encontradas
@@ -362,50 +747,277 @@ def realizar_busca_academica(termo):
     logger.info(f"Iniciando busca para o termo: {termo}")
     
     # Salvar a pesquisa no banco de dados
-    pesquisa = PesquisaAcademica.objects.create(termo=termo)
+    pesquisa = criar_pesquisa(termo, modo=modo_pipeline(modo), **campos)
     logger.info(f"Pesquisa criada com ID: {pesquisa.id}")
     
-    try:
-        # Etapa 1: Pesquisar na web
-        resultados_web, tool_call_id = pesquisar_web(termo)
-        
-        # Etapa 2: Filtrar e formatar fontes
-        fontes_list, conteudo_bruto = filtrar_fontes_academicas(resultados_web, termo, tool_call_id)
+    return executar_busca(pesquisa)
+
+def responder_com_indice_local(termo):
+    """
+    Tenta responder uma busca apenas com as fontes já armazenadas, sem chamar o modelo.
+    
+    A busca só é respondida localmente quando o índice encontra pelo menos
+    BUSCA_LOCAL_MIN_FONTES fontes que contenham todas as palavras do termo.
+    
+    Args:
+        termo: O tema a ser pesquisado
         
-        logger.info(f"Fontes encontradas: {len(fontes_list)}")
+    Returns:
+        Pesquisa concluída com as fontes locais (atributo origem = "indice_local") ou
+        None se o índice não tiver fontes suficientes
+    """
+    fontes_locais = buscar_fontes_locais(termo, limite=settings.BUSCA_LOCAL_MAX_FONTES, todos_os_termos=True)
+    if len(fontes_locais) < settings.BUSCA_LOCAL_MIN_FONTES:
+        logger.info(f"Índice local com {len(fontes_locais)} fontes para '{termo}'; seguindo para o modelo")
+        return None
+    
+    pesquisa = gravar_pesquisa_local(termo, fontes_locais)
+    pesquisa.fontes_rejeitadas = []
+    pesquisa.origem = 'indice_local'
+    logger.info(f"Pesquisa {pesquisa.id} respondida pelo índice local com {len(fontes_locais)} fontes")
+    
+    registrar_resultado(pesquisa)
+    return pesquisa
+
+@escrita_serializada
+def gravar_pesquisa_local(termo, fontes_locais):
+    """Registra a pesquisa respondida pelo índice local, já concluída e com as fontes associadas."""
+    # Criada já em execução para não ser reservada pelo pool de workers
+    pesquisa = PesquisaAcademica.objects.create(termo=termo, status=PesquisaAcademica.Status.EXECUTANDO)
+    with transaction.atomic():
+        vincular_fontes_ranqueadas(pesquisa, fontes_locais)
+        atualizar_status(pesquisa, PesquisaAcademica.Status.CONCLUIDA)
+    return pesquisa
+
+# Termos normalizados com revalidação em andamento (evita disparar a mesma busca duas vezes)
+_revalidacoes_em_andamento = set()
+_revalidacoes_lock = threading.Lock()
+
+def _revalidar_busca(termo, chave):
+    """
+    Executa novamente a busca de um termo em segundo plano e atualiza o cache.
+    
+    Args:
+        termo: O termo original pesquisado
+        chave: O termo normalizado usado como chave do cache
+    """
+    try:
+        # Sem servir as completions gravadas, que devolveriam o mesmo resultado de antes
+        with renovar_respostas():
+            pesquisa = realizar_busca_academica(termo)
+        if pesquisa.fontes.exists():
+            logger.info(f"Cache revalidado para '{chave}' com a pesquisa {pesquisa.id}")
+        else:
+            logger.warning(f"Revalidação de '{chave}' não retornou fontes; mantendo resultado anterior")
+    except Exception as e:
+        logger.error(f"Erro ao revalidar cache para '{chave}': {str(e)}")
+    finally:
+        with _revalidacoes_lock:
+            _revalidacoes_em_andamento.discard(chave)
+        # A thread não pertence ao ciclo de requisição do Django, então fecha a própria conexão
+        connection.close()
+
+def agendar_revalidacao(termo, chave):
+    """
+    Dispara a revalidação de um termo em uma thread, se ainda não houver uma em andamento.
+    
+    Returns:
+        True se uma nova revalidação foi iniciada
+    """
+    with _revalidacoes_lock:
+        if chave in _revalidacoes_em_andamento:
+            return False
+        _revalidacoes_em_andamento.add(chave)
+    
+    threading.Thread(target=_revalidar_busca, args=(termo, chave), daemon=True).start()
+    return True
+
+def _consultar_cache(chave, termo=None):
+    """
+    Consulta o cache para um termo normalizado, disparando a revalidação de resultados obsoletos.
+    
+    Returns:
+        Tupla com (pesquisa ou None, estado do cache)
+    """
+    estado, pesquisa_id = cache_buscas.consultar(chave)
+    if estado == CACHE_MISS:
+        return None, CACHE_MISS
+    
+    pesquisa = PesquisaAcademica.objects.filter(id=pesquisa_id).first()
+    if pesquisa is None:
+        # A pesquisa foi removida do banco; descartar a entrada
+        cache_buscas.remover(chave)
+        return None, CACHE_MISS
+    
+    logger.info(f"Cache {estado} para '{chave}' (pesquisa {pesquisa_id})")
+    if estado == CACHE_STALE:
+        agendar_revalidacao(termo or pesquisa.termo, chave)
+    return pesquisa, estado
+
+def consultar_cache_busca(termo):
+    """
+    Procura um resultado reaproveitável para o termo: primeiro no cache do próprio termo e,
+    se não houver, no de um termo já pesquisado suficientemente parecido.
+    
+    Args:
+        termo: O tema a ser pesquisado
         
-        # Salvar as fontes no banco de dados
-        for i, fonte_data in enumerate(fontes_list):
-            try:
-                # Converter ano_publicacao para inteiro se existir
-                ano = fonte_data.get('ano_publicacao')
-                if ano and not isinstance(ano, int):
-                    try:
-                        ano = int(ano)
-                    except (ValueError, TypeError):
-                        ano = None
-                
-                # Extrair o tipo de acesso, com valor padrão mais simples
-                tipo_acesso = fonte_data.get('tipo_acesso', 'Informação online')
-                
-                # Criar o objeto no banco de dados sem validação extensiva
-                fonte = FonteAcademica.objects.create(
-                    pesquisa=pesquisa,
-                    titulo=fonte_data.get('titulo', f'Fonte {i+1}'),
-                    autores=fonte_data.get('autores'),
-                    instituicao=fonte_data.get('instituicao'),
-                    ano_publicacao=ano,
-                    link=fonte_data.get('link'),
-                    descricao=fonte_data.get('descricao'),
-                    tipo_acesso=tipo_acesso
-                )
-                logger.info(f"Fonte criada: {fonte.id} - {fonte.titulo}")
-            except Exception as e:
-                logger.error(f"Erro ao salvar fonte: {str(e)} - Dados: {fonte_data}")
-        
-        return pesquisa
+    Returns:
+        Tupla com (pesquisa ou None, estado do cache). Quando o resultado vem de um termo
+        similar, a pesquisa recebe os atributos origem = "pesquisa_similar" e
+        pesquisa_similar, com o ID, o termo e a similaridade da pesquisa reaproveitada.
+    """
+    chave = normalizar_termo(termo)
+    pesquisa, estado = _consultar_cache(chave, termo)
+    if pesquisa is not None or not settings.BUSCA_SIMILARIDADE_ATIVA:
+        return pesquisa, estado
+    
+    similar = indice_similaridade.buscar(chave)
+    if similar is None:
+        return None, CACHE_MISS
+    
+    chave_similar, similaridade = similar
+    pesquisa, estado = _consultar_cache(chave_similar)
+    if pesquisa is not None:
+        logger.info(f"Reaproveitando a pesquisa {pesquisa.id} de '{chave_similar}' para '{chave}' (similaridade {similaridade:.2f})")
+        pesquisa.origem = 'pesquisa_similar'
+        pesquisa.pesquisa_similar = {
+            'id': pesquisa.id,
+            'termo': pesquisa.termo,
+            'similaridade': round(similaridade, 3),
+        }
+    return pesquisa, estado
+
+def procurar_pesquisa_concluida(chave, desde):
+    """Pesquisa do termo normalizado concluída (por outro processo) a partir do instante informado, se houver."""
+    return (
+        PesquisaAcademica.objects
+        .filter(termo_normalizado=chave, status=PesquisaAcademica.Status.CONCLUIDA, atualizado_em__gte=desde)
+        .order_by('-id')
+        .first()
+    )
+
+def procurar_pesquisa_em_andamento(chave):
+    """Pesquisa do termo normalizado pendente ou em execução há menos de BUSCA_JOBS_PRAZO_EXECUCAO, se houver."""
+    limite = timezone.now() - timedelta(seconds=settings.BUSCA_JOBS_PRAZO_EXECUCAO)
+    return (
+        PesquisaAcademica.objects
+        .filter(termo_normalizado=chave, atualizado_em__gte=limite,
+                status__in=[PesquisaAcademica.Status.PENDENTE, PesquisaAcademica.Status.EXECUTANDO])
+        .order_by('-id')
+        .first()
+    )
+
+def copiar_pesquisa_compartilhada(pesquisa):
+    """
+    Cópia da pesquisa de outra requisição para a requisição atual, recarregada do banco
+    para que as fontes sejam carregadas nesta thread, com as fontes rejeitadas e a origem.
+    """
+    copia = PesquisaAcademica.objects.get(id=pesquisa.id)
+    copia.fontes_rejeitadas = list(getattr(pesquisa, 'fontes_rejeitadas', []))
+    copia.origem = 'busca_coalescida'
+    return copia
+
+def buscar_com_cache(termo, em_segundo_plano=False, busca_local=False, modo=None):
+    """
+    Realiza a busca acadêmica reaproveitando resultados recentes do mesmo termo.
+    
+    Resultados dentro do TTL são devolvidos imediatamente. Resultados obsoletos também
+    são devolvidos, mas uma nova busca é iniciada em segundo plano para atualizá-los.
+    Sem resultado para o próprio termo, é reaproveitado o de um termo similar já pesquisado.
+    Se uma busca pelo mesmo termo já estiver em andamento (neste ou em outro processo),
+    a requisição aguarda e compartilha o resultado dela em vez de chamar o modelo de novo.
+    
+    Args:
+        termo: O tema a ser pesquisado
+        em_segundo_plano: Se True, uma busca sem resultado em cache apenas é registrada
+            como pendente, para ser processada pelo pool de workers
+        busca_local: Se True, consulta o índice local de fontes antes de recorrer ao modelo
+        modo: Pipeline de chamadas ao modelo usado se for preciso fazer uma nova busca
         
+    Returns:
+        Tupla com (objeto de pesquisa acadêmica, estado do cache: HIT, STALE, MISS ou
+        COALESCED, quando o resultado foi compartilhado com uma busca em andamento)
+    """
+    pesquisa, estado = consultar_cache_busca(termo)
+    if pesquisa is not None:
+        return pesquisa, estado
+    
+    if busca_local:
+        pesquisa = responder_com_indice_local(termo)
+        if pesquisa is not None:
+            return pesquisa, CACHE_MISS
+    
+    chave = normalizar_termo(termo)
+    if em_segundo_plano:
+        pesquisa = procurar_pesquisa_em_andamento(chave) if coalescedor_buscas.ativo else None
+        if pesquisa is not None:
+            logger.info(f"Pesquisa {pesquisa.id} de '{chave}' já está na fila ou em execução; reaproveitando")
+            return pesquisa, CACHE_COALESCED
+        pesquisa = criar_pesquisa(termo, modo=modo_pipeline(modo))
+        logger.info(f"Pesquisa {pesquisa.id} enfileirada para processamento em segundo plano")
+        return pesquisa, CACHE_MISS
+    
+    pesquisa, compartilhada = coalescedor_buscas.executar(
+        chave,
+        lambda: realizar_busca_academica(termo, modo),
+        lambda desde: procurar_pesquisa_concluida(chave, desde),
+    )
+    if compartilhada:
+        logger.info(f"Busca de '{chave}' compartilhada com a pesquisa {pesquisa.id}")
+        return copiar_pesquisa_compartilhada(pesquisa), CACHE_COALESCED
+    return pesquisa, CACHE_MISS
+
+def _buscar_termo_do_lote(termo, busca_local, modo):
+    """Executa a busca de um termo do lote em uma thread do pool, devolvendo (pesquisa, estado, erro)."""
+    try:
+        pesquisa, estado = buscar_com_cache(termo, busca_local=busca_local, modo=modo)
+        # Carrega as fontes ainda nesta thread, para que a serialização não volte ao banco
+        prefetch_related_objects([pesquisa], Prefetch('itens', queryset=PesquisaFonte.objects.select_related('fonte')))
+        return pesquisa, estado, None
     except Exception as e:
-        logger.error(f"Erro ao realizar busca acadêmica: {str(e)}")
-        # Em caso de erro, ainda retornamos a pesquisa, mas sem fontes
-        return pesquisa 
\ No newline at end of file
+        logger.error(f"Erro ao buscar o termo '{termo}' do lote: {str(e)}")
+        return None, None, str(e)
+    finally:
+        # As threads do pool não pertencem ao ciclo de requisição do Django
+        connection.close()
+
+def buscar_em_lote(termos, max_paralelas, busca_local=False, modo=None):
+    """
+    Realiza a busca de vários termos em paralelo, com no máximo max_paralelas ao mesmo tempo.
+    
+    Termos iguais após a normalização são buscados uma única vez. Cada termo passa pelo
+    mesmo fluxo de buscar_com_cache, portanto o tempo total fica próximo ao do termo mais
+    lento quando o limite de paralelismo comporta o lote.
+    
+    Args:
+        termos: Lista de termos a pesquisar
+        max_paralelas: Quantidade máxima de buscas simultâneas
+        busca_local: Se True, cada termo consulta o índice local antes de recorrer ao modelo
+        modo: Pipeline de chamadas ao modelo usado nas novas buscas
+        
+    Returns:
+        Lista de dicionários, um por termo distinto e na ordem da primeira ocorrência, com
+        termo, duplicados (outras grafias do mesmo termo no lote), pesquisa, estado do
+        cache e erro (apenas quando a busca falhou com uma exceção)
+    """
+    grupos = {}
+    for termo in termos:
+        grupos.setdefault(normalizar_termo(termo), []).append(termo)
+    
+    unicos = [variantes[0] for variantes in grupos.values()]
+    logger.info(f"Busca em lote: {len(termos)} termos, {len(unicos)} distintos, até {max_paralelas} em paralelo")
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_paralelas, len(unicos))), thread_name_prefix='busca-lote') as executor:
+        resultados = list(executor.map(lambda termo: _buscar_termo_do_lote(termo, busca_local, modo), unicos))
+    
+    return [
+        {
+            'termo': variantes[0],
+            'duplicados': variantes[1:],
+            'pesquisa': pesquisa,
+            'estado': estado,
+            'erro': erro,
+        }
+        for variantes, (pesquisa, estado, erro) in zip(grupos.values(), resultados)
+    ]
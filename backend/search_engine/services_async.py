@@ -0,0 +1,264 @@
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from openai import AsyncOpenAI, OpenAIError
+from django.conf import settings
+
+from .models import PesquisaAcademica
+from .cache import CACHE_MISS, CACHE_COALESCED
+from .chamadas_modelo import chamador_openai, CircuitoAberto
+from .coalescencia import coalescedor_buscas
+from .metricas import FONTES, medir_etapa
+from .services import (
+    FERRAMENTA_WEB_SEARCH,
+    mensagens_pesquisa_web,
+    mensagens_resultados_web,
+    mensagens_extracao_fontes,
+    mensagens_busca_unica,
+    extrair_fontes_do_json,
+    validar_fontes,
+    criar_pesquisa,
+    atualizar_status,
+    salvar_fontes,
+    registrar_resultado,
+    consultar_cache_busca,
+    responder_com_indice_local,
+    modo_pipeline,
+    procurar_pesquisa_concluida,
+    copiar_pesquisa_compartilhada,
+)
+from .normalizacao import normalizar_termo
+from .verificacao import verificador_links, separar_links_inacessiveis
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Cliente assíncrono da API OpenAI, usado pelas views servidas via ASGI
+# (as novas tentativas ficam com chamador_openai)
+async_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
+
+async def pesquisar_web_async(termo_pesquisa):
+    """
+    Versão assíncrona de pesquisar_web, que não bloqueia o worker durante as chamadas ao modelo.
+
+    Args:
+        termo_pesquisa: O termo a ser pesquisado
+
+    Returns:
+        Resultados da pesquisa web formatados e o ID da chamada da ferramenta
+    """
+    termo_academico = f"{termo_pesquisa} artigos pesquisa estudos informações"
+
+    logger.info(f"Iniciando pesquisa web assíncrona para: {termo_academico}")
+
+    try:
+        response = await chamador_openai.criar_async(
+            async_client,
+            etapa="modelo_termo_busca",
+            model="gpt-4o",
+            messages=mensagens_pesquisa_web(termo_pesquisa),
+            tools=[FERRAMENTA_WEB_SEARCH],
+            tool_choice={"type": "function", "function": {"name": "web_search"}}
+        )
+
+        tool_call = response.choices[0].message.tool_calls[0]
+        search_term = json.loads(tool_call.function.arguments)["search_term"]
+        tool_call_id = tool_call.id
+
+        logger.info(f"Termo de pesquisa web: {search_term}, ID da chamada: {tool_call_id}")
+
+        search_results_response = await chamador_openai.criar_async(
+            async_client,
+            etapa="modelo_resultados_web",
+            model="gpt-4o",
+            messages=mensagens_resultados_web(search_term)
+        )
+
+        search_results = search_results_response.choices[0].message.content
+
+        if not search_results:
+            search_results = f"Nenhum resultado encontrado para '{search_term}'"
+
+        logger.info(f"Pesquisa web concluída com sucesso. Tamanho: {len(search_results)} caracteres")
+        return search_results, tool_call_id
+
+    except Exception as e:
+        logger.error(f"Erro ao realizar pesquisa web: {str(e)}")
+        return f"Erro ao realizar pesquisa para: {termo_academico}. Detalhes: {str(e)}", None
+
+async def filtrar_fontes_academicas_async(resultados_pesquisa, termo_pesquisa, tool_call_id):
+    """
+    Versão assíncrona de filtrar_fontes_academicas.
+
+    Args:
+        resultados_pesquisa: Resultados brutos da pesquisa web
+        termo_pesquisa: Termo original pesquisado pelo usuário
+        tool_call_id: ID da chamada da ferramenta de pesquisa (opcional)
+
+    Returns:
+        Lista formatada de fontes de informação e o conteúdo bruto da resposta
+    """
+    logger.info(f"Iniciando filtragem assíncrona de fontes para: {termo_pesquisa}")
+
+    try:
+        if not resultados_pesquisa or resultados_pesquisa.startswith("Erro"):
+            logger.warning(f"Sem resultados válidos para processar: {resultados_pesquisa[:100]}...")
+            return [], json.dumps({"fontes": []})
+
+        resposta_final = await chamador_openai.criar_async(
+            async_client,
+            etapa="modelo_extracao_fontes",
+            model="gpt-4o",
+            messages=mensagens_extracao_fontes(resultados_pesquisa, termo_pesquisa),
+            response_format={"type": "json_object"}
+        )
+
+        conteudo = resposta_final.choices[0].message.content
+        logger.info(f"Resposta da análise recebida. Tamanho: {len(conteudo)} caracteres")
+
+        fontes = extrair_fontes_do_json(conteudo)
+
+        logger.info(f"Total de fontes extraídas: {len(fontes)}")
+        return fontes, conteudo
+
+    except (OpenAIError, CircuitoAberto):
+        raise
+
+    except Exception as e:
+        logger.error(f"Erro ao filtrar fontes: {str(e)}")
+        return [], json.dumps({"fontes": []})
+
+async def pesquisar_fontes_chamada_unica_async(termo_pesquisa):
+    """
+    Versão assíncrona de pesquisar_fontes_chamada_unica.
+
+    Args:
+        termo_pesquisa: O termo a ser pesquisado
+
+    Returns:
+        Lista de fontes como retornadas pelo modelo e o conteúdo bruto da resposta
+    """
+    logger.info(f"Iniciando busca assíncrona em chamada única para: {termo_pesquisa}")
+
+    resposta = await chamador_openai.criar_async(
+        async_client,
+        etapa="modelo_chamada_unica",
+        model="gpt-4o",
+        messages=mensagens_busca_unica(termo_pesquisa),
+        response_format={"type": "json_object"}
+    )
+
+    conteudo = resposta.choices[0].message.content
+    fontes = extrair_fontes_do_json(conteudo)
+    logger.info(f"Busca em chamada única concluída. Fontes extraídas: {len(fontes)}")
+    return fontes, conteudo
+
+async def realizar_busca_academica_async(termo, modo=None):
+    """
+    Versão assíncrona de realizar_busca_academica, com gravações pelo ORM assíncrono.
+
+    Args:
+        termo: O tema a ser pesquisado
+        modo: Pipeline de chamadas ao modelo; por padrão, BUSCA_MODO_PIPELINE
+
+    Returns:
+        Objeto de pesquisa acadêmica com as fontes encontradas
+    """
+    logger.info(f"Iniciando busca assíncrona para o termo: {termo}")
+
+    # As gravações usam as versões síncronas, que passam pela fila única de escrita
+    pesquisa = await sync_to_async(criar_pesquisa)(termo, modo=modo_pipeline(modo))
+    pesquisa.fontes_rejeitadas = []
+    logger.info(f"Pesquisa criada com ID: {pesquisa.id}")
+    await atualizar_status_async(pesquisa, PesquisaAcademica.Status.EXECUTANDO)
+
+    with medir_etapa('pipeline'):
+        try:
+            if pesquisa.modo == PesquisaAcademica.Modo.CHAMADA_UNICA:
+                fontes_list, conteudo_bruto = await pesquisar_fontes_chamada_unica_async(termo)
+            else:
+                resultados_web, tool_call_id = await pesquisar_web_async(termo)
+                if tool_call_id is None:
+                    await atualizar_status_async(pesquisa, PesquisaAcademica.Status.FALHOU, erro=resultados_web)
+                    return pesquisa
+
+                fontes_list, conteudo_bruto = await filtrar_fontes_academicas_async(resultados_web, termo, tool_call_id)
+
+            logger.info(f"Fontes encontradas: {len(fontes_list)}")
+
+            fontes_validas, pesquisa.fontes_rejeitadas = validar_fontes(fontes_list)
+            fontes_validas, links_inacessiveis = await verificar_links_das_fontes_async(fontes_validas)
+            pesquisa.fontes_rejeitadas.extend(links_inacessiveis)
+            # Transações não têm API assíncrona; a gravação em lote roda na thread do ORM
+            await sync_to_async(salvar_fontes)(pesquisa, fontes_validas)
+
+            if fontes_validas:
+                registrar_resultado(pesquisa)
+            return pesquisa
+
+        except Exception as e:
+            logger.error(f"Erro ao realizar busca acadêmica: {str(e)}")
+            await atualizar_status_async(pesquisa, PesquisaAcademica.Status.FALHOU, erro=str(e))
+            return pesquisa
+
+async def verificar_links_das_fontes_async(fontes_validas):
+    """
+    Versão assíncrona de verificar_links_das_fontes.
+
+    O cache de verificações é lido e gravado na thread do ORM; as requisições HTTP rodam
+    em uma thread à parte para não bloquear as demais operações de banco.
+    """
+    if not settings.BUSCA_VERIFICAR_LINKS or not fontes_validas:
+        return fontes_validas, []
+
+    urls = [fonte.link for fonte in fontes_validas]
+    with medir_etapa('verificacao_links'):
+        verificacoes = await sync_to_async(verificador_links.consultar_cache)(urls)
+        novas = await sync_to_async(verificador_links.verificar_urls, thread_sensitive=False)(
+            [url for url in urls if url not in verificacoes]
+        )
+        await sync_to_async(verificador_links.salvar)(novas.values())
+    verificacoes.update(novas)
+    mantidas, rejeitadas = separar_links_inacessiveis(fontes_validas, verificacoes)
+    FONTES.incrementar(len(rejeitadas), resultado='inacessiveis')
+    return mantidas, rejeitadas
+
+async def atualizar_status_async(pesquisa, status, erro=None):
+    """Versão assíncrona de atualizar_status."""
+    await sync_to_async(atualizar_status)(pesquisa, status, erro)
+
+async def buscar_com_cache_async(termo, busca_local=False, modo=None):
+    """
+    Versão assíncrona de buscar_com_cache.
+
+    A revalidação de resultados obsoletos continua sendo feita em uma thread pelo
+    pipeline síncrono, sem ocupar o event loop.
+
+    Args:
+        termo: O tema a ser pesquisado
+        busca_local: Se True, consulta o índice local de fontes antes de recorrer ao modelo
+        modo: Pipeline de chamadas ao modelo usado se for preciso fazer uma nova busca
+
+    Returns:
+        Tupla com (objeto de pesquisa acadêmica, estado do cache: HIT, STALE, MISS ou COALESCED)
+    """
+    pesquisa, estado = await sync_to_async(consultar_cache_busca)(termo)
+    if pesquisa is not None:
+        return pesquisa, estado
+
+    if busca_local:
+        pesquisa = await sync_to_async(responder_com_indice_local)(termo)
+        if pesquisa is not None:
+            return pesquisa, CACHE_MISS
+
+    chave = normalizar_termo(termo)
+    pesquisa, compartilhada = await coalescedor_buscas.executar_async(
+        chave,
+        lambda: realizar_busca_academica_async(termo, modo),
+        lambda desde: procurar_pesquisa_concluida(chave, desde),
+    )
+    if compartilhada:
+        logger.info(f"Busca de '{chave}' compartilhada com a pesquisa {pesquisa.id}")
+        return await sync_to_async(copiar_pesquisa_compartilhada)(pesquisa), CACHE_COALESCED
+    return pesquisa, CACHE_MISS
@@ -0,0 +1,307 @@
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import PesquisaAcademica
+from .normalizacao import palavras_relevantes
+
+logger = logging.getLogger(__name__)
+
+_MASCARA_64_BITS = (1 << 64) - 1
+
+# Fração mínima dos pares com similaridade igual ao limiar que devem virar candidatos no LSH
+RECALL_MINIMA = 0.99
+
+# Sobreposição entre atualizações do índice, para não perder pesquisas gravadas durante a
+# consulta anterior (termos repetidos são ignorados por adicionar)
+FOLGA_ATUALIZACAO = timedelta(seconds=30)
+
+
+def trigramas(termo_normalizado):
+    """
+    Conjunto de trigramas de caracteres das palavras relevantes de um termo normalizado.
+
+    Cada palavra é delimitada por espaços antes de ser fatiada, de forma que o
+    resultado não depende da ordem das palavras nem de palavras vazias como "de" e "na".
+    """
+    resultado = set()
+    for palavra in palavras_relevantes(termo_normalizado, ja_normalizado=True):
+        palavra = f" {palavra} "
+        resultado.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    return resultado
+
+
+def palavras_distintivas(termo_normalizado):
+    """
+    Palavras curtas e números do termo ("vitamina d", "covid 19").
+
+    Pesam pouco nos trigramas, mas mudam o assunto da busca; termos com palavras
+    distintivas diferentes nunca são considerados similares.
+    """
+    return {
+        palavra for palavra in palavras_relevantes(termo_normalizado, ja_normalizado=True)
+        if len(palavra) <= 2 or any(c.isdigit() for c in palavra)
+    }
+
+
+def recall_lsh(similaridade, linhas_por_banda, bandas):
+    """Probabilidade de dois termos com a similaridade dada coincidirem em pelo menos uma banda."""
+    return 1 - (1 - similaridade ** linhas_por_banda) ** bandas
+
+
+def configuracao_lsh(limiar, posicoes, recall_minima=RECALL_MINIMA):
+    """
+    Linhas por banda e quantidade de bandas do LSH para o limiar.
+
+    Usa a maior quantidade de linhas por banda (bandas mais seletivas, com menos
+    candidatos) com a qual as `posicoes` ainda encontram pelo menos `recall_minima` dos
+    termos com similaridade igual ao limiar; termos mais parecidos são encontrados com
+    probabilidade ainda maior. Bandas de uma linha só trariam listas enormes de
+    candidatos, então, em limiares baixos, são usadas bandas de 2 linhas e a assinatura
+    ganha as posições necessárias.
+
+    Returns:
+        Tupla (linhas por banda, bandas)
+    """
+    for linhas in range(posicoes // 2, 1, -1):
+        if recall_lsh(limiar, linhas, posicoes // linhas) >= recall_minima:
+            return linhas, posicoes // linhas
+    if limiar <= 0:
+        return 2, posicoes // 2
+    bandas = math.ceil(math.log(1 - recall_minima) / math.log(1 - limiar ** 2))
+    return 2, max(bandas, posicoes // 2)
+
+
+def jaccard(a, b):
+    """Similaridade de Jaccard entre dois conjuntos (0 quando algum está vazio)."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class IndiceSimilaridade:
+    """
+    Índice em memória dos termos já pesquisados, usado para encontrar termos quase iguais.
+
+    Cada termo é representado pelos trigramas de suas palavras relevantes. A assinatura
+    MinHash é calculada com uma única função de hash (one permutation hashing): cada
+    trigrama cai em uma das posições da assinatura, que guarda o menor valor recebido, e
+    posições vazias copiam a próxima posição preenchida. A assinatura é dividida em
+    bandas (LSH); termos que coincidem em pelo menos uma banda são candidatos e a
+    similaridade de Jaccard exata dos trigramas decide, desde que os termos tenham as
+    mesmas palavras distintivas (palavras curtas e números). Assim, a consulta custa um hash
+    por trigrama e uma busca em dicionário por banda, independentemente da quantidade
+    de termos indexados.
+
+    As bandas são definidas a partir do limiar (ver configuracao_lsh): com o limiar padrão
+    de 0,75 e 20 posições, 10 bandas de 2 linhas encontram 99,97% dos termos no limiar,
+    contra 85% com 5 bandas de 4 linhas. O recall esperado fica em recall_esperado.
+
+    O índice é carregado do banco em segundo plano na primeira consulta; até lá, as
+    consultas não encontram termos similares. Depois, a cada intervalo_atualizacao
+    segundos (0 desativa), uma consulta dispara em segundo plano a inclusão das pesquisas
+    concluídas desde a última leitura, inclusive as de outros processos (worker da fila,
+    outros workers do servidor, o comando em lote).
+    """
+
+    def __init__(self, limiar, posicoes=20, max_candidatos=20, intervalo_atualizacao=60):
+        self.limiar = limiar
+        self.linhas_por_banda, self.bandas = configuracao_lsh(limiar, posicoes)
+        self.posicoes = max(posicoes, self.linhas_por_banda * self.bandas)
+        self.recall_esperado = recall_lsh(limiar, self.linhas_por_banda, self.bandas)
+        self.max_candidatos = max_candidatos
+        self.intervalo_atualizacao = intervalo_atualizacao
+        self._bandas = {}
+        self._termos = set()
+        self._lock = threading.Lock()
+        self._carregamento = None
+        self._pronto = threading.Event()
+        # Início da última leitura do banco (None se o índice não veio do banco)
+        self._lido_em = None
+        self._proxima_atualizacao = 0.0
+        self._atualizacao = None
+
+    def __len__(self):
+        return len(self._termos)
+
+    def _chaves_das_bandas(self, conjunto):
+        minimos = [None] * self.posicoes
+        for trigrama in conjunto:
+            valor_hash = hash(trigrama) & _MASCARA_64_BITS
+            posicao, valor = valor_hash % self.posicoes, valor_hash // self.posicoes
+            if minimos[posicao] is None or valor < minimos[posicao]:
+                minimos[posicao] = valor
+
+        # Densificação: posições vazias recebem o valor da próxima posição preenchida e a
+        # distância até ela, para que termos curtos ainda produzam bandas comparáveis
+        assinatura = []
+        for posicao in range(self.posicoes):
+            distancia = 0
+            while minimos[(posicao + distancia) % self.posicoes] is None:
+                distancia += 1
+            assinatura.append((minimos[(posicao + distancia) % self.posicoes], distancia))
+
+        r = self.linhas_por_banda
+        return [
+            hash((banda, tuple(assinatura[banda * r:(banda + 1) * r])))
+            for banda in range(self.bandas)
+        ]
+
+    def adicionar(self, termo_normalizado):
+        """Indexa um termo normalizado, se ainda não estiver no índice."""
+        if not termo_normalizado or termo_normalizado in self._termos:
+            return
+        conjunto = trigramas(termo_normalizado)
+        if not conjunto:
+            return
+        chaves = self._chaves_das_bandas(conjunto)
+        with self._lock:
+            if termo_normalizado in self._termos:
+                return
+            self._termos.add(termo_normalizado)
+            for chave in chaves:
+                self._bandas.setdefault(chave, []).append(termo_normalizado)
+
+    def buscar(self, termo_normalizado):
+        """
+        Procura o termo indexado mais parecido com o termo informado.
+
+        Args:
+            termo_normalizado: O termo normalizado da nova busca
+
+        Returns:
+            Tupla com (termo normalizado similar, similaridade de 0 a 1) ou None se nenhum
+            termo diferente do informado atingir o limiar
+        """
+        if not self._pronto.is_set():
+            self.iniciar_carregamento()
+            return None
+        if self._lido_em is not None and self.intervalo_atualizacao and time.monotonic() >= self._proxima_atualizacao:
+            self.iniciar_atualizacao()
+
+        conjunto = trigramas(termo_normalizado)
+        if not conjunto:
+            return None
+
+        candidatos = Counter()
+        for chave in self._chaves_das_bandas(conjunto):
+            candidatos.update(self._bandas.get(chave, ()))
+        candidatos.pop(termo_normalizado, None)
+
+        # Candidatos que coincidem em mais bandas tendem a ser os mais similares
+        distintivas = palavras_distintivas(termo_normalizado)
+        melhor = None
+        for candidato, _ in candidatos.most_common(self.max_candidatos):
+            similaridade = jaccard(conjunto, trigramas(candidato))
+            if similaridade < self.limiar or (melhor is not None and similaridade <= melhor[1]):
+                continue
+            if palavras_distintivas(candidato) == distintivas:
+                melhor = (candidato, similaridade)
+        return melhor
+
+    def carregar(self, termos=None):
+        """
+        Indexa os termos informados ou, por padrão, os de todas as pesquisas concluídas no
+        banco, e libera o índice para consultas.
+        """
+        if termos is None:
+            inicio = timezone.now()
+            for termo_normalizado in self._termos_concluidos():
+                self.adicionar(termo_normalizado)
+            self._marcar_leitura(inicio)
+        else:
+            for termo_normalizado in termos:
+                self.adicionar(termo_normalizado)
+        self._pronto.set()
+        logger.info(f"Índice de similaridade carregado com {len(self._termos)} termos")
+
+    def atualizar(self):
+        """
+        Indexa os termos das pesquisas concluídas no banco desde a última leitura.
+
+        Returns:
+            Quantidade de termos novos no índice
+        """
+        if self._lido_em is None:
+            return 0
+        inicio = timezone.now()
+        antes = len(self._termos)
+        for termo_normalizado in self._termos_concluidos(desde=self._lido_em - FOLGA_ATUALIZACAO):
+            self.adicionar(termo_normalizado)
+        self._marcar_leitura(inicio)
+        novos = len(self._termos) - antes
+        if novos:
+            logger.info(f"Índice de similaridade atualizado com {novos} termos novos")
+        return novos
+
+    def _termos_concluidos(self, desde=None):
+        pesquisas = PesquisaAcademica.objects.filter(status=PesquisaAcademica.Status.CONCLUIDA)
+        if desde is not None:
+            pesquisas = pesquisas.filter(atualizado_em__gte=desde)
+        return pesquisas.values_list('termo_normalizado', flat=True).distinct().iterator(chunk_size=2000)
+
+    def _marcar_leitura(self, inicio):
+        self._lido_em = inicio
+        self._proxima_atualizacao = time.monotonic() + self.intervalo_atualizacao
+
+    def iniciar_carregamento(self):
+        """Carrega o índice em uma thread, se o carregamento ainda não tiver começado."""
+        with self._lock:
+            if self._carregamento is not None:
+                return
+            self._carregamento = threading.Thread(
+                target=self._carregar_em_segundo_plano, name='indice-similaridade', daemon=True
+            )
+        self._carregamento.start()
+
+    def iniciar_atualizacao(self):
+        """Atualiza o índice em uma thread, se não houver outra atualização em andamento."""
+        with self._lock:
+            if self._atualizacao is not None and self._atualizacao.is_alive():
+                return
+            # Evita que as consultas seguintes disparem novas atualizações enquanto esta roda
+            self._proxima_atualizacao = time.monotonic() + self.intervalo_atualizacao
+            self._atualizacao = threading.Thread(
+                target=self._atualizar_em_segundo_plano, name='indice-similaridade-atualizacao', daemon=True
+            )
+        self._atualizacao.start()
+
+    def _atualizar_em_segundo_plano(self):
+        try:
+            self.atualizar()
+        except Exception as e:
+            logger.error(f"Erro ao atualizar o índice de similaridade: {str(e)}")
+        finally:
+            connection.close()
+
+    def _carregar_em_segundo_plano(self):
+        try:
+            self.carregar()
+        except Exception as e:
+            logger.error(f"Erro ao carregar o índice de similaridade: {str(e)}")
+            with self._lock:
+                self._carregamento = None
+        finally:
+            connection.close()
+
+    def limpar(self):
+        with self._lock:
+            self._bandas.clear()
+            self._termos.clear()
+            self._carregamento = None
+            self._pronto.clear()
+            self._lido_em = None
+            self._proxima_atualizacao = 0.0
+
+
+indice_similaridade = IndiceSimilaridade(
+    limiar=settings.BUSCA_SIMILARIDADE_LIMIAR,
+    intervalo_atualizacao=settings.BUSCA_SIMILARIDADE_ATUALIZACAO,
+)
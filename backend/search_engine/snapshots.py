@@ -0,0 +1,112 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from .banco import escrita_serializada
+from .models import PesquisaAcademica, SnapshotPesquisa
+from .serializers import PesquisaAcademicaSerializer
+
+logger = logging.getLogger(__name__)
+
+# A partir destes status a resposta de uma pesquisa não muda mais
+STATUS_FINAIS = (PesquisaAcademica.Status.CONCLUIDA, PesquisaAcademica.Status.FALHOU)
+
+# Pesquisas cujos snapshots já foram descartados pela operação em lote em andamento
+_invalidadas_em_lote = ContextVar('snapshots_invalidados_em_lote', default=frozenset())
+
+# Mesmo renderizador das respostas da API, para que o snapshot tenha os mesmos bytes
+_renderizador = JSONRenderer()
+
+
+def renderizar(dados):
+    """Dados (já serializados) em JSON, do mesmo jeito que a API os renderizaria."""
+    return _renderizador.render(dados).decode('utf-8')
+
+
+def renderizar_pesquisa(pesquisa):
+    """Resposta JSON de uma pesquisa (PesquisaAcademicaSerializer), sem os campos transitórios da busca."""
+    return renderizar(PesquisaAcademicaSerializer(pesquisa).data)
+
+
+def aceita_snapshot(pesquisa):
+    """Se a resposta da pesquisa já pode ser guardada: pesquisa terminada e com as fontes no banco."""
+    return settings.HISTORICO_SNAPSHOTS_ATIVOS and pesquisa.status in STATUS_FINAIS and not pesquisa.arquivo
+
+
+@escrita_serializada
+def gravar_snapshots(pesquisas):
+    """
+    Renderiza e guarda (ou substitui) o snapshot de cada pesquisa terminada.
+
+    Roda na fila de escrita, de modo que as fontes são lidas e o snapshot é gravado sem
+    que outra gravação do processo (e a invalidação que ela dispara) fique no meio.
+
+    Args:
+        pesquisas: Objetos PesquisaAcademica; as que não aceitam snapshot são ignoradas
+
+    Returns:
+        Dicionário id da pesquisa -> JSON gravado
+    """
+    conteudos = {pesquisa.id: renderizar_pesquisa(pesquisa) for pesquisa in pesquisas if aceita_snapshot(pesquisa)}
+    if conteudos:
+        SnapshotPesquisa.objects.bulk_create(
+            [SnapshotPesquisa(pesquisa_id=pesquisa_id, conteudo=conteudo) for pesquisa_id, conteudo in conteudos.items()],
+            update_conflicts=True, unique_fields=['pesquisa'], update_fields=['conteudo', 'gerado_em'],
+        )
+    return conteudos
+
+
+def conteudos_pesquisas(pesquisas):
+    """
+    Resposta JSON de cada pesquisa, guardando o snapshot das que já terminaram.
+
+    Usada nas leituras de pesquisas ainda sem snapshot (em andamento, gravadas antes dos
+    snapshots ou reidratadas da retenção).
+
+    Returns:
+        Dicionário id da pesquisa -> JSON
+    """
+    conteudos = gravar_snapshots(pesquisas) if any(aceita_snapshot(pesquisa) for pesquisa in pesquisas) else {}
+    for pesquisa in pesquisas:
+        if pesquisa.id not in conteudos:
+            conteudos[pesquisa.id] = renderizar_pesquisa(pesquisa)
+    return conteudos
+
+
+def invalidar_snapshots(**filtros):
+    """Descarta os snapshots que atendem aos filtros (ex.: pesquisa_id__in=[...])."""
+    removidos, _ = SnapshotPesquisa.objects.filter(**filtros).delete()
+    if removidos:
+        logger.info(f"{removidos} snapshots de pesquisas descartados")
+    return removidos
+
+
+@contextmanager
+def invalidacao_em_lote(pesquisa_ids):
+    """
+    Descarta de uma vez os snapshots das pesquisas; dentro do bloco, os receptores deixam
+    de descartá-los de novo a cada associação removida (ex.: na retenção).
+    """
+    pesquisa_ids = frozenset(pesquisa_ids)
+    invalidar_snapshots(pesquisa_id__in=pesquisa_ids)
+    token = _invalidadas_em_lote.set(_invalidadas_em_lote.get() | pesquisa_ids)
+    try:
+        yield
+    finally:
+        _invalidadas_em_lote.reset(token)
+
+
+def invalidar_por_fonte(sender, instance, created=False, raw=False, **kwargs):
+    """Receptor de post_save de FonteAcademica: descarta os snapshots das pesquisas com a fonte."""
+    # Fontes novas ainda não pertencem a nenhuma pesquisa
+    if not created and not raw:
+        invalidar_snapshots(pesquisa__itens__fonte_id=instance.id)
+
+
+def invalidar_por_item(sender, instance, raw=False, **kwargs):
+    """Receptor de post_save e post_delete de PesquisaFonte: descarta o snapshot da pesquisa."""
+    if not raw and instance.pesquisa_id not in _invalidadas_em_lote.get():
+        invalidar_snapshots(pesquisa_id=instance.pesquisa_id)
@@ -0,0 +1,112 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExtratorFontesIncremental:
+    """
+    Parser JSON incremental para a resposta de extração de fontes.
+
+    Recebe o conteúdo do modelo em pedaços (como chega em uma completion com
+    stream=True) e devolve cada objeto do array "fontes" assim que ele é fechado,
+    sem esperar o fim do documento. Apenas a estrutura do JSON é acompanhada
+    (strings, escapes e aninhamento); cada objeto completo é decodificado com
+    json.loads.
+    """
+
+    def __init__(self, chave='fontes'):
+        self.chave = chave
+        self._buffer = []
+        self._pilha = []
+        self._em_string = False
+        self._escape = False
+        self._inicio_string = None
+        self._ultima_chave = None
+        self._profundidade_array = None
+        self._inicio_objeto = None
+        self._posicao = 0
+
+    def alimentar(self, pedaco):
+        """
+        Processa um novo pedaço do conteúdo.
+
+        Args:
+            pedaco: Trecho de texto recebido do modelo
+
+        Returns:
+            Lista com os objetos do array que foram concluídos neste pedaço
+        """
+        if not pedaco:
+            return []
+
+        concluidos = []
+        for caractere in pedaco:
+            self._buffer.append(caractere)
+            posicao = self._posicao
+            self._posicao += 1
+
+            if self._em_string:
+                if self._escape:
+                    self._escape = False
+                elif caractere == '\\':
+                    self._escape = True
+                elif caractere == '"':
+                    self._em_string = False
+                    # Guarda as strings do objeto raiz para identificar a chave do array
+                    if len(self._pilha) == 1 and self._pilha[0] == '{':
+                        self._ultima_chave = ''.join(self._buffer[self._inicio_string + 1:posicao])
+                continue
+
+            if caractere == '"':
+                self._em_string = True
+                self._inicio_string = posicao
+            elif caractere in '{[':
+                if (caractere == '{' and self._profundidade_array is not None
+                        and len(self._pilha) == self._profundidade_array):
+                    self._inicio_objeto = posicao
+                self._pilha.append(caractere)
+                if (caractere == '[' and len(self._pilha) == 2
+                        and self._ultima_chave == self.chave):
+                    self._profundidade_array = len(self._pilha)
+            elif caractere in '}]':
+                if not self._pilha:
+                    continue
+                self._pilha.pop()
+                if (caractere == '}' and self._inicio_objeto is not None
+                        and len(self._pilha) == self._profundidade_array):
+                    objeto = self._decodificar(self._inicio_objeto, posicao)
+                    self._inicio_objeto = None
+                    if objeto is not None:
+                        concluidos.append(objeto)
+                elif caractere == ']' and len(self._pilha) + 1 == self._profundidade_array:
+                    self._profundidade_array = None
+
+        return concluidos
+
+    def _decodificar(self, inicio, fim):
+        texto = ''.join(self._buffer[inicio:fim + 1])
+        try:
+            return json.loads(texto)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Objeto de fonte inválido no stream: {str(e)} - {texto[:200]}")
+            return None
+
+    @property
+    def conteudo(self):
+        """Conteúdo completo recebido até o momento."""
+        return ''.join(self._buffer)
+
+
+def formatar_evento_sse(evento, dados):
+    """
+    Formata um evento no padrão Server-Sent Events.
+
+    Args:
+        evento: Nome do evento (campo "event")
+        dados: Objeto serializável em JSON enviado no campo "data"
+
+    Returns:
+        Texto do evento, terminado pela linha em branco exigida pelo protocolo
+    """
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False, default=str)}\n\n"
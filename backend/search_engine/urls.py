@@ -1,8 +1,14 @@
 from django.urls import path
-from .views import PesquisaView, HistoricoPesquisaView
+from .views import PesquisaView, PesquisaLoteView, PesquisaAsyncView, PesquisaStreamView, PesquisaDetalheView, BuscaFontesView, HistoricoPesquisaView, ExportacaoHistoricoView
 
 urlpatterns = [
     path('pesquisa/', PesquisaView.as_view(), name='pesquisar'),
+    path('pesquisa/lote/', PesquisaLoteView.as_view(), name='pesquisar_lote'),
+    path('pesquisa/async/', PesquisaAsyncView.as_view(), name='pesquisar_async'),
+    path('pesquisa/stream/', PesquisaStreamView.as_view(), name='pesquisar_stream'),
+    path('pesquisa/<int:pk>/', PesquisaDetalheView.as_view(), name='pesquisa_detalhe'),
+    path('fontes/busca/', BuscaFontesView.as_view(), name='buscar_fontes'),
     path('historico/', HistoricoPesquisaView.as_view(), name='historico'),
     path('historico', HistoricoPesquisaView.as_view(), name='historico_sem_barra'),
+    path('historico/exportar/', ExportacaoHistoricoView.as_view(), name='exportar_historico'),
 ] 
\ No newline at end of file
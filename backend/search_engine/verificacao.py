@@ -0,0 +1,258 @@
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.utils import timezone
+
+from .banco import escrita_serializada
+from .models import VerificacaoURL
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalhos enviados nas verificações de link
+CABECALHOS_VERIFICACAO = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml,application/pdf;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Connection': 'keep-alive',
+    'Pragma': 'no-cache',
+    'Cache-Control': 'no-cache'
+}
+
+def verificar_acessibilidade_url(url, timeout=3, verificar_pdf=False, sessao=None):
+    """
+    Verifica se uma URL está acessível e é um recurso válido.
+
+    Args:
+        url: URL a ser verificada
+        timeout: Tempo limite para a requisição em segundos
+        verificar_pdf: Se True, verifica se o conteúdo é um PDF
+        sessao: Sessão requests a reutilizar (mantém as conexões abertas entre verificações)
+
+    Returns:
+        Tupla com (booleano indicando se a URL é acessível, informações adicionais)
+    """
+    if not url or not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+        return False, {"erro": "URL inválida", "tipo": None}
+
+    http = sessao or requests
+
+    try:
+        # Primeiro tenta com HEAD para economizar tráfego
+        response = http.head(url, timeout=timeout, headers=CABECALHOS_VERIFICACAO, allow_redirects=True)
+        content_type = response.headers.get('Content-Type', '').lower()
+
+        # Se for um PDF e quisermos verificar isso
+        if verificar_pdf and 'application/pdf' in content_type:
+            return True, {"tipo": "pdf", "content_type": content_type, "url_final": response.url}
+
+        # Se não for um PDF ou não obtivemos o Content-Type com HEAD, tenta GET
+        if response.status_code != 200 or verificar_pdf or 'text/html' in content_type:
+            # Tentativa com GET para obter mais informações
+            response = http.get(url, timeout=timeout, headers=CABECALHOS_VERIFICACAO, stream=True)
+            # Lê apenas os primeiros bytes para verificar o tipo de conteúdo
+            content_peek = next(response.iter_content(1024), b'')
+            response.close()
+            content_type = response.headers.get('Content-Type', content_type).lower()
+
+            # Verifica se é um PDF pelo início do conteúdo
+            if verificar_pdf and content_peek.startswith(b'%PDF-'):
+                return True, {"tipo": "pdf", "detalhes": "Conteúdo inicia com assinatura PDF", "url_final": response.url}
+
+        return response.status_code == 200, {
+            "status_code": response.status_code,
+            "content_type": content_type,
+            "url_final": response.url  # URL após redirecionamentos
+        }
+
+    except requests.RequestException as e:
+        logger.warning(f"Erro ao verificar URL {url}: {str(e)}")
+        return False, {"erro": str(e), "tipo": type(e).__name__}
+
+    except Exception as e:
+        logger.error(f"Erro inesperado ao verificar URL {url}: {str(e)}")
+        return False, {"erro": str(e), "tipo": "erro_desconhecido"}
+
+
+def criar_sessao(tamanho_pool=32):
+    """Cria uma sessão requests com pool de conexões, reutilizada entre as verificações."""
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool)
+    sessao.mount('http://', adaptador)
+    sessao.mount('https://', adaptador)
+    sessao.headers.update(CABECALHOS_VERIFICACAO)
+    return sessao
+
+
+class VerificadorLinks:
+    """
+    Etapa do pipeline que verifica, em paralelo, se os links das fontes estão acessíveis.
+
+    As verificações usam uma sessão com pool de conexões, respeitam um limite de
+    requisições simultâneas por host e um prazo global para a etapa inteira. Os
+    resultados ficam na tabela VerificacaoURL e são reaproveitados enquanto estiverem
+    dentro do TTL (mais curto para links que falharam, que podem ser instabilidades).
+    """
+
+    def __init__(self, workers, max_por_host, prazo, timeout, ttl, ttl_falha, sessao=None):
+        self.workers = workers
+        self.max_por_host = max_por_host
+        self.prazo = prazo
+        self.timeout = timeout
+        self.ttl = ttl
+        self.ttl_falha = ttl_falha
+        self.sessao = sessao or criar_sessao(tamanho_pool=workers)
+        # Cada semáforo existe enquanto alguma verificação do host o usa ou espera por ele;
+        # depois sai do dicionário, que não cresce com todos os hosts já verificados
+        self._semaforos = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def _semaforo_do_host(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            semaforo = self._semaforos.get(host)
+            if semaforo is None:
+                semaforo = self._semaforos[host] = threading.BoundedSemaphore(self.max_por_host)
+            return semaforo
+
+    def consultar_cache(self, urls):
+        """
+        Busca verificações ainda válidas para as URLs.
+
+        Returns:
+            Dicionário {url: VerificacaoURL} apenas com as verificações dentro do TTL
+        """
+        agora = timezone.now()
+        validas = {}
+        for verificacao in VerificacaoURL.objects.filter(url__in=set(urls)):
+            ttl = self.ttl if verificacao.acessivel else self.ttl_falha
+            if verificacao.verificado_em >= agora - timedelta(seconds=ttl):
+                validas[verificacao.url] = verificacao
+        return validas
+
+    def verificar_urls(self, urls):
+        """
+        Verifica as URLs na rede, em paralelo, sem acessar o banco de dados.
+
+        URLs que não forem verificadas dentro do prazo global ficam fora do resultado.
+
+        Returns:
+            Dicionário {url: VerificacaoURL não salva}
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+
+        limite = time.monotonic() + self.prazo
+
+        def verificar(url):
+            with self._semaforo_do_host(url):
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return None
+                timeout = min(self.timeout, restante)
+                acessivel, info = verificar_acessibilidade_url(url, timeout=timeout, sessao=self.sessao)
+                if not acessivel and timeout < self.timeout and 'Timeout' in (info.get('tipo') or ''):
+                    # O tempo esgotou por causa do prazo da etapa, não do servidor: estado desconhecido
+                    return None
+                return VerificacaoURL(
+                    url=url,
+                    acessivel=acessivel,
+                    status_code=info.get('status_code'),
+                    url_final=(info.get('url_final') or '')[:VerificacaoURL._meta.get_field('url_final').max_length] or None,
+                    content_type=(info.get('content_type') or '')[:100] or None,
+                    erro=(info.get('erro') or '')[:255] or None,
+                    verificado_em=timezone.now(),
+                )
+
+        executor = ThreadPoolExecutor(max_workers=min(self.workers, len(urls)), thread_name_prefix='verificacao-link')
+        futuros = {executor.submit(verificar, url): url for url in urls}
+        concluidos, pendentes = wait(futuros, timeout=self.prazo)
+        # Não espera verificações que estouraram o prazo; as que ainda não começaram são canceladas
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        if pendentes:
+            logger.warning(f"{len(pendentes)} links não foram verificados dentro do prazo de {self.prazo}s")
+
+        resultados = {}
+        for futuro in concluidos:
+            verificacao = futuro.result()
+            if verificacao is not None:
+                resultados[futuros[futuro]] = verificacao
+        return resultados
+
+    def salvar(self, verificacoes):
+        """Grava (ou atualiza) as verificações no cache persistente."""
+        if not verificacoes:
+            return
+        self._gravar(list(verificacoes))
+
+    @staticmethod
+    @escrita_serializada
+    def _gravar(verificacoes):
+        VerificacaoURL.objects.bulk_create(
+            verificacoes,
+            update_conflicts=True,
+            unique_fields=['url'],
+            update_fields=['acessivel', 'status_code', 'url_final', 'content_type', 'erro', 'verificado_em'],
+        )
+
+    def verificar(self, urls):
+        """
+        Verifica as URLs usando o cache persistente e a rede.
+
+        Returns:
+            Dicionário {url: VerificacaoURL} das URLs cujo estado é conhecido
+        """
+        resultados = self.consultar_cache(urls)
+        novas = self.verificar_urls([url for url in urls if url not in resultados])
+        self.salvar(novas.values())
+        resultados.update(novas)
+        return resultados
+
+
+def separar_links_inacessiveis(fontes_validas, verificacoes):
+    """
+    Separa as fontes cujos links se mostraram inacessíveis.
+
+    Fontes sem verificação (ex.: prazo esgotado) são mantidas.
+
+    Args:
+        fontes_validas: FonteExtraida retornadas por validar_fontes
+        verificacoes: Resultado de VerificadorLinks.verificar
+
+    Returns:
+        Tupla com (fontes mantidas, fontes rejeitadas no formato de validar_fontes)
+    """
+    mantidas = []
+    rejeitadas = []
+    for fonte in fontes_validas:
+        verificacao = verificacoes.get(fonte.link)
+        if verificacao is None or verificacao.acessivel:
+            mantidas.append(fonte)
+            continue
+        motivo = f"status {verificacao.status_code}" if verificacao.status_code else (verificacao.erro or 'erro de conexão')
+        rejeitadas.append({
+            'indice': fonte.indice,
+            'titulo': fonte.titulo,
+            'link': fonte.link,
+            'erros': {'link': [f"Link inacessível ({motivo})."]},
+        })
+    return mantidas, rejeitadas
+
+
+verificador_links = VerificadorLinks(
+    workers=settings.BUSCA_VERIFICACAO_WORKERS,
+    max_por_host=settings.BUSCA_VERIFICACAO_POR_HOST,
+    prazo=settings.BUSCA_VERIFICACAO_PRAZO,
+    timeout=settings.BUSCA_VERIFICACAO_TIMEOUT,
+    ttl=settings.BUSCA_VERIFICACAO_TTL,
+    ttl_falha=settings.BUSCA_VERIFICACAO_TTL_FALHA,
+)
@@ -1,9 +1,54 @@
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
+from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import PesquisaAcademica
-from .serializers import PesquisaAcademicaSerializer, PesquisaInputSerializer
-from .services import realizar_busca_academica
+from .models import PesquisaAcademica, PesquisaFonte
+from .pagination import HistoricoCursorPagination
+from .serializers import (
+    PesquisaAcademicaSerializer, FonteAcademicaSerializer, FontePesquisaSerializer, PesquisaInputSerializer,
+    FonteBuscaSerializer, BuscaFontesInputSerializer, PesquisaLoteInputSerializer,
+    ExportacaoHistoricoInputSerializer, PesquisaStreamSerializer,
+)
+from .services import (
+    buscar_com_cache,
+    buscar_em_lote,
+    consultar_cache_busca,
+    criar_pesquisa,
+    modo_pipeline,
+    realizar_busca_academica_stream,
+)
+from .cache import CACHE_MISS
+from .streaming import formatar_evento_sse
+from .jobs import pool_pesquisas
+from .services_async import buscar_com_cache_async
+from .indice_local import buscar_fontes_locais
+from .exportacao import FORMATOS, filtrar_pesquisas, iterar_async
+from .retencao import retencao_pesquisas
+from .metricas import registro as registro_metricas
+from .snapshots import conteudos_pesquisas
+
+def dados_resposta_pesquisa(pesquisa):
+    """Dados da pesquisa serializada, incluindo as fontes rejeitadas na validação e a origem dos resultados, se houver"""
+    dados = PesquisaAcademicaSerializer(pesquisa).data
+    if hasattr(pesquisa, 'fontes_rejeitadas'):
+        dados['fontes_rejeitadas'] = pesquisa.fontes_rejeitadas
+    if hasattr(pesquisa, 'origem'):
+        dados['origem'] = pesquisa.origem
+    if hasattr(pesquisa, 'pesquisa_similar'):
+        dados['pesquisa_similar'] = pesquisa.pesquisa_similar
+    return dados
 
 class PesquisaView(APIView):
     """View para realizar pesquisas acadêmicas"""
@@ -11,16 +56,247 @@ class PesquisaView(APIView):
         serializer = PesquisaInputSerializer(data=request.data)
         if serializer.is_valid():
             termo = serializer.validated_data['termo']
-            pesquisa = realizar_busca_academica(termo)
+            em_segundo_plano = serializer.validated_data['em_segundo_plano']
+            
+            if em_segundo_plano:
+                pool_pesquisas.iniciar()
+                if pool_pesquisas.quantidade_pendente() >= settings.BUSCA_JOBS_MAX_PENDENTES:
+                    return Response(
+                        {'detail': 'Fila de pesquisas cheia. Tente novamente em instantes.'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        headers={'Retry-After': str(int(settings.BUSCA_JOBS_INTERVALO_CONSULTA) or 1)}
+                    )
+            
+            pesquisa, estado_cache = buscar_com_cache(
+                termo,
+                em_segundo_plano=em_segundo_plano,
+                busca_local=serializer.validated_data['busca_local'],
+                modo=serializer.validated_data.get('modo'),
+            )
+            
+            if pesquisa.status in (PesquisaAcademica.Status.PENDENTE, PesquisaAcademica.Status.EXECUTANDO):
+                # Resultado não estava em cache: a busca fica com o pool de workers (ou já estava com ele)
+                pool_pesquisas.notificar()
+                url_status = reverse('pesquisa_detalhe', args=[pesquisa.id])
+                return Response(
+                    {'id': pesquisa.id, 'status': pesquisa.status, 'url': request.build_absolute_uri(url_status)},
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': url_status, 'X-Cache-Busca': estado_cache}
+                )
+            
             return Response(
-                PesquisaAcademicaSerializer(pesquisa).data,
-                status=status.HTTP_200_OK
+                dados_resposta_pesquisa(pesquisa),
+                status=status.HTTP_200_OK,
+                headers={'X-Cache-Busca': estado_cache}
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class HistoricoPesquisaView(APIView):
-    """View para listar o histórico de pesquisas"""
+class PesquisaLoteView(APIView):
+    """View para pesquisar vários termos de uma vez, em paralelo"""
+    def post(self, request):
+        serializer = PesquisaLoteInputSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        termos = serializer.validated_data['termos']
+        resultados = []
+        itens = buscar_em_lote(
+            termos,
+            settings.BUSCA_LOTE_MAX_PARALELAS,
+            busca_local=serializer.validated_data['busca_local'],
+            modo=serializer.validated_data.get('modo'),
+        )
+        for item in itens:
+            resultado = {'termo': item['termo']}
+            if item['duplicados']:
+                resultado['duplicados'] = item['duplicados']
+            if item['erro'] is not None:
+                resultado['erro'] = item['erro']
+            else:
+                resultado['cache'] = item['estado']
+                resultado['pesquisa'] = dados_resposta_pesquisa(item['pesquisa'])
+            resultados.append(resultado)
+        
+        return Response({'total_termos': len(termos), 'resultados': resultados}, status=status.HTTP_200_OK)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class PesquisaAsyncView(View):
+    """View assíncrona para realizar pesquisas acadêmicas, pensada para execução via ASGI"""
+    async def post(self, request):
+        try:
+            dados = json.loads(request.body or b'{}')
+        except json.JSONDecodeError:
+            return JsonResponse({'detail': 'JSON inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = PesquisaInputSerializer(data=dados)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        termo = serializer.validated_data['termo']
+        pesquisa, estado_cache = await buscar_com_cache_async(
+            termo,
+            busca_local=serializer.validated_data['busca_local'],
+            modo=serializer.validated_data.get('modo'),
+        )
+        # A serialização acessa a relação de fontes, que usa o ORM síncrono
+        resultado = await sync_to_async(dados_resposta_pesquisa)(pesquisa)
+        response = JsonResponse(resultado, status=status.HTTP_200_OK)
+        response['X-Cache-Busca'] = estado_cache
+        return response
+
+class PesquisaStreamView(View):
+    """
+    View que transmite as fontes via Server-Sent Events à medida que são extraídas.
+    
+    Eventos emitidos: "pesquisa" (dados da pesquisa criada), um "fonte" por fonte
+    salva, um "rejeitada" por fonte descartada na validação ou com link inacessível e "fim"
+    com o status final. Resultados em cache são transmitidos de imediato.
+    
+    As fontes de uma busca nova chegam na ordem de extração e só são ranqueadas ao final;
+    o evento "fim" traz a lista final (id e pontuacao de cada fonte, da maior para a menor
+    pontuação), a mesma ordem das demais consultas à pesquisa.
+    """
+    def get(self, request):
+        dados = {'termo': request.GET.get('termo', '')}
+        if request.GET.get('modo'):
+            dados['modo'] = request.GET['modo']
+        serializer = PesquisaInputSerializer(data=dados)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        termo = serializer.validated_data['termo']
+        response = StreamingHttpResponse(
+            self._eventos(termo, serializer.validated_data.get('modo')), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Desativa o buffer de proxies como o nginx, que atrasaria os eventos
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
+    def _eventos(self, termo, modo=None):
+        pesquisa, estado_cache = consultar_cache_busca(termo)
+        
+        if pesquisa is not None:
+            yield formatar_evento_sse('pesquisa', self._dados_pesquisa(pesquisa, estado_cache))
+            fontes = pesquisa.fontes_ordenadas
+            for fonte in fontes:
+                yield formatar_evento_sse('fonte', FontePesquisaSerializer(fonte).data)
+        else:
+            pesquisa = criar_pesquisa(termo, modo=modo_pipeline(modo))
+            yield formatar_evento_sse('pesquisa', self._dados_pesquisa(pesquisa, CACHE_MISS))
+            for evento, dados in realizar_busca_academica_stream(pesquisa):
+                if evento == 'fonte':
+                    dados = FonteAcademicaSerializer(dados).data
+                yield formatar_evento_sse(evento, dados)
+            # Ordem e pontuações definidas por reordenar_fontes ao final da busca
+            fontes = pesquisa.fontes_ordenadas
+        
+        yield formatar_evento_sse('fim', {
+            'id': pesquisa.id,
+            'status': pesquisa.status,
+            'erro': pesquisa.erro,
+            'fontes': [{'id': fonte.id, 'pontuacao': fonte.pontuacao} for fonte in fontes],
+        })
+    
+    def _dados_pesquisa(self, pesquisa, estado_cache):
+        dados = PesquisaStreamSerializer(pesquisa).data
+        dados['cache'] = estado_cache
+        if hasattr(pesquisa, 'pesquisa_similar'):
+            dados['pesquisa_similar'] = pesquisa.pesquisa_similar
+        return dados
+
+def servir_snapshots(request):
+    """Se a resposta pode ser montada com os snapshots (JSON já renderizado) das pesquisas"""
+    return settings.HISTORICO_SNAPSHOTS_ATIVOS and request.accepted_renderer.format == 'json'
+
+def resposta_json(conteudo):
+    """Resposta com um JSON já renderizado, sem passar pelos serializers e renderizadores do DRF"""
+    return HttpResponse(conteudo, content_type='application/json')
+
+class PesquisaDetalheView(APIView):
+    """View para consultar o status e o resultado de uma pesquisa"""
+    def get(self, request, pk):
+        if servir_snapshots(request):
+            linha = PesquisaAcademica.objects.filter(pk=pk).values('snapshot__conteudo').first()
+            if linha and linha['snapshot__conteudo'] is not None:
+                return resposta_json(linha['snapshot__conteudo'])
+        
+        pesquisa = get_object_or_404(PesquisaAcademica, pk=pk)
+        if pesquisa.status == PesquisaAcademica.Status.PENDENTE:
+            # Garante que pesquisas pendentes de execuções anteriores sejam retomadas
+            pool_pesquisas.iniciar()
+        elif pesquisa.arquivo:
+            # Pesquisa consultada de novo: volta para o banco até o próximo período de retenção
+            retencao_pesquisas.reidratar(pesquisa)
+        if servir_snapshots(request):
+            return resposta_json(conteudos_pesquisas([pesquisa])[pesquisa.id])
+        return Response(PesquisaAcademicaSerializer(pesquisa).data)
+
+class BuscaFontesView(APIView):
+    """View para buscar nas fontes já armazenadas, ordenadas por relevância (BM25), sem chamar o modelo"""
+    def get(self, request):
+        serializer = BuscaFontesInputSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        termo = serializer.validated_data['q']
+        fontes = buscar_fontes_locais(termo, limite=serializer.validated_data['limite'])
+        return Response({'q': termo, 'resultados': FonteBuscaSerializer(fontes, many=True).data})
+
+class HistoricoPesquisaView(ListAPIView):
+    """View para listar o histórico de pesquisas, paginado por cursor"""
+    serializer_class = PesquisaAcademicaSerializer
+    pagination_class = HistoricoCursorPagination
+    queryset = PesquisaAcademica.objects.prefetch_related(
+        Prefetch('itens', queryset=PesquisaFonte.objects.select_related('fonte'))
+    )
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Página do histórico montada com os snapshots das pesquisas: uma consulta .values() traz
+        o JSON pronto de cada uma, e apenas as pesquisas sem snapshot são serializadas.
+        """
+        if not servir_snapshots(request):
+            return super().list(request, *args, **kwargs)
+        
+        linhas = self.paginate_queryset(
+            PesquisaAcademica.objects.values('id', 'data_pesquisa', 'snapshot__conteudo')
+        )
+        conteudos = {linha['id']: linha['snapshot__conteudo'] for linha in linhas}
+        faltantes = [pesquisa_id for pesquisa_id, conteudo in conteudos.items() if conteudo is None]
+        if faltantes:
+            conteudos.update(conteudos_pesquisas(list(self.get_queryset().filter(id__in=faltantes))))
+        
+        # Mesmo corpo de get_paginated_response, com os resultados já renderizados
+        return resposta_json(
+            f'{{"next":{json.dumps(self.paginator.get_next_link())},'
+            f'"previous":{json.dumps(self.paginator.get_previous_link())},'
+            f'"results":[{",".join(conteudos[linha["id"]] for linha in linhas)}]}}'
+        )
+
+class ExportacaoHistoricoView(View):
+    """
+    Exportação do histórico completo em CSV, JSONL ou BibTeX (?formato=), transmitida aos poucos.
+    
+    As pesquisas são lidas do banco em lotes pelo cursor, de modo que a memória usada não
+    depende do tamanho do histórico. Filtros opcionais: ?desde= e ?ate= (datas AAAA-MM-DD,
+    inclusive), ?termo= (trecho do termo) e ?status=.
+    """
+    def get(self, request):
+        serializer = ExportacaoHistoricoInputSerializer(data=request.GET.dict())
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        filtros = dict(serializer.validated_data)
+        gerar, content_type, extensao = FORMATOS[filtros.pop('formato')]
+        blocos = gerar(filtrar_pesquisas(**filtros))
+        if isinstance(request, ASGIRequest):
+            blocos = iterar_async(blocos)
+        response = StreamingHttpResponse(blocos, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="historico-{timezone.localdate():%Y%m%d}.{extensao}"'
+        return response
+
+class MetricasView(View):
+    """Métricas do pipeline de busca deste processo no formato de texto do Prometheus"""
     def get(self, request):
-        pesquisas = PesquisaAcademica.objects.all().order_by('-data_pesquisa')
-        serializer = PesquisaAcademicaSerializer(pesquisas, many=True)
-        return Response(serializer.data) 
\ No newline at end of file
+        return HttpResponse(registro_metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
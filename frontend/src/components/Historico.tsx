@@ -51,6 +51,8 @@ const itemVariants = {
 
 const Historico: React.FC<HistoricoProps> = ({ onPesquisaSelecionada }) => {
   const [historico, setHistorico] = useState<PesquisaAcademica[]>([]);
+  const [proximaPagina, setProximaPagina] = useState<string | null>(null);
+  const [carregandoMais, setCarregandoMais] = useState(false);
   const [carregando, setCarregando] = useState(true);
   const [erro, setErro] = useState<string | null>(null);
 
@@ -62,8 +64,9 @@ const Historico: React.FC<HistoricoProps> = ({ onPesquisaSelecionada }) => {
     setCarregando(true);
     setErro(null);
     try {
-      const dados = await obterHistorico();
-      setHistorico(dados);
+      const pagina = await obterHistorico();
+      setHistorico(pagina.results);
+      setProximaPagina(pagina.next);
     } catch (error) {
       console.error('Erro ao carregar histórico:', error);
       setErro('Não foi possível carregar o histórico de pesquisas. Tente novamente mais tarde.');
@@ -72,6 +75,20 @@ const Historico: React.FC<HistoricoProps> = ({ onPesquisaSelecionada }) => {
     }
   };
 
+  const carregarMais = async () => {
+    if (!proximaPagina) return;
+    setCarregandoMais(true);
+    try {
+      const pagina = await obterHistorico(proximaPagina);
+      setHistorico((atual) => [...atual, ...pagina.results]);
+      setProximaPagina(pagina.next);
+    } catch (error) {
+      console.error('Erro ao carregar mais pesquisas:', error);
+    } finally {
+      setCarregandoMais(false);
+    }
+  };
+
   if (carregando) {
     return (
       <Box sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', height: '300px', flexDirection: 'column', gap: 2 }}>
@@ -256,6 +273,13 @@ const Historico: React.FC<HistoricoProps> = ({ onPesquisaSelecionada }) => {
             })}
           </List>
         </Card>
+        {proximaPagina && (
+          <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+            <Button variant="outlined" onClick={carregarMais} disabled={carregandoMais}>
+              {carregandoMais ? <CircularProgress size={20} /> : 'Carregar mais'}
+            </Button>
+          </Box>
+        )}
       </motion.div>
     </Paper>
   );
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { PesquisaAcademica, PesquisaInput } from '../types';
+import { PaginaHistorico, PesquisaAcademica, PesquisaInput } from '../types';
 
 const API_URL = 'http://localhost:8000/api';
 
@@ -20,9 +20,9 @@ export const pesquisarAcademico = async (input: PesquisaInput): Promise<Pesquisa
   }
 };
 
-export const obterHistorico = async (): Promise<PesquisaAcademica[]> => {
+export const obterHistorico = async (cursor?: string): Promise<PaginaHistorico> => {
   try {
-    const response = await api.get('/historico/');
+    const response = await api.get(cursor || '/historico/');
     return response.data;
   } catch (error) {
     console.error('Erro ao obter histórico:', error);
@@ -16,6 +16,12 @@ export interface PesquisaAcademica {
   fontes: FonteAcademica[];
 }
 
+export interface PaginaHistorico {
+  next: string | null;
+  previous: string | null;
+  results: PesquisaAcademica[];
+}
+
 export interface PesquisaInput {
   termo: string;
 } 
\ No newline at end of file